@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Latency and throughput of AsyncRenderer under concurrent load. Clients
+request charts of a small set of datasets, so identical requests
+overlap and are coalesced. The event loop lag is measured by a
+heartbeat task; rendering in the loop blocks it for a whole chart.
+
+    python benchmarks/bench_async.py --clients 32 --requests 200
+    python benchmarks/bench_async.py --executor process --workers 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mpl_finance_ext as mfe
+from synthetic import make_ohlc
+
+
+async def heartbeat(lags, interval=0.005):
+    loop = asyncio.get_event_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - start - interval)
+
+
+async def client(render, datasets, requests, latencies, rng):
+    for _ in range(requests):
+        data = datasets[rng.randint(len(datasets))]
+        start = time.perf_counter()
+        try:
+            await render(data)
+        except RuntimeError:
+            latencies.append(None)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(render, datasets, clients, requests):
+    lags, latencies = list(), list()
+    beat = asyncio.ensure_future(heartbeat(lags))
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(render, datasets, requests // clients, latencies,
+               np.random.RandomState(i))
+        for i in range(clients)
+    ])
+    elapsed = time.perf_counter() - start
+    beat.cancel()
+    return elapsed, latencies, lags
+
+
+def report(name, elapsed, latencies, lags):
+    done = np.array([t for t in latencies if t is not None]) * 1000.0
+    rejected = sum(1 for t in latencies if t is None)
+    print('{:12s} {:8.1f} {:8.1f} {:8.1f} {:8.1f} {:8d} {:8.1f}'.format(
+        name, len(done) / elapsed,
+        np.percentile(done, 50), np.percentile(done, 95),
+        np.percentile(done, 99), rejected,
+        max(lags) * 1000.0 if lags else 0.0))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=160)
+    parser.add_argument('--datasets', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--executor', default='thread')
+    parser.add_argument('--rows', type=int, default=300)
+    args = parser.parse_args()
+
+    datasets = [make_ohlc(args.rows, seed=i) for i in range(args.datasets)]
+    plot_columns = ['EMA_8']
+
+    async def blocking(data):
+        image = mfe.render_image(
+            mfe.plot_candlestick, data, plot_columns=plot_columns)
+        # Back to the loop like a web handler that sends the image
+        await asyncio.sleep(0)
+        return image
+
+    print('{:12s} {:>8s} {:>8s} {:>8s} {:>8s} {:>8s} {:>8s}'.format(
+        '', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'rejected', 'lag ms'))
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    report('in loop', *loop.run_until_complete(
+        run(blocking, datasets, args.clients, args.requests)))
+
+    # Without cache hits every request of a dataset either renders
+    # or joins the render in flight
+    renderer = mfe.AsyncRenderer(
+        max_workers=args.workers, executor=args.executor,
+        cache=mfe.RenderCache(max_items=0))
+
+    async def rendered(data):
+        return await renderer.render(
+            mfe.plot_candlestick, data, plot_columns=plot_columns)
+
+    report('renderer', *loop.run_until_complete(
+        run(rendered, datasets, args.clients, args.requests)))
+    stats = renderer.stats()
+    print('renders {renders}, coalesced {coalesced}, '
+          'rejected {rejected}'.format(**stats))
+
+    renderer.close()
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
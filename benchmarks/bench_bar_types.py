@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Time of the Heikin-Ashi, Renko and range bar transforms and of
+drawing the last bars as candlestick chart.
+
+    python benchmarks/bench_bar_types.py --rows 1e7
+"""
+import argparse
+import sys
+import os
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mpl_finance_ext as mfe
+from synthetic import make_ohlc
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=float, default=1e7)
+    parser.add_argument('--brick', type=float, default=0.01,
+                        help='Brick size and bar range')
+    parser.add_argument('--candles', type=int, default=500,
+                        help='Number of drawn bars')
+    args = parser.parse_args()
+
+    data = make_ohlc(int(args.rows))
+    # Log prices keep the number of bricks of a long random walk
+    # independent of its drift
+    for col in ('open', 'high', 'low', 'close'):
+        data[col] = np.log(data[col].values) + 10.0
+    size = args.brick
+
+    transforms = [
+        ('heikin_ashi', lambda: mfe.heikin_ashi(data)),
+        ('renko', lambda: mfe.renko(data, size)),
+        ('range_bars', lambda: mfe.range_bars(data, size)),
+    ]
+
+    print('{} input bars, brick size / range {:.6f}'.format(len(data), size))
+    print('{:14s} {:>12s} {:>12s} {:>14s} {:>10s}'.format(
+        'transform', 'time [s]', 'bars', 'rows/s', 'draw [s]'))
+
+    for name, func in transforms:
+        start = time.perf_counter()
+        bars = func()
+        elapsed = time.perf_counter() - start
+
+        tail = bars.tail(args.candles).reset_index(drop=True)
+        start = time.perf_counter()
+        fig, _ = mfe.plot_candlestick(tail, use_pyplot=False)
+        fig.canvas.draw()
+        draw = time.perf_counter() - start
+
+        print('{:14s} {:12.3f} {:12d} {:14.0f} {:10.3f}'.format(
+            name, elapsed, len(bars), len(data) / elapsed, draw))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Per-chart overhead of plot_candlestick with and without a FigurePool.
+A small dataset is used so that the fixed cost of building and styling
+the figure dominates.
+
+    python benchmarks/bench_figure_pool.py --charts 200 --rows 50
+"""
+import argparse
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mpl_finance_ext as mfe
+from synthetic import make_ohlc
+
+LAYOUT = [
+    {'loc': (0, 0), 'rowspan': 4},
+    {'loc': (4, 0), 'rowspan': 4, 'sharex': 0},
+]
+
+
+def render_fresh(data):
+    fig = mfe.mpl_finance_ext._new_figure(
+        {'use_pyplot': False}, facecolor=mfe.background_color)
+    ax0 = fig.add_subplot(2, 1, 1, facecolor=mfe.background_color)
+    ax1 = fig.add_subplot(2, 1, 2, sharex=ax0,
+                          facecolor=mfe.background_color)
+    mfe.plot_candlestick(data, fig=fig, axis=ax0, plot_columns=['MA_10'],
+                         use_pyplot=False)
+    mfe.plot(data, fig=fig, axis=ax1, plot_columns=['close'],
+             use_pyplot=False)
+    fig.canvas.draw()
+
+
+def render_pooled(pool, data):
+    with pool.figure() as pooled:
+        mfe.plot_candlestick(data, plot_columns=['MA_10'],
+                             **pooled.render_kwargs(0))
+        mfe.plot(data, plot_columns=['close'],
+                 **pooled.render_kwargs(1))
+        pooled.fig.canvas.draw()
+
+
+def measure(func, charts):
+    start = time.perf_counter()
+    for _ in range(charts):
+        func()
+    return (time.perf_counter() - start) / charts * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--charts', type=int, default=100)
+    parser.add_argument('--rows', type=int, default=50)
+    args = parser.parse_args()
+
+    data = make_ohlc(args.rows)
+    data['MA_10'] = data['close'].rolling(10).mean()
+
+    pool = mfe.FigurePool(layout=LAYOUT, shape=(8, 4), size=1)
+
+    # Warm up font caches and the pool
+    render_fresh(data)
+    render_pooled(pool, data)
+
+    fresh = measure(lambda: render_fresh(data), args.charts)
+    pooled = measure(lambda: render_pooled(pool, data), args.charts)
+
+    print('rows per chart:  {}'.format(args.rows))
+    print('without pool:    {:8.2f} ms/chart'.format(fresh))
+    print('with pool:       {:8.2f} ms/chart'.format(pooled))
+    print('saved:           {:8.2f} ms/chart'.format(fresh - pooled))
+
+
+if __name__ == '__main__':
+    main()
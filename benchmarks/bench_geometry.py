@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Payload size and time of the chart geometry against rendered PNG
+and SVG images of the same candlestick chart with indicators,
+signals and patterns.
+
+    python benchmarks/bench_geometry.py --rows 500 2000 10000
+"""
+import argparse
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mpl_finance_ext as mfe
+from synthetic import make_ohlc
+from synthetic import make_patterns
+from synthetic import make_signals
+
+PLOT_COLUMNS = ['EMA_8', 'MA_36']
+
+
+def best(func, repeat):
+    times = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = func()
+        times.append(time.perf_counter() - start)
+    return payload, min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+',
+                        default=[500, 2000, 10000])
+    parser.add_argument('--max-candles', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print('{:>6s} {:8s} {:>10s} {:>10s} {:>8s}'.format(
+        'rows', '', 'kB', 'deflate kB', 'ms'))
+    for rows in args.rows:
+        data = make_ohlc(rows)
+        kwargs = dict(
+            signals=make_signals(data, 10),
+            cs_patterns=make_patterns(data, 5),
+            plot_columns=PLOT_COLUMNS,
+            max_candles=args.max_candles,
+        )
+
+        outputs = [
+            ('png', lambda: mfe.render_image(
+                mfe.plot_candlestick, data, fmt='png', **kwargs)),
+            ('svg', lambda: mfe.render_image(
+                mfe.plot_candlestick, data, fmt='svg', **kwargs)),
+            ('mfeg', lambda: mfe.geometry_bytes(
+                mfe.chart_geometry(data, **kwargs))),
+            ('npz', lambda: mfe.geometry_bytes(
+                mfe.chart_geometry(data, **kwargs), fmt='npz')),
+        ]
+        for name, func in outputs:
+            payload, elapsed = best(func, args.repeat)
+            print('{:6d} {:8s} {:10.1f} {:10.1f} {:8.1f}'.format(
+                rows, name, len(payload) / 1024.0,
+                len(zlib.compress(payload)) / 1024.0, elapsed * 1000.0))
+
+
+if __name__ == '__main__':
+    main()
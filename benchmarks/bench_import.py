@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the time of a bare `import mpl_finance_ext` in a fresh
+interpreter and checks that heavy modules are not imported by it.
+
+    python benchmarks/bench_import.py --runs 10
+"""
+import argparse
+import json
+import subprocess
+import sys
+import os
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+HEAVY_MODULES = [
+    'matplotlib.pyplot',
+    'pandas',
+    'mpl_toolkits.mplot3d',
+    'mpl_finance_ext.signal_evaluation',
+    'mpl_finance_ext.candlestick_pattern_evaluation',
+    'mpl_finance_ext.angled_box_style',
+]
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import mpl_finance_ext
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'seconds': elapsed,
+    'loaded': [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_once():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    output = subprocess.check_output(
+        [sys.executable, '-c', SCRIPT], env=env)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    times = sorted(r['seconds'] * 1000.0 for r in results)
+    loaded = sorted(set(m for r in results for m in r['loaded']))
+
+    print('import mpl_finance_ext: min {:.1f} ms, median {:.1f} ms'.format(
+        times[0], times[len(times) // 2]))
+
+    if loaded:
+        print('heavy modules imported: ' + ', '.join(loaded))
+        return 1
+
+    print('no heavy modules imported')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
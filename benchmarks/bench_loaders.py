@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Load time of the columns of a chart from CSV, npy directories,
+parquet and feather files. The files are written in chunks, so
+large files like --rows 1e8 only need memory for the loaded
+columns. Parquet and feather need pyarrow.
+
+    python benchmarks/bench_loaders.py --rows 1e7
+    python benchmarks/bench_loaders.py --rows 1e8 --dir /data/bench
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mpl_finance_ext as mfe
+from synthetic import make_ohlc
+
+CHUNK = 10 ** 7
+PLOT_COLUMNS = ['MA_20']
+
+
+def chunks(rows):
+    start = 1.0
+    for i, first in enumerate(range(0, rows, CHUNK)):
+        data = make_ohlc(min(CHUNK, rows - first), seed=i, start=start)
+        start = data['close'].values[-1]
+        data['date'] = np.arange(first, first + len(data), dtype=np.int64) * 60
+        data['MA_20'] = data['close'].rolling(20, min_periods=1).mean()
+        data['spread'] = data['high'] - data['low']
+        yield first, data
+
+
+def write_files(rows, directory):
+    columns = None
+    writers = dict()
+    npy_dir = os.path.join(directory, 'npy')
+    os.makedirs(npy_dir)
+    mapped = dict()
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        pa = None
+
+    for first, data in chunks(rows):
+        if columns is None:
+            columns = list(data)
+            mapped = dict(
+                (col, np.lib.format.open_memmap(
+                    os.path.join(npy_dir, col + '.npy'), mode='w+',
+                    dtype=data[col].dtype, shape=(rows,)))
+                for col in columns
+            )
+
+        data.to_csv(
+            os.path.join(directory, 'data.csv'),
+            mode='a', header=first == 0)
+        for col in columns:
+            mapped[col][first:first + len(data)] = data[col].values
+
+        if pa is not None:
+            table = pa.Table.from_pandas(data, preserve_index=False)
+            if 'parquet' not in writers:
+                writers['parquet'] = pq.ParquetWriter(
+                    os.path.join(directory, 'data.parquet'), table.schema)
+                writers['feather'] = pa.ipc.new_file(
+                    os.path.join(directory, 'data.feather'), table.schema)
+            writers['parquet'].write_table(table, row_group_size=10 ** 6)
+            writers['feather'].write_table(table)
+
+    for writer in writers.values():
+        writer.close()
+    for array in mapped.values():
+        array.flush()
+
+    return pa is not None
+
+
+def measure(name, func):
+    start = time.perf_counter()
+    data = func()
+    elapsed = time.perf_counter() - start
+    print('{:36s} {:10.3f} {:>12d}'.format(name, elapsed, len(data)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=float, default=1e6)
+    parser.add_argument('--dir', default=None,
+                        help='Directory of the files. Default is a '
+                             'temporary directory')
+    parser.add_argument('--skip-csv', action='store_true',
+                        help='Skip the full CSV reads')
+    args = parser.parse_args()
+
+    rows = int(args.rows)
+    directory = tempfile.mkdtemp(dir=args.dir)
+    try:
+        start = time.perf_counter()
+        arrow = write_files(rows, directory)
+        print('{} rows written in {:.1f}s'.format(
+            rows, time.perf_counter() - start))
+
+        # The last 1% of the history
+        window = (int(rows * 0.99) * 60, rows * 60)
+        csv = os.path.join(directory, 'data.csv')
+
+        import pandas as pd
+        print('{:36s} {:>10s} {:>12s}'.format('loader', 'time [s]', 'rows'))
+
+        if not args.skip_csv:
+            measure('csv all columns', lambda: pd.read_csv(csv, index_col=0))
+            measure('csv chart columns', lambda: pd.read_csv(
+                csv, usecols=mfe.chart_columns(PLOT_COLUMNS, 'date')))
+
+        npy = os.path.join(directory, 'npy')
+        measure('npy chart columns', lambda: mfe.read_npy_dir(
+            npy, PLOT_COLUMNS, 'date'))
+        measure('npy chart columns, last 1%', lambda: mfe.read_npy_dir(
+            npy, PLOT_COLUMNS, 'date', *window))
+
+        if arrow:
+            for name, reader in (('parquet', mfe.read_parquet),
+                                 ('feather', mfe.read_feather)):
+                path = os.path.join(directory, 'data.' + name)
+                measure(name + ' chart columns', lambda: reader(
+                    path, PLOT_COLUMNS, 'date'))
+                measure(name + ' chart columns, last 1%', lambda: reader(
+                    path, PLOT_COLUMNS, 'date', *window))
+        else:
+            print('pyarrow is not installed, parquet and feather skipped')
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
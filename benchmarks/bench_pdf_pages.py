@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Time per page and peak memory of a multi-page PDF of minute bars with
+one page per day. write_pdf_pages reuses one styled figure, the
+baseline builds a new figure for every page.
+
+    python benchmarks/bench_pdf_pages.py --days 30
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mpl_finance_ext as mfe
+from synthetic import make_ohlc
+
+PLOT_COLUMNS = ['EMA_8']
+
+
+def fresh_figures(path, data):
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    data = mfe.add_indicators(data, PLOT_COLUMNS)
+    with PdfPages(path) as pdf:
+        for start, stop in mfe.page_windows(data.index.values, period='1D'):
+            fig, _ = mfe.plot_candlestick(
+                data.iloc[start:stop], plot_columns=PLOT_COLUMNS,
+                trading_axis=True, max_candles=500,
+                use_pyplot=False, show=False)
+            pdf.savefig(fig, facecolor=fig.get_facecolor())
+
+
+def pooled_figure(path, data):
+    mfe.write_pdf_pages(path, data, period='1D', plot_columns=PLOT_COLUMNS,
+                        max_candles=500)
+
+
+def measure(name, func, path, data, pages):
+    start = time.perf_counter()
+    func(path, data)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(path, data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print('{:16s} {:12.1f} {:12.1f}'.format(
+        name, elapsed / pages * 1000.0, peak / 1024.0 ** 2))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=10)
+    args = parser.parse_args()
+
+    rows = args.days * 24 * 60
+    data = make_ohlc(rows)
+    data.index = pd.date_range('2018-01-01', periods=rows, freq='min')
+    pages = len(mfe.page_windows(data.index.values, period='1D'))
+
+    path = os.path.join(tempfile.mkdtemp(), 'pages.pdf')
+    print('{} pages of {} bars'.format(pages, 24 * 60))
+    print('{:16s} {:>12s} {:>12s}'.format('', 'ms / page', 'peak [MB]'))
+    measure('fresh figures', fresh_figures, path, data, pages)
+    measure('write_pdf_pages', pooled_figure, path, data, pages)
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Time to add and draw the price flags of many indicator columns. The
+baseline is the former add_price_flag: dropna and tail per column,
+one dashed line and one text with its own offset transform per
+flag. PriceFlags finds all last values in one pass and draws the
+lines as one collection.
+
+    python benchmarks/bench_price_flags.py --rows 100000 --columns 40
+"""
+import argparse
+import os
+import sys
+import time
+
+import matplotlib.transforms as mtrans
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mpl_finance_ext as mfe
+
+
+def per_column(fig, ax, data, colors, last_index):
+    for col, color in zip(data, colors):
+        value = data[col].dropna().tail(1)
+        index = value.index.tolist()[0]
+        ax.plot([index, last_index], [value.values[0], value.values[0]],
+                color=color, linewidth=0.6, linestyle='--', alpha=0.6)
+        offset = mtrans.offset_copy(
+            ax.transData, fig=fig, x=0.05, y=0.0, units='inches')
+        ax.text(last_index, value.values, format(value.values[0], '.6f'),
+                size=7, va='center', ha='left', transform=offset,
+                color='white', bbox=dict(boxstyle='angled,pad=0.2',
+                                         alpha=0.6, color=color))
+
+
+def flag_manager(fig, ax, data, colors, last_index):
+    mfe.PriceFlags.of(ax).set_frame(
+        data, list(data), colors, last_index=last_index)
+
+
+def measure(func, data, colors, repeat):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    best_add, best_draw = np.inf, np.inf
+    for _ in range(repeat):
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111)
+        ax.set_xlim(0, len(data) * 1.05)
+        ax.set_ylim(0.5, 1.5)
+        fig.canvas.draw()
+
+        start = time.perf_counter()
+        func(fig, ax, data, colors, data.index[-1])
+        added = time.perf_counter()
+        fig.canvas.draw()
+        best_add = min(best_add, added - start)
+        best_draw = min(best_draw, time.perf_counter() - added)
+    return best_add * 1000.0, best_draw * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--columns', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from mpl_finance_ext.mpl_finance_ext import _register_angled_box_style
+    _register_angled_box_style()
+
+    rng = np.random.RandomState(0)
+    values = 1.0 + np.cumsum(
+        rng.normal(0, 1e-3, (args.rows, args.columns)), axis=0)
+    # Indicators with different warm-up and a few that end early
+    values[-10:, ::7] = np.nan
+    data = pd.DataFrame(
+        values, columns=['col_' + str(i) for i in range(args.columns)])
+    colors = [
+        mfe.color_set[i % len(mfe.color_set)] for i in range(args.columns)
+    ]
+
+    print('{:14s} {:>10s} {:>10s}'.format('', 'add ms', 'draw ms'))
+    for name, func in (('per column', per_column),
+                       ('PriceFlags', flag_manager)):
+        print('{:14s} {:10.1f} {:10.1f}'.format(
+            name, *measure(func, data, colors, args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Frames per second of a backtest replay. Replay draws the static layer
+once per view and blits the new bars, trades and flags. The baseline
+calls plot_candlestick on the visible window for every frame.
+
+    python benchmarks/bench_replay.py --frames 2000
+    python benchmarks/bench_replay.py --frames 2000 --video replay.mp4
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mpl_finance_ext as mfe
+from synthetic import make_ohlc, make_signals
+
+PLOT_COLUMNS = ['EMA_8', 'MA_36']
+WINDOW = 200
+
+
+def replot(data, signals, frames):
+    data = mfe.add_indicators(data, PLOT_COLUMNS)
+    for position in range(WINDOW, WINDOW + frames):
+        start = position - WINDOW + 1
+        window = data.iloc[start:position + 1]
+        fig, _ = mfe.plot_candlestick(
+            window, plot_columns=PLOT_COLUMNS,
+            signals=[s for s in signals if start <= s[1] <= position] or None,
+            use_pyplot=False, show=False)
+        fig.canvas.draw()
+
+
+def replay(data, signals, frames, writer=None):
+    replay = mfe.Replay(data, signals, plot_columns=PLOT_COLUMNS,
+                        window=WINDOW)
+    for rgba in replay.frames(WINDOW, WINDOW + frames):
+        if writer is not None:
+            writer(rgba)
+
+
+def measure(name, func, frames):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print('{:28s} {:10.1f}'.format(name, frames / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=1000)
+    parser.add_argument('--baseline-frames', type=int, default=50)
+    parser.add_argument('--video', default=None,
+                        help='Also pipe the frames into ffmpeg')
+    args = parser.parse_args()
+
+    data = make_ohlc(WINDOW + args.frames)
+    signals = make_signals(data, args.frames // 20)
+
+    print('{:28s} {:>10s}'.format('', 'fps'))
+    measure('plot_candlestick per frame',
+            lambda: replot(data, signals, args.baseline_frames),
+            args.baseline_frames)
+    measure('Replay',
+            lambda: replay(data, signals, args.frames), args.frames)
+
+    directory = tempfile.mkdtemp()
+    try:
+        writer = mfe.ImageSequenceWriter(
+            os.path.join(directory, 'frame_%05d.png'))
+        measure('Replay + png sequence',
+                lambda: replay(data, signals, args.frames, writer),
+                args.frames)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if args.video:
+        with mfe.FFmpegWriter(args.video, fps=60) as writer:
+            measure('Replay + ffmpeg',
+                    lambda: replay(data, signals, args.frames, writer),
+                    args.frames)
+
+
+if __name__ == '__main__':
+    main()
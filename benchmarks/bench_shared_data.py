@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Rendering one chart per day of a long minute series in a process
+pool. The baseline sends the DataFrame with every task, the shared
+version sends a SharedOHLC handle and workers map the same block.
+Reports the pickled bytes per task and the private memory of the
+workers (Linux only).
+
+    python benchmarks/bench_shared_data.py --days 60 --workers 4
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mpl_finance_ext as mfe
+from mpl_finance_ext.shared_data import SharedOHLC
+from synthetic import make_ohlc
+
+PLOT_COLUMNS = ['EMA_8', 'MA_36']
+
+
+def private_mb():
+    # Pages only this process uses, shared mappings are not counted
+    total = 0
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith(('Private_Clean', 'Private_Dirty')):
+                total += int(line.split()[1])
+    return total / 1024.0
+
+
+def draw(window):
+    fig, _ = mfe.plot_candlestick(
+        window, plot_columns=PLOT_COLUMNS, trading_axis=True,
+        max_candles=500, use_pyplot=False, show=False)
+    fig.canvas.draw()
+    return private_mb()
+
+
+def render_copy(args):
+    data, start, stop = args
+    return draw(data.iloc[start:stop])
+
+
+def render_shared(args):
+    shared, start, stop = args
+    return draw(shared.rows(start, stop))
+
+
+def run(name, func, tasks, workers):
+    size = len(pickle.dumps(tasks[0]))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        memory = list(pool.map(func, tasks))
+    elapsed = time.perf_counter() - start
+    print('{:10s} {:14.1f} {:12.1f} {:16.1f}'.format(
+        name, size / 1024.0, elapsed / len(tasks) * 1000.0, max(memory)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    rows = args.days * 24 * 60
+    data = make_ohlc(rows)
+    data.index = pd.date_range('2018-01-01', periods=rows, freq='min')
+    data = mfe.add_indicators(data, PLOT_COLUMNS)
+    days = mfe.page_windows(data.index.values, period='1D')
+
+    print('{} windows, {:.1f} MB of data'.format(
+        len(days), data.memory_usage().sum() / 1024.0 ** 2))
+    print('{:10s} {:>14s} {:>12s} {:>16s}'.format(
+        '', 'task [kB]', 'ms / chart', 'worker priv [MB]'))
+
+    run('copy', render_copy,
+        [(data, start, stop) for start, stop in days], args.workers)
+
+    with SharedOHLC.create(data, plot_columns=PLOT_COLUMNS) as shared:
+        run('shared', render_shared,
+            [(shared, start, stop) for start, stop in days], args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+File size and save time of svg/pdf exports of a candlestick chart
+with and without the compact vector options.
+
+    python benchmarks/bench_vector_export.py --rows 50000
+"""
+import argparse
+import io
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mpl_finance_ext as mfe
+from synthetic import make_ohlc
+
+MODES = [
+    ('vector', {}),
+    ('merged wicks', {'merge_wicks': True}),
+    ('rasterized', {'rasterize_data': True}),
+    ('rasterized + merged wicks', {'rasterize_data': True,
+                                   'merge_wicks': True}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--dpi', type=int, default=150)
+    parser.add_argument('--formats', default='svg,pdf')
+    args = parser.parse_args()
+
+    data = make_ohlc(args.rows)
+    data['MA_50'] = data['close'].rolling(50).mean()
+
+    print('{} candles, raster dpi {}'.format(args.rows, args.dpi))
+    print('{:28s} {:>6s} {:>12s} {:>10s}'.format(
+        'mode', 'format', 'size [kB]', 'save [s]'))
+
+    for fmt in args.formats.split(','):
+        for name, options in MODES:
+            fig, _ = mfe.plot_candlestick(
+                data, plot_columns=['MA_50'],
+                use_pyplot=False, **options)
+
+            buf = io.BytesIO()
+            start = time.perf_counter()
+            fig.savefig(buf, format=fmt, dpi=args.dpi)
+            elapsed = time.perf_counter() - start
+
+            print('{:28s} {:>6s} {:12.1f} {:10.2f}'.format(
+                name, fmt, len(buf.getvalue()) / 1024.0, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Load test of the chart rendering service. Clients request charts of
+a small set of windows, so identical requests repeat and overlap and
+are answered from the cache or coalesced with the render in flight.
+Without --url a server with a parquet file of synthetic minute bars
+is started in this process.
+
+    python benchmarks/load_test_server.py --clients 16 --requests 400
+    python benchmarks/load_test_server.py --url http://127.0.0.1:8765 \
+        --source btc --start 2018-01-01 --days 10
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.request import Request
+from urllib.request import urlopen
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mpl_finance_ext.server import ChartService
+from mpl_finance_ext.server import ChartSource
+from mpl_finance_ext.server import make_server
+from synthetic import make_ohlc
+
+
+def windows(start, days, count):
+    # One day of minute bars per window
+    first = pd.Timestamp(start)
+    return [
+        (str(first + pd.Timedelta(days=d)),
+         str(first + pd.Timedelta(days=d + 1)))
+        for d in np.linspace(0, days - 1, count).astype(int)
+    ]
+
+
+def client(url, source, windows, requests, results, rng):
+    for _ in range(requests):
+        start, stop = windows[rng.randint(len(windows))]
+        body = json.dumps({
+            'source': source,
+            'start': start,
+            'stop': stop,
+            'columns': ['EMA_8'],
+            'signals': [['BUY', start, 1.0]],
+        }).encode()
+        request = Request(url + '/render', data=body,
+                          headers={'Content-Type': 'application/json'})
+        begin = time.perf_counter()
+        try:
+            with urlopen(request) as response:
+                response.read()
+        except HTTPError as e:
+            results.append((e.code, None))
+            continue
+        results.append((200, time.perf_counter() - begin))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default=None)
+    parser.add_argument('--source', default='synthetic')
+    parser.add_argument('--start', default='2018-01-01')
+    parser.add_argument('--days', type=int, default=10)
+    parser.add_argument('--windows', type=int, default=8)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=320)
+    parser.add_argument('--pool-size', type=int, default=4)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        rows = args.days * 24 * 60
+        data = make_ohlc(rows)
+        data.insert(0, 'date', pd.date_range(
+            args.start, periods=rows, freq='min'))
+        path = os.path.join(tempfile.mkdtemp(), 'bars.parquet')
+        data.to_parquet(path, index=False)
+
+        service = ChartService(
+            {args.source: ChartSource(path)}, pool_size=args.pool_size)
+        server = make_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+
+    results = list()
+    threads = [
+        threading.Thread(target=client, args=(
+            url, args.source, windows(args.start, args.days, args.windows),
+            args.requests // args.clients, results,
+            np.random.RandomState(i)))
+        for i in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    done = np.array([t for code, t in results if code == 200]) * 1000.0
+    failed = len(results) - len(done)
+    print('{:>8s} {:>8s} {:>8s} {:>8s} {:>8s}'.format(
+        'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'failed'))
+    print('{:8.1f} {:8.1f} {:8.1f} {:8.1f} {:8d}'.format(
+        len(done) / elapsed, np.percentile(done, 50),
+        np.percentile(done, 95), np.percentile(done, 99), failed))
+
+    with urlopen(url + '/metrics') as response:
+        metrics = json.loads(response.read().decode())
+    print('renders {}, coalesced {}, hit rate {:.1%}'.format(
+        metrics['renders'], metrics['coalesced'],
+        metrics['cache']['hit_rate']))
+
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for all public plotting functions on the Agg backend.
+
+For every function and size it measures
+    - time to figure: call of the plotting function
+    - time to png: savefig into memory
+    - peak memory: traced by tracemalloc in a separate run
+
+    python benchmarks/run_benchmarks.py --sizes 1e3,1e4,1e5 --output new.json
+    python benchmarks/run_benchmarks.py --compare old.json --output new.json
+
+The golden image check renders every function on a small fixed dataset
+and compares the pixels with the images in --golden-dir. A missing or
+different image makes the run fail. benchmarks/golden holds the images
+of the charts before the optimizations, update them with
+--update-golden only for an intended change of the output.
+"""
+import argparse
+import datetime
+import gc
+import io
+import json
+import platform
+import sys
+import os
+import time
+import tracemalloc
+
+import matplotlib
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mpl_finance_ext as mfe
+from synthetic import make_ohlc, make_patterns, make_signals, PATTERN_NAMES
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'golden')
+GOLDEN_ROWS = 300
+
+# Functions that draw one artist per row are limited
+MAX_ROWS = {
+    'scatter_3d': 10 ** 4,
+}
+
+
+def ohlc_case(n):
+    data = make_ohlc(n)
+    data['MA_20'] = data['close'].rolling(20).mean()
+    data['MA_50'] = data['close'].rolling(50).mean()
+    return data
+
+
+def prepare(entry, n):
+    # Returns a function that draws the chart and returns the figure
+    rng = np.random.RandomState(1)
+    options = {'use_pyplot': False, 'show': False}
+
+    if entry in ('plot_candlestick', 'plot_filled_ohlc'):
+        data = ohlc_case(n)
+        signals = make_signals(data, max(1, min(n // 50, 2000)))
+        patterns = make_patterns(data, max(1, min(n // 200, 500)))
+        func = getattr(mfe, entry)
+        return lambda: func(
+            data, signals=signals, cs_patterns=patterns,
+            plot_columns=['MA_20', 'MA_50'], **options)[0]
+
+    if entry == 'plot':
+        data = ohlc_case(n)
+        return lambda: mfe.plot(
+            data, plot_columns=['close', 'MA_20', 'MA_50'],
+            **options)[0]
+
+    if entry == 'bar':
+        data = [PATTERN_NAMES[i] for i in rng.randint(len(PATTERN_NAMES), size=n)]
+        return lambda: mfe.bar(data, **options)[0]
+
+    if entry == 'hist':
+        data = rng.normal(0, 1, n)
+        return lambda: mfe.hist(data, bins=50, threshold=0, **options)[0]
+
+    if entry == 'scatter':
+        data = list(zip(rng.normal(0, 1, n), rng.normal(0, 1, n)))
+        return lambda: mfe.scatter(data, legend=False, **options)[0]
+
+    if entry == 'scatter_3d':
+        data = list(zip(*rng.normal(0, 1, (3, n))))
+        classes = rng.randint(2, size=n)
+        return lambda: mfe.scatter_3d(
+            data, class_conditions=classes, threshold=0, **options)[0]
+
+    raise ValueError('Unknown entry point ' + entry)
+
+
+ENTRY_POINTS = [
+    'plot_candlestick', 'plot_filled_ohlc', 'plot',
+    'bar', 'hist', 'scatter', 'scatter_3d',
+]
+
+
+def to_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', facecolor=fig.get_facecolor())
+    return buf.getvalue()
+
+
+def measure(entry, n):
+    draw = prepare(entry, n)
+    gc.collect()
+
+    start = time.perf_counter()
+    fig = draw()
+    time_to_figure = time.perf_counter() - start
+    to_png(fig)
+    time_to_png = time.perf_counter() - start
+    del fig
+    gc.collect()
+
+    tracemalloc.start()
+    to_png(draw())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'entry': entry,
+        'rows': n,
+        'time_to_figure': time_to_figure,
+        'time_to_png': time_to_png,
+        'peak_memory': peak,
+    }
+
+
+def golden_check(entries, directory, update):
+    import matplotlib.image as mimage
+
+    if update and not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    failed = list()
+    for entry in entries:
+        png = to_png(prepare(entry, GOLDEN_ROWS)())
+        path = os.path.join(directory, entry + '.png')
+
+        if update:
+            with open(path, 'wb') as f:
+                f.write(png)
+            print('golden image written: ' + path)
+            continue
+
+        if not os.path.exists(path):
+            failed.append(entry)
+            print('golden image missing: ' + path)
+            continue
+
+        expected = mimage.imread(path)
+        actual = mimage.imread(io.BytesIO(png))
+        if expected.shape != actual.shape or \
+                not np.array_equal(expected, actual):
+            failed.append(entry)
+            print('golden image differs: ' + entry)
+        else:
+            print('golden image ok:      ' + entry)
+
+    return failed
+
+
+def compare(results, path):
+    with open(path) as f:
+        previous = json.load(f)['results']
+    old = dict(((r['entry'], r['rows']), r) for r in previous)
+
+    print('\ncomparison with ' + path + ' (new / old)')
+    for result in results:
+        before = old.get((result['entry'], result['rows']), None)
+        if before is None:
+            continue
+        print('{:18s} {:>10d}  figure {:5.2f}x  png {:5.2f}x  memory {:5.2f}x'.format(
+            result['entry'], result['rows'],
+            result['time_to_figure'] / before['time_to_figure'],
+            result['time_to_png'] / before['time_to_png'],
+            result['peak_memory'] / float(max(before['peak_memory'], 1))))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1e3,1e4,1e5',
+                        help='Comma separated row counts up to 1e7')
+    parser.add_argument('--entries', default=','.join(ENTRY_POINTS))
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--compare', default=None)
+    parser.add_argument('--golden-dir', default=GOLDEN_DIR)
+    parser.add_argument('--update-golden', action='store_true')
+    parser.add_argument('--skip-golden', action='store_true')
+    args = parser.parse_args()
+
+    sizes = [int(float(size)) for size in args.sizes.split(',')]
+    entries = args.entries.split(',')
+
+    failed = list()
+    if not args.skip_golden:
+        failed = golden_check(entries, args.golden_dir, args.update_golden)
+
+    results = list()
+    print('\n{:18s} {:>10s} {:>12s} {:>12s} {:>12s}'.format(
+        'entry', 'rows', 'figure [s]', 'png [s]', 'peak [MB]'))
+    for entry in entries:
+        for n in sizes:
+            if n > MAX_ROWS.get(entry, n):
+                continue
+            result = measure(entry, n)
+            results.append(result)
+            print('{:18s} {:>10d} {:12.3f} {:12.3f} {:12.1f}'.format(
+                entry, n, result['time_to_figure'], result['time_to_png'],
+                result['peak_memory'] / 1024.0 ** 2))
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'date': datetime.datetime.now().isoformat(),
+                    'python': platform.python_version(),
+                    'matplotlib': matplotlib.__version__,
+                    'numpy': np.__version__,
+                    'backend': 'agg',
+                },
+                'results': results,
+            }, f, indent=2)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
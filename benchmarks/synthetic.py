@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+
+def make_ohlc(n, seed=0, start=1.0):
+    """
+    Creates a random walk OHLC DataFrame with an integer index
+    :param n: Number of rows
+    :param seed: Seed of the random generator
+    :param start: First open price
+    :return: pandas.DataFrame with open, high, low, close and volume
+    """
+    rng = np.random.RandomState(seed)
+    close = start * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open = np.empty(n)
+    open[0] = start
+    open[1:] = close[:-1]
+    spread = np.abs(rng.normal(0, 0.001, n)) * close
+    high = np.maximum(open, close) + spread
+    low = np.minimum(open, close) - spread
+    volume = rng.gamma(2.0, 1000.0, n)
+
+    return pd.DataFrame({
+        'open': open,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume,
+    })
+
+
+def make_signals(data, count, seed=0):
+    """
+    Creates alternating BUY and SELL signals at random rows
+    :param data: DataFrame from make_ohlc
+    :param count: Number of BUY/SELL pairs
+    :param seed: Seed of the random generator
+    :return: List of signals like [('BUY', index, price), ...]
+    """
+    rng = np.random.RandomState(seed)
+    count = min(count, len(data) // 2)
+    rows = np.sort(rng.choice(len(data), count * 2, replace=False))
+    close = data['close'].values
+
+    return [
+        ('BUY' if i % 2 == 0 else 'SELL', int(row), float(close[row]))
+        for i, row in enumerate(rows)
+    ]
+
+
+PATTERN_NAMES = [
+    'bearish_hanging_man', 'bullish_hammer',
+    'bearish_dark_cloud_cover', 'bullish_piercing_line',
+    'bullish_morning_star', 'inverted_hammer',
+]
+
+
+def make_patterns(data, count, seed=0):
+    """
+    Creates candlestick patterns spanning one to three rows
+    :param data: DataFrame from make_ohlc
+    :param count: Number of patterns
+    :param seed: Seed of the random generator
+    :return: List of patterns like [['name', start, stop], ...]
+    """
+    rng = np.random.RandomState(seed)
+    count = min(count, len(data) // 4)
+    starts = np.sort(rng.choice(len(data) - 3, count, replace=False))
+
+    return [
+        [PATTERN_NAMES[rng.randint(len(PATTERN_NAMES))],
+         int(start), int(start + rng.randint(3))]
+        for start in starts
+    ]
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Renders charts in a thread pool and compares every image with
+the image of the same chart rendered single-threaded.
+
+    python benchmarks/thread_stress.py --charts 64 --workers 8
+"""
+import argparse
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mpl_finance_ext as mfe
+from synthetic import make_ohlc
+
+
+def render(job):
+    kind, seed = job
+    data = make_ohlc(300, seed=seed)
+    data['MA_20'] = data['close'].rolling(20).mean()
+
+    if kind == 'candlestick':
+        fig, _ = mfe.plot_candlestick(
+            data=data, plot_columns=['MA_20'],
+            signals=[('BUY', 50, data['close'][50]),
+                     ('SELL', 120, data['close'][120])],
+            name='chart ' + str(seed), use_pyplot=False)
+    elif kind == 'filled_ohlc':
+        fig, _ = mfe.plot_filled_ohlc(
+            data=data, plot_columns=['MA_20'],
+            name='chart ' + str(seed), use_pyplot=False)
+    elif kind == 'plot':
+        fig, _ = mfe.plot(
+            data=data, plot_columns=['close', 'MA_20'],
+            gradient_fill=True, use_pyplot=False)
+    elif kind == 'hist':
+        fig, _ = mfe.hist(
+            data=data['close'].pct_change().dropna().values,
+            bins=30, threshold=0, use_pyplot=False)
+    else:
+        fig, _ = mfe.bar(
+            data=['a', 'b', 'a', 'c', str(seed % 3)],
+            use_pyplot=False)
+
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba()).copy()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--charts', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    kinds = ['candlestick', 'filled_ohlc', 'plot', 'hist', 'bar']
+    jobs = [(kinds[i % len(kinds)], i) for i in range(args.charts)]
+
+    reference = [render(job) for job in jobs]
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        parallel = list(executor.map(render, jobs))
+
+    failed = [
+        job for job, a, b in zip(jobs, reference, parallel)
+        if a.shape != b.shape or not np.array_equal(a, b)
+    ]
+
+    print('{} charts, {} workers, {} mismatches'.format(
+        len(jobs), args.workers, len(failed)))
+    for job in failed:
+        print('  mismatch: {} seed={}'.format(*job))
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,86 +9,6 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import mpl_finance_ext as mfe
 
 
-# The following indicator functions are copied (but modified) from
-# the pandas-technical-indicators repository by Crypto-toolbox:
-# https://github.com/Crypto-toolbox/pandas-technical-indicators
-
-
-def relative_strength_index(df, n):
-    """Calculate Relative Strength Index(RSI) for given data.
-    :param df: pandas.DataFrame
-    :param n:
-    :return: pandas.DataFrame
-    """
-    i = df.index[0]
-    UpI = [0]
-    DoI = [0]
-    while i + 1 <= df.index[-1]:
-        UpMove = float(df.loc[i + 1, 'high']) - float(df.loc[i, 'high'])
-        DoMove = float(df.loc[i, 'low']) - float(df.loc[i + 1, 'low'])
-        if UpMove > DoMove and UpMove > 0:
-            UpD = UpMove
-        else:
-            UpD = 0
-        UpI.append(UpD)
-        if DoMove > UpMove and DoMove > 0:
-            DoD = DoMove
-        else:
-            DoD = 0
-        DoI.append(DoD)
-        i = i + 1
-    UpI = pd.Series(UpI)
-
-    DoI = pd.Series(DoI)
-    PosDI = pd.Series(UpI.ewm(span=n, min_periods=n).mean())
-    NegDI = pd.Series(DoI.ewm(span=n, min_periods=n).mean())
-
-    # rsi = pd.Series(PosDI / (PosDI + NegDI), name='RSI_' + str(n))
-    rsi = pd.DataFrame(PosDI / (PosDI + NegDI), columns=['RSI_' + str(n)])
-    rsi = rsi.set_index(df.index)
-    df = df.join(rsi)
-    return df
-
-
-def bollinger_bands(df, n, std):
-    """
-    :param df: pandas.DataFrame
-    :param n:
-    :return: pandas.DataFrame
-    """
-
-    ave = df['close'].rolling(window=n, center=False).mean()
-    sd = df['close'].rolling(window=n, center=False).std()
-    upband = pd.Series(ave + (sd * std), name='bband_upper_' + str(n))
-    dnband = pd.Series(ave - (sd * std), name='bband_lower_' + str(n))
-    ave = pd.Series(ave, name='bband_ave_' + str(n))
-
-    df = df.join(pd.concat([upband, dnband, ave], axis=1))
-    return df
-
-
-def moving_average(df, n):
-    """Calculate the moving average for the given data.
-    :param df: pandas.DataFrame
-    :param n:
-    :return: pandas.DataFrame
-    """
-    MA = pd.Series(df['close'].rolling(n, min_periods=n).mean(), name='MA_' + str(n))
-    df = df.join(MA)
-    return df
-
-
-def exponential_moving_average(df, n):
-    """
-    :param df: pandas.DataFrame
-    :param n:
-    :return: pandas.DataFrame
-    """
-    EMA = pd.Series(df['close'].ewm(span=n, min_periods=n).mean(), name='EMA_' + str(n))
-    df = df.join(EMA)
-    return df
-
-
 # The following functoins contain the examples:
 
 
@@ -295,10 +215,14 @@ if __name__ == "__main__":
     data = pd.read_csv('BTC_XRP_5min.csv', index_col=0)
 
     # Calculate indicators ---------------------------------------
-    data = relative_strength_index(df=data, n=14)
-    data = bollinger_bands(df=data, n=20, std=4)
-    data = exponential_moving_average(df=data, n=8)
-    data = moving_average(df=data, n=36)
+    # Missing indicator columns in plot_columns are computed by
+    # the plot functions as well. Here they are added once for
+    # all examples.
+    data = mfe.add_indicators(
+        data, ['RSI_14', 'bband_upper_20', 'bband_lower_20',
+               'EMA_8', 'MA_36'],
+        bband_std=4
+    )
 
     # Set signals ------------------------------------------------
     # Structure: [(signal, index, price), ... ].
@@ -13,6 +13,7 @@ from .mpl_finance_ext import bar
 from .mpl_finance_ext import fancy_design
 from .mpl_finance_ext import green
 from .mpl_finance_ext import hist
+from .mpl_finance_ext import scatter
 from .mpl_finance_ext import scatter_3d
 from .mpl_finance_ext import label_colors
 from .mpl_finance_ext import plot
@@ -22,3 +23,65 @@ from .mpl_finance_ext import red
 from .mpl_finance_ext import color_set
 from .mpl_finance_ext import plot_vline
 from .mpl_finance_ext import plot_vspan
+
+from .async_render import AsyncRenderer
+from .async_render import default_renderer
+from .async_render import render_candlestick
+from .async_render import render_filled_ohlc
+from .async_render import render_plot
+from .bars import BarBuilder
+from .bars import heikin_ashi
+from .bars import range_bars
+from .bars import renko
+from .chart_spec import ChartSpec
+from .figure_pool import FigurePool
+from .figure_pool import PooledFigure
+from .render_cache import RenderCache
+from .render_cache import render_image
+from .export import export_figure
+from .export import write_figure
+from .geometry import chart_geometry
+from .geometry import geometry_bytes
+from .geometry import read_geometry
+from .geometry import write_geometry
+from .gradient import composite_gradient_fill
+from .gradient import envelope
+from .gradient import gradient_fill
+from .indicators import add_indicators
+from .indicators import atr
+from .indicators import bollinger_bands
+from .indicators import clear_indicator_cache
+from .indicators import ema
+from .indicators import indicator_columns
+from .indicators import macd
+from .indicators import rsi
+from .indicators import sma
+from .incremental import IncrementalATR
+from .incremental import IncrementalBollinger
+from .incremental import IncrementalEMA
+from .incremental import IncrementalIndicator
+from .incremental import IncrementalMACD
+from .incremental import IncrementalRSI
+from .incremental import IncrementalSMA
+from .incremental import IndicatorStream
+from .incremental import indicator_state
+from .loaders import chart_columns
+from .loaders import read_feather
+from .loaders import read_npy_dir
+from .loaders import read_parquet
+from .loaders import write_npy_dir
+from .paginate import page_windows
+from .paginate import write_pdf_pages
+from .price_flags import PriceFlags
+from .pyramid import OHLCPyramid
+from .pyramid import aggregate_ohlc
+from .replay import FFmpegWriter
+from .replay import ImageSequenceWriter
+from .replay import Replay
+from .shared_data import SharedOHLC
+from .shared_data import window_overlays
+from .trading_axis import TradingAxis
+from .profiling import StageProfiler
+from .profiling import add_stage_callback
+from .profiling import profile_draw
+from .profiling import remove_stage_callback
@@ -0,0 +1,327 @@
+import functools
+import logging
+import threading
+
+from .mpl_finance_ext import plot
+from .mpl_finance_ext import plot_candlestick
+from .mpl_finance_ext import plot_filled_ohlc
+from .render_cache import RenderCache
+from .render_cache import render_image
+
+logger = logging.getLogger('mpl_finance_ext')
+
+
+class _LoopState(object):
+    # asyncio primitives belong to one event loop
+
+    def __init__(self, loop, max_workers):
+        import asyncio
+        self.loop = loop
+        self.workers = asyncio.Semaphore(max_workers)
+        self.inflight = dict()
+
+
+def _forget(inflight, key, entry, task):
+    if inflight.get(key, None) is entry:
+        del inflight[key]
+
+
+class AsyncRenderer(object):
+    """
+    Renders charts for asyncio applications without blocking the
+    event loop. The charts are rendered in a bounded executor of
+    threads or processes:
+
+        renderer = AsyncRenderer(max_workers=4)
+        png = await renderer.render(
+            plot_candlestick, data, plot_columns=['EMA_8'])
+
+    Identical requests that are rendered at the same time share
+    one render, the key is RenderCache.key(). Finished images are
+    kept in the RenderCache.
+
+    Back-pressure: at most max_workers charts are rendered at the
+    same time and at most max_queue wait for a worker. Further
+    requests raise a RuntimeError at once, e.g. to answer with
+    HTTP 503.
+
+    Cancellation: a cancelled request stops waiting. The render is
+    cancelled when no other request waits for it. A render that
+    already runs in a worker finishes, its image is still cached
+    and it keeps its worker and its place in the queue until it
+    ends.
+    """
+
+    def __init__(self, max_workers=4, max_queue=64, executor='thread',
+                 cache=None):
+        """
+        :param max_workers: Number of charts rendered at the same
+            time
+        :param max_queue: Number of renders that wait for a worker
+        :param executor: 'thread', 'process' or a
+            concurrent.futures.Executor. Processes need picklable
+            data and plot functions
+        :param cache: RenderCache. Default is a RenderCache with
+            the default size
+        """
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1')
+        if max_queue < 0:
+            raise ValueError('max_queue must not be negative')
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.cache = RenderCache() if cache is None else cache
+
+        self._own_executor = isinstance(executor, str)
+        if executor == 'thread':
+            from concurrent.futures import ThreadPoolExecutor
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        elif executor == 'process':
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+        elif self._own_executor:
+            raise ValueError('Unknown executor ' + executor)
+        self.executor = executor
+
+        self._state = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self.renders = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def _loop_state(self):
+        # asyncio is imported on first use, it takes as long to
+        # import as the rest of the package
+        import asyncio
+        loop = asyncio.get_event_loop()
+        state = self._state
+        if state is None or state.loop is not loop:
+            state = self._state = _LoopState(loop, self.max_workers)
+        return state
+
+    def _done(self):
+        with self._lock:
+            self._pending -= 1
+
+    async def _render(self, state, key, fmt, job):
+        import asyncio
+        try:
+            await state.workers.acquire()
+        except asyncio.CancelledError:
+            # Cancelled while waiting for a worker
+            self.cancelled += 1
+            self._done()
+            raise
+
+        stored = state.loop.create_future()
+        try:
+            rendered = state.loop.run_in_executor(self.executor, job)
+        except Exception:
+            # e.g. the executor was shut down
+            state.workers.release()
+            self.failed += 1
+            self._done()
+            raise
+        rendered.add_done_callback(functools.partial(
+            self._rendered, state, key, fmt, stored))
+
+        try:
+            # A cancelled request doesn't stop the render in the
+            # worker, see _rendered
+            return await asyncio.shield(stored)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+    def _rendered(self, state, key, fmt, stored, rendered):
+        # Done callback of the executor future. The worker and the
+        # queue slot are only free when the render really ended,
+        # also if the request was cancelled before.
+        state.workers.release()
+        if rendered.cancelled() or rendered.exception() is not None:
+            if rendered.cancelled():
+                stored.cancel()
+            else:
+                self.failed += 1
+                stored.set_exception(rendered.exception())
+            self._done()
+            return
+
+        self.renders += 1
+        image = rendered.result()
+        # The cache may write a file, not on the event loop
+        put = state.loop.run_in_executor(
+            None, self.cache.put, key, image, fmt)
+        put.add_done_callback(functools.partial(
+            self._stored, stored, image))
+
+    def _stored(self, stored, image, put):
+        self._done()
+        if put.cancelled() or put.exception() is not None:
+            logger.warning('Image not cached: ' + repr(
+                None if put.cancelled() else put.exception()))
+        if not stored.cancelled():
+            stored.set_result(image)
+
+    async def render(self, func, data, signals=None, cs_patterns=None,
+                     plot_columns=None, fmt='png', dpi=None, **kwargs):
+        """
+        Returns the image of a chart
+        :param func: plot_candlestick, plot_filled_ohlc or plot
+        :param data: Pandas DataFrame
+        :param signals: Signals (see plot_candlestick)
+        :param cs_patterns: Candlestick patterns
+        :param plot_columns: Columns
+        :param fmt: Image format like 'png' or 'svg'
+        :param dpi: Dots per inch
+        :param kwargs: kwargs of the plot function
+        :return: Bytes
+        """
+        import asyncio
+        state = self._loop_state()
+        # Hashing the data and reading the cache directory take
+        # time, both run in the default executor of the loop
+        key = await state.loop.run_in_executor(None, functools.partial(
+            self.cache.key, func, data, signals=signals,
+            cs_patterns=cs_patterns, plot_columns=plot_columns,
+            fmt=fmt, dpi=dpi, **kwargs
+        ))
+
+        image = await state.loop.run_in_executor(
+            None, self.cache.get, key, fmt)
+        if image is not None:
+            return image
+
+        entry = state.inflight.get(key, None)
+        if entry is None:
+            with self._lock:
+                if self._pending >= self.max_workers + self.max_queue:
+                    self.rejected += 1
+                    raise RuntimeError('Render queue is full')
+                self._pending += 1
+
+            job = functools.partial(
+                render_image, func, data, signals=signals,
+                cs_patterns=cs_patterns, plot_columns=plot_columns,
+                fmt=fmt, dpi=dpi, **kwargs
+            )
+            task = state.loop.create_task(
+                self._render(state, key, fmt, job))
+            # [task, number of waiting requests]
+            entry = state.inflight[key] = [task, 0]
+            task.add_done_callback(functools.partial(
+                _forget, state.inflight, key, entry))
+        else:
+            self.coalesced += 1
+
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and entry[1] == 1:
+                # New requests start a new render
+                if state.inflight.get(key, None) is entry:
+                    del state.inflight[key]
+                task.cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    def stats(self):
+        """
+        :return: Dictionary with the counters of the renderer and
+            of the cache
+        """
+        stats = {
+            'renders': self.renders,
+            'coalesced': self.coalesced,
+            'rejected': self.rejected,
+            'cancelled': self.cancelled,
+            'failed': self.failed,
+            'pending': self._pending,
+        }
+        stats.update(
+            ('cache_' + k, v) for k, v in self.cache.stats().items())
+        return stats
+
+    def close(self, wait=True):
+        """
+        Shuts the executor down if it was created by the renderer
+        :param wait: Wait for running renders
+        """
+        if self._own_executor:
+            self.executor.shutdown(wait=wait)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_renderer():
+    """
+    The renderer of render_candlestick(), render_filled_ohlc()
+    and render_plot(). It is created on first use with 4 threads.
+    :return: AsyncRenderer
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = AsyncRenderer()
+        return _default
+
+
+async def render_candlestick(data, signals=None, cs_patterns=None,
+                             plot_columns=None, renderer=None, **kwargs):
+    """
+    Async version of plot_candlestick that returns the image
+        png = await render_candlestick(data, plot_columns=['EMA_8'])
+    :param data: Pandas DataFrame
+    :param signals: Signals
+    :param cs_patterns: Candlestick patterns
+    :param plot_columns: Columns
+    :param renderer: AsyncRenderer. Default is default_renderer()
+    :param kwargs: fmt, dpi and kwargs of plot_candlestick
+    :return: Bytes
+    """
+    renderer = renderer or default_renderer()
+    return await renderer.render(
+        plot_candlestick, data, signals=signals, cs_patterns=cs_patterns,
+        plot_columns=plot_columns, **kwargs)
+
+
+async def render_filled_ohlc(data, signals=None, cs_patterns=None,
+                             plot_columns=None, renderer=None, **kwargs):
+    """
+    Async version of plot_filled_ohlc that returns the image
+    :param data: Pandas DataFrame
+    :param signals: Signals
+    :param cs_patterns: Candlestick patterns
+    :param plot_columns: Columns
+    :param renderer: AsyncRenderer. Default is default_renderer()
+    :param kwargs: fmt, dpi and kwargs of plot_filled_ohlc
+    :return: Bytes
+    """
+    renderer = renderer or default_renderer()
+    return await renderer.render(
+        plot_filled_ohlc, data, signals=signals, cs_patterns=cs_patterns,
+        plot_columns=plot_columns, **kwargs)
+
+
+async def render_plot(data, plot_columns=None, renderer=None, **kwargs):
+    """
+    Async version of plot that returns the image
+    :param data: Pandas DataFrame
+    :param plot_columns: Columns
+    :param renderer: AsyncRenderer. Default is default_renderer()
+    :param kwargs: fmt, dpi and kwargs of plot
+    :return: Bytes
+    """
+    renderer = renderer or default_renderer()
+    return await renderer.render(
+        plot, data, plot_columns=plot_columns, **kwargs)
@@ -0,0 +1,400 @@
+import numpy as np
+
+from .indicators import _linear_recurrence
+from .pyramid import _to_period
+
+_FIELDS = ('key', 'time', 'open', 'high', 'low', 'close', 'volume', 'ticks')
+
+
+def _aggregate(keys, time, price, volume):
+    # One bar per run of equal keys
+    n = len(keys)
+    change = np.empty(n, dtype=bool)
+    change[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=change[1:])
+    starts = np.flatnonzero(change)
+    ends = np.empty_like(starts)
+    ends[:-1] = starts[1:] - 1
+    ends[-1] = n - 1
+
+    return {
+        'key': keys[starts],
+        'time': time[starts],
+        'open': price[starts],
+        'high': np.maximum.reduceat(price, starts),
+        'low': np.minimum.reduceat(price, starts),
+        'close': price[ends],
+        'volume': np.add.reduceat(volume, starts),
+        'ticks': ends - starts + 1,
+    }
+
+
+class BarBuilder(object):
+    """
+    Builds OHLC bars from trade ticks chunk by chunk. Every chunk
+    is aggregated with vectorized numpy operations. The last,
+    unfinished bar of a chunk is carried over and merged with
+    the first ticks of the next chunk, so the bars don't depend
+    on the chunk size. Memory is bounded by the chunk size:
+
+        builder = BarBuilder('time', '5min')
+        for bars in builder.read_csv('ticks.csv', 'time', 'price',
+                                     'amount'):
+            ...
+        plot_candlestick(bars)
+
+    Bar types:
+        'time': Bars of a fixed period. size is in the unit of
+            the times or, for datetime64 times, like '5min'
+        'tick': Bars of size ticks
+        'volume': Bars of size volume. A bar contains the ticks
+            whose cumulative volume before the tick is in
+            [k * size, (k + 1) * size), so a large trade does not
+            shift the following bars
+    """
+
+    def __init__(self, kind='time', size=60, time_column='date'):
+        """
+        :param kind: 'time', 'tick' or 'volume'
+        :param size: Period, number of ticks or volume of a bar
+        :param time_column: Name of the time column of the bars
+        """
+        if kind not in ('time', 'tick', 'volume'):
+            raise ValueError('Unknown bar type ' + str(kind))
+
+        self.kind = kind
+        self.size = size
+        self.time_column = time_column
+
+        self._period = None
+        self._datetime = None
+        self._carry = None
+        self._ticks = 0
+        self._volume = 0.0
+
+    def _keys(self, time, volume):
+        n = len(time)
+        if self.kind == 'time':
+            if self._period is None:
+                self._period = _to_period(self.size, self._datetime)
+            if self._datetime:
+                keys = time // self._period
+            else:
+                keys = np.floor(time / self._period).astype(np.int64)
+            if np.any(keys[1:] < keys[:-1]) or (
+                    self._carry is not None and
+                    keys[0] < self._carry['key']):
+                raise ValueError('Ticks must be sorted by time')
+            return keys
+
+        if self.kind == 'tick':
+            keys = (self._ticks + np.arange(n, dtype=np.int64)) \
+                // int(self.size)
+            self._ticks += n
+            return keys
+
+        before = np.cumsum(volume)
+        before -= volume
+        before += self._volume
+        self._volume = before[-1] + volume[-1]
+        return np.floor(before / self.size).astype(np.int64)
+
+    def _frame(self, bars):
+        import pandas as pd
+
+        time = bars['time']
+        if self.kind == 'time' and self._period is not None:
+            time = bars['key'] * self._period
+        if self._datetime:
+            time = np.asarray(time, dtype=np.int64).view('datetime64[ns]')
+
+        data = pd.DataFrame({
+            self.time_column: time,
+            'open': bars['open'],
+            'high': bars['high'],
+            'low': bars['low'],
+            'close': bars['close'],
+            'volume': bars['volume'],
+            'ticks': bars['ticks'],
+        })
+        return data
+
+    def push(self, time, price, volume=None):
+        """
+        Adds a chunk of ticks
+        :param time: Array of times. Numbers or datetime64
+        :param price: Array of prices
+        :param volume: Array of volumes. Default is 1 per tick
+        :return: Pandas DataFrame of the bars that were finished
+            by this chunk with the columns time_column, open,
+            high, low, close, volume and ticks
+        """
+        time = np.asarray(time)
+        price = np.asarray(price, dtype=float)
+        volume = np.ones(len(price)) if volume is None \
+            else np.asarray(volume, dtype=float)
+
+        if self._datetime is None:
+            self._datetime = np.issubdtype(time.dtype, np.datetime64)
+        if self._datetime:
+            time = time.astype('datetime64[ns]').view(np.int64)
+        else:
+            time = time.astype(float)
+
+        if len(price) == 0:
+            return self._frame(self._empty())
+
+        bars = _aggregate(self._keys(time, volume), time, price, volume)
+
+        carry = self._carry
+        if carry is not None and carry['key'] == bars['key'][0]:
+            # The first bar continues the carried bar
+            bars['time'][0] = carry['time']
+            bars['open'][0] = carry['open']
+            bars['high'][0] = max(bars['high'][0], carry['high'])
+            bars['low'][0] = min(bars['low'][0], carry['low'])
+            bars['volume'][0] += carry['volume']
+            bars['ticks'][0] += carry['ticks']
+            carry = None
+
+        self._carry = dict((f, bars[f][-1]) for f in _FIELDS)
+        finished = dict((f, bars[f][:-1]) for f in _FIELDS)
+        if carry is not None:
+            finished = dict(
+                (f, np.concatenate(([carry[f]], finished[f])))
+                for f in _FIELDS
+            )
+        return self._frame(finished)
+
+    def _empty(self):
+        return dict((f, np.empty(0)) for f in _FIELDS)
+
+    def current(self):
+        """
+        The unfinished bar, e.g. to update the last candle of a
+        live chart or an IndicatorStream with new_bar=False
+        :return: Dictionary with time_column, open, high, low,
+            close, volume and ticks or None
+        """
+        if self._carry is None:
+            return None
+        bar = self._frame(dict(
+            (f, np.asarray([self._carry[f]])) for f in _FIELDS))
+        return dict((col, bar[col].iloc[0]) for col in bar)
+
+    def flush(self):
+        """
+        Finishes the carried bar, e.g. at the end of a file
+        :return: Pandas DataFrame with zero or one bar
+        """
+        if self._carry is None:
+            return self._frame(self._empty())
+
+        carry, self._carry = self._carry, None
+        return self._frame(dict(
+            (f, np.asarray([carry[f]])) for f in _FIELDS))
+
+    def read_csv(self, path, time_column, price_column,
+                 volume_column=None, chunksize=1000000, **kwargs):
+        """
+        Reads a tick file in chunks and yields the finished bars
+        of every chunk. Only the needed columns are read. The
+        last bar is yielded at the end of the file.
+        :param path: Path or file-like object
+        :param time_column: Column with the tick times. Text is
+            parsed as datetime
+        :param price_column: Column with the prices
+        :param volume_column: Column with the volumes
+        :param chunksize: Ticks per chunk
+        :param kwargs: Further arguments of pandas.read_csv
+        :return: Generator of Pandas DataFrames
+        """
+        import pandas as pd
+
+        columns = [time_column, price_column]
+        if volume_column is not None:
+            columns.append(volume_column)
+
+        reader = pd.read_csv(
+            path, usecols=columns, chunksize=int(chunksize), **kwargs)
+        for chunk in reader:
+            time = chunk[time_column]
+            if time.dtype == object:
+                time = pd.to_datetime(time)
+
+            bars = self.push(
+                time.values, chunk[price_column].values,
+                None if volume_column is None
+                else chunk[volume_column].values
+            )
+            if len(bars):
+                yield bars
+
+        last = self.flush()
+        if len(last):
+            yield last
+
+
+# Bar types for plot_candlestick ----------------------------
+
+
+def heikin_ashi(data):
+    """
+    Heikin-Ashi bars. The recursive open
+        open[t] = (open[t - 1] + close[t - 1]) / 2
+    is evaluated as a linear recurrence without a Python loop.
+    :param data: Pandas DataFrame with ohlc columns
+    :return: Pandas DataFrame with the same index and columns
+        and Heikin-Ashi open, high, low and close
+    """
+    o = data['open'].values.astype(float)
+    h = data['high'].values.astype(float)
+    l = data['low'].values.astype(float)
+    c = data['close'].values.astype(float)
+
+    close = (o + h + l + c) / 4.0
+
+    u = np.empty(len(close))
+    if len(close):
+        u[0] = (o[0] + c[0]) / 2.0
+        u[1:] = close[:-1] / 2.0
+    open = _linear_recurrence(u, 0.5)
+
+    return data.assign(
+        open=open,
+        high=np.maximum(h, np.maximum(open, close)),
+        low=np.minimum(l, np.minimum(open, close)),
+        close=close,
+    )
+
+
+def _valid_prices(data, column):
+    price = data[column].values.astype(float)
+    rows = np.flatnonzero(~np.isnan(price))
+    return price[rows], rows
+
+
+def renko(data, brick_size, column='close'):
+    """
+    Renko bricks of a price column. A new brick needs a move of
+    one brick size in the direction of the last brick or two in
+    the other direction. Only prices that cross a brick edge are
+    visited in Python, the bricks are expanded with numpy.
+    :param data: Pandas DataFrame
+    :param brick_size: Size of a brick
+    :param column: Price column
+    :return: Pandas DataFrame with open, high, low and close of
+        every brick and the row of data that completed it in
+        'source_row'
+    """
+    import pandas as pd
+
+    if brick_size <= 0:
+        raise ValueError('Brick size must be positive')
+
+    price, rows = _valid_prices(data, column)
+    events = list()
+
+    if len(price):
+        base = price[0]
+        x = (price - base) / brick_size
+        floor = np.floor(x).astype(np.int64)
+        ceil = np.ceil(x).astype(np.int64)
+        crossings = np.flatnonzero(
+            (floor[1:] != floor[:-1]) | (ceil[1:] != ceil[:-1])) + 1
+
+        # Edges of the last brick in brick sizes above base
+        top = bottom = 0
+        for i in crossings:
+            if floor[i] > top:
+                events.append((i, 1, top, floor[i] - top))
+                top, bottom = floor[i], floor[i] - 1
+            elif ceil[i] < bottom:
+                events.append((i, -1, bottom, bottom - ceil[i]))
+                top, bottom = ceil[i] + 1, ceil[i]
+
+    if not events:
+        return pd.DataFrame(
+            columns=['open', 'high', 'low', 'close', 'source_row'])
+
+    index, direction, start, count = [np.array(e) for e in zip(*events)]
+    event = np.repeat(np.arange(len(events)), count)
+    step = np.arange(len(event)) - np.repeat(np.cumsum(count) - count, count)
+
+    edge = start[event] + direction[event] * step
+    open = base + edge * brick_size
+    close = base + (edge + direction[event]) * brick_size
+
+    return pd.DataFrame({
+        'open': open,
+        'high': np.maximum(open, close),
+        'low': np.minimum(open, close),
+        'close': close,
+        'source_row': rows[index[event]],
+    })
+
+
+def range_bars(data, bar_range, column='close'):
+    """
+    Range bars of a price column. A bar is finished as soon as
+    its high and low are bar_range apart and the next bar opens
+    at its close. The Python loop runs once per bar, the end of
+    a bar is searched with running maxima and minima in numpy.
+    The last bar may be unfinished.
+    :param data: Pandas DataFrame
+    :param bar_range: Range of a bar
+    :param column: Price column
+    :return: Pandas DataFrame with open, high, low and close of
+        every bar and the row of data that finished it in
+        'source_row'
+    """
+    import pandas as pd
+
+    if bar_range <= 0:
+        raise ValueError('Bar range must be positive')
+
+    price, rows = _valid_prices(data, column)
+    n = len(price)
+
+    starts = list()
+    start = 0
+    guess = 64
+    while start < n - 1:
+        stop = min(n, start + guess)
+        segment = price[start:stop]
+        spread = np.maximum.accumulate(segment) - \
+            np.minimum.accumulate(segment)
+        hit = int(np.argmax(spread >= bar_range))
+
+        if spread[hit] >= bar_range:
+            starts.append(start)
+            start += hit
+            guess = max(16, 2 * hit)
+        elif stop == n:
+            break
+        else:
+            guess *= 2
+
+    if start < n - 1 or (n and not starts):
+        # Unfinished last bar
+        starts.append(start)
+
+    starts = np.array(starts, dtype=np.intp)
+    ends = np.empty_like(starts)
+    ends[:-1] = starts[1:]
+    if len(ends):
+        ends[-1] = n - 1
+
+    # A bar contains its first and last price
+    high = np.maximum(np.maximum.reduceat(price, starts), price[ends]) \
+        if n else np.empty(0)
+    low = np.minimum(np.minimum.reduceat(price, starts), price[ends]) \
+        if n else np.empty(0)
+
+    return pd.DataFrame({
+        'open': price[starts],
+        'high': high,
+        'low': low,
+        'close': price[ends],
+        'source_row': rows[ends],
+    })
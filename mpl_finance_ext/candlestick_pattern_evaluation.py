@@ -40,15 +40,16 @@ def draw_pattern_evaluation(data_ohlc, axis, cs_patterns, **kwargs):
     # Add objects --------------------------
     for pattern in cs_patterns:
         try:
-            max_v = list()
-            min_v = list()
-            start_index = int(pattern[1])
-            stop_index = int(pattern[2])
-            for i in range(stop_index - start_index + 1):
-                max_v.append(float(
-                    data_ohlc.iloc[[i + start_index]].max(axis=1)))
-                min_v.append(float(
-                    data_ohlc.iloc[[i + start_index]].min(axis=1)))
+            # Rows of the pattern by index value, the data may be
+            # a window that doesn't start at 0
+            rows = data_ohlc.iloc[
+                data_ohlc.index.searchsorted(pattern[1], 'left'):
+                data_ohlc.index.searchsorted(pattern[2], 'right')]
+            if rows.empty:
+                raise ValueError(
+                    'Index ' + str(pattern[1]) + ' not in data')
+            max_v = rows.max(axis=1).tolist()
+            min_v = rows.min(axis=1).tolist()
 
             x = pattern[1] - 0.6
             y = max(max_v) - 0.05 * (min(min_v) - max(max_v))
@@ -0,0 +1,279 @@
+from .figure_pool import FigurePool
+from .mpl_finance_ext import _prepare
+from .mpl_finance_ext import background_color
+
+# Options of set_data() that are used to prepare a dataset
+_DATA_OPTIONS = ('window', 'target_bars', 'bband_std', 'trading_axis')
+
+
+class _Dataset(object):
+
+    def __init__(self, data, convert_to_numeric, options):
+        self.data = data
+        self.convert_to_numeric = convert_to_numeric
+        self.options = options
+        self.version = 0
+
+        self.prepared = None
+        self.prepared_version = None
+        self.prepared_columns = set()
+        self.trading_axis = None
+
+
+class _Panel(object):
+
+    def __init__(self, func, dataset, plot_columns, column,
+                 rowspan, sharex, kwargs):
+        self.func = func
+        self.dataset = dataset
+        self.plot_columns = plot_columns
+        self.column = column
+        self.rowspan = rowspan
+        self.sharex = sharex
+        self.kwargs = kwargs
+        self.version = 0
+
+        # (dataset, dataset version, panel version) of the last
+        # render
+        self.rendered = None
+        self.extra_axes = list()
+
+
+class ChartSpec(object):
+    """
+    Declarative chart with several panels below each other.
+    The panels and their columns are described up front:
+
+        spec = ChartSpec(figsize=(10, 8))
+        spec.set_data('main', data, trading_axis=True)
+        spec.add_panel(plot_candlestick, plot_columns=['EMA_8'],
+                       rowspan=4, signals=signals)
+        spec.add_panel(plot, plot_columns=['RSI_14'], rowspan=2,
+                       xhline_red=0.8, xhline_green=0.2)
+        spec.add_panel(hist, column='returns', rowspan=2)
+        fig, axes = spec.render()
+
+    On render every dataset is prepared once for all of its
+    panels: the window is read from an OHLCPyramid, the
+    indicators of all panels are computed together and the bars
+    are placed on one trading axis. Panels of DataFrames share
+    the x axis and only the lowest of them shows x tick labels.
+
+    The figure is built once like a PooledFigure. After
+    set_data() or update_panel() the next render() only clears
+    and draws the panels whose dataset or options changed:
+
+        spec.set_data('main', new_data)
+        spec.render()
+
+    The figure is built without pyplot, save it with
+    fig.savefig() or export_figure().
+    """
+
+    def __init__(self, figsize=None, dpi=None,
+                 facecolor=background_color):
+        """
+        :param figsize: Figure size in inches
+        :param dpi: Dots per inch
+        :param facecolor: Background color of figure and axes
+        """
+        self.figsize = figsize
+        self.dpi = dpi
+        self.facecolor = facecolor
+
+        self.panels = list()
+        self._datasets = dict()
+        self._pooled = None
+
+    def set_data(self, name, data, convert_to_numeric=False, **options):
+        """
+        Sets or replaces a dataset. All panels of the dataset are
+        drawn again on the next render.
+        :param name: Name of the dataset
+        :param data: Pandas DataFrame or OHLCPyramid
+        :param convert_to_numeric: If True all columns are
+            converted to numbers once
+        :param options: Options of the plot functions that are
+            used to prepare the data: 'window', 'target_bars',
+            'bband_std' and 'trading_axis'
+        """
+        for key in options:
+            if key not in _DATA_OPTIONS:
+                raise ValueError('Unknown data option ' + str(key))
+
+        dataset = self._datasets.get(name, None)
+        if dataset is None:
+            self._datasets[name] = _Dataset(
+                data, convert_to_numeric, options)
+        else:
+            dataset.data = data
+            dataset.convert_to_numeric = convert_to_numeric
+            dataset.options = options
+            dataset.version += 1
+
+    def add_panel(self, func, dataset='main', plot_columns=None,
+                  column=None, rowspan=1, sharex=None, **kwargs):
+        """
+        Adds a panel below the existing panels
+        :param func: Plot function like plot_candlestick, plot,
+            plot_filled_ohlc, hist or bar
+        :param dataset: Name of the dataset
+        :param plot_columns: Columns of the panel
+        :param column: For hist and bar: column of the dataset
+            whose values are passed as the list of data
+        :param rowspan: Height of the panel in rows
+        :param sharex: If True the panel shares the x axis with
+            the other panels. Default is True for DataFrames and
+            False if column is set
+        :param kwargs: kwargs of the plot function
+        :return: Index of the panel
+        """
+        if rowspan < 1:
+            raise ValueError('rowspan must be at least 1')
+
+        if sharex is None:
+            sharex = column is None
+
+        self.panels.append(_Panel(
+            func, dataset, plot_columns, column,
+            rowspan, sharex, kwargs
+        ))
+        # The layout is built again
+        self._pooled = None
+        return len(self.panels) - 1
+
+    def update_panel(self, index, **kwargs):
+        """
+        Updates the kwargs of a panel. Only this panel is drawn
+        again on the next render.
+        :param index: Index of the panel
+        :param kwargs: kwargs of the plot function. The
+            arguments of add_panel like plot_columns can be
+            changed too, except rowspan and sharex
+        """
+        panel = self.panels[index]
+        for key in ('dataset', 'plot_columns', 'column'):
+            if key in kwargs:
+                setattr(panel, key, kwargs.pop(key))
+        panel.kwargs.update(kwargs)
+        panel.version += 1
+
+    def _layout(self):
+        shared = [
+            i for i, panel in enumerate(self.panels) if panel.sharex
+        ]
+
+        layout = list()
+        row = 0
+        for i, panel in enumerate(self.panels):
+            cell = {'loc': (row, 0), 'rowspan': panel.rowspan}
+            if panel.sharex and i != shared[0]:
+                cell['sharex'] = shared[0]
+            if panel.column is not None:
+                cell['main_spine'] = 'bottom'
+            layout.append(cell)
+            row += panel.rowspan
+
+        return layout, (row, 1), shared
+
+    def _build(self):
+        layout, shape, shared = self._layout()
+        pool = FigurePool(
+            layout=layout, shape=shape, size=1,
+            figsize=self.figsize, dpi=self.dpi,
+            facecolor=self.facecolor
+        )
+        self._pooled = pool.acquire()
+        self._shared = shared
+
+        for i, panel in enumerate(self.panels):
+            panel.rendered = None
+            panel.extra_axes = list()
+            self._reset_labels(i)
+
+    def _reset_labels(self, index):
+        # Only the lowest panel of the shared x axis has labels
+        self._pooled.axes[index].tick_params(
+            axis='x', labelbottom=index not in self._shared[:-1])
+
+    def _columns(self, name):
+        columns = list()
+        for panel in self.panels:
+            if panel.dataset != name:
+                continue
+            for col in list(panel.plot_columns or []) + \
+                    ([panel.column] if panel.column else []):
+                if col not in columns:
+                    columns.append(col)
+        return columns
+
+    def _prepared(self, name):
+        dataset = self._datasets.get(name, None)
+        if dataset is None:
+            raise ValueError('Dataset ' + str(name) + ' not found')
+
+        # All indicators of all panels of the dataset at once
+        columns = self._columns(name)
+        if dataset.prepared_version != dataset.version or \
+                not set(columns) <= dataset.prepared_columns:
+            options = dict(dataset.options)
+            dataset.prepared = _prepare(
+                options, dataset.data,
+                convert_to_numeric=dataset.convert_to_numeric,
+                plot_columns=columns
+            )
+            dataset.trading_axis = options.get('_trading_axis', None)
+            dataset.prepared_version = dataset.version
+            dataset.prepared_columns = set(columns)
+
+        return dataset
+
+    def render(self):
+        """
+        Draws the panels whose dataset or options changed since
+        the last render
+        :return: fig, list of axes (one per panel)
+        """
+        if not self.panels:
+            raise ValueError('The chart has no panels')
+
+        if self._pooled is None:
+            self._build()
+
+        pooled = self._pooled
+        for i, panel in enumerate(self.panels):
+            dataset = self._prepared(panel.dataset)
+            state = (panel.dataset, dataset.version, panel.version)
+            if panel.rendered == state:
+                continue
+
+            if panel.rendered is not None:
+                for extra in panel.extra_axes:
+                    pooled.fig.delaxes(extra)
+                pooled.clear_axis(i)
+                self._reset_labels(i)
+
+            before = list(pooled.fig.axes)
+            kwargs = pooled.render_kwargs(i, **panel.kwargs)
+            if panel.column is not None:
+                data = dataset.prepared[panel.column].dropna().values
+                panel.func(data, **kwargs)
+            else:
+                kwargs['_prepared'] = True
+                if dataset.trading_axis is not None:
+                    kwargs['_trading_axis'] = dataset.trading_axis
+                panel.func(
+                    dataset.prepared,
+                    plot_columns=panel.plot_columns, **kwargs
+                )
+
+            # Axes like a volume panel belong to this panel
+            panel.extra_axes = [
+                ax for ax in pooled.fig.axes if ax not in before
+            ]
+            if panel.extra_axes and i in self._shared[:-1]:
+                for extra in panel.extra_axes:
+                    extra.tick_params(axis='x', labelbottom=False)
+            panel.rendered = state
+
+        return pooled.fig, list(pooled.axes)
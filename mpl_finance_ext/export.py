@@ -0,0 +1,163 @@
+import io
+
+import numpy as np
+
+from .profiling import staged
+
+# Formats that are encoded from the Agg raster
+raster_formats = ('png', 'jpg', 'jpeg', 'tif', 'tiff')
+
+
+def _draw_raster(fig, dpi):
+    # Draws the figure once with Agg and returns the RGBA pixels
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    canvas = fig.canvas
+    original_dpi = fig.dpi
+    temporary_canvas = not isinstance(canvas, FigureCanvasAgg)
+    if temporary_canvas:
+        FigureCanvasAgg(fig)
+
+    try:
+        fig.set_dpi(dpi)
+        fig.canvas.draw()
+        renderer = fig.canvas.get_renderer()
+        height, width = int(renderer.height), int(renderer.width)
+        rgba = np.frombuffer(
+            fig.canvas.buffer_rgba(), dtype=np.uint8
+        ).reshape((height, width, 4)).copy()
+    finally:
+        fig.set_dpi(original_dpi)
+        if temporary_canvas:
+            fig.set_canvas(canvas)
+
+    return rgba
+
+
+def _bin_edges(size, new_size):
+    return (np.arange(new_size) * (float(size) / new_size)).astype(np.intp)
+
+
+def _resample(rgba, width, height):
+    """
+    Resamples an image with an area average (box filter)
+    :param rgba: Array of shape (rows, columns, 4)
+    :param width: New width in pixels
+    :param height: New height in pixels
+    :return: Array of shape (height, width, 4)
+    """
+    rows, columns = rgba.shape[:2]
+    if (rows, columns) == (height, width):
+        return rgba
+
+    pixels = rgba.astype(np.float32)
+    for axis, size, new_size in ((0, rows, height), (1, columns, width)):
+        edges = _bin_edges(size, new_size)
+        counts = np.diff(np.append(edges, size)).clip(min=1)
+        pixels = np.add.reduceat(pixels, edges, axis=axis)
+        shape = [1, 1, 1]
+        shape[axis] = new_size
+        pixels /= counts.reshape(shape)
+
+    return np.round(pixels).astype(np.uint8)
+
+
+@staged('export')
+def export_figure(fig, outputs, dpi=None):
+    """
+    Exports a finished figure to several formats and sizes.
+    All raster outputs share one Agg draw. Smaller rasters and
+    thumbnails are resampled from it instead of drawing the
+    figure again. Nothing is written to disk unless a file
+    is given.
+    :param fig: Figure
+    :param outputs: Dictionary of outputs like:
+        {
+            'chart': {'format': 'png'},
+            'retina': {'format': 'png', 'dpi': 200},
+            'thumb': {'format': 'png', 'width': 320},
+            'vector': {'format': 'svg'},
+            'upload': {'format': 'png', 'file': file_like},
+        }
+        Attributes:
+            format: File format like 'png', 'jpg' or 'svg'
+            dpi: Dots per inch. Defaults to the parameter dpi
+            width: Width in pixels of a raster. The height
+                keeps the aspect ratio
+            file: Writable file-like object. If given the
+                output is written into it instead of returned
+    :param dpi: Default dots per inch. If None fig.dpi
+    :return: Dictionary with the bytes of all outputs
+        without a file
+    """
+    if dpi is None:
+        dpi = fig.dpi
+
+    rasters = dict()
+    vectors = dict()
+    for name, options in outputs.items():
+        fmt = options.get('format', 'png').lower()
+        if fmt in raster_formats:
+            rasters[name] = options
+        else:
+            vectors[name] = options
+
+    results = dict()
+
+    if rasters:
+        import matplotlib.image as mimage
+
+        base_dpi = max(
+            options.get('dpi', dpi) for options in rasters.values()
+        )
+        rgba = _draw_raster(fig, base_dpi)
+        rows, columns = rgba.shape[:2]
+
+        for name, options in rasters.items():
+            width = options.get('width', None)
+            out_dpi = options.get('dpi', dpi)
+            if width is None:
+                width = int(round(columns * out_dpi / float(base_dpi)))
+            else:
+                out_dpi = base_dpi * width / float(columns)
+            height = max(1, int(round(rows * width / float(columns))))
+
+            pixels = _resample(rgba, max(1, width), height)
+            fmt = options.get('format', 'png').lower()
+            if fmt in ('jpg', 'jpeg'):
+                pixels = pixels[:, :, :3]
+
+            target = options.get('file', None)
+            buf = io.BytesIO() if target is None else target
+            mimage.imsave(buf, pixels, format=fmt, dpi=out_dpi)
+            if target is None:
+                results[name] = buf.getvalue()
+
+    for name, options in vectors.items():
+        target = options.get('file', None)
+        buf = io.BytesIO() if target is None else target
+        fig.savefig(
+            buf, format=options['format'],
+            dpi=options.get('dpi', dpi),
+            facecolor=fig.get_facecolor()
+        )
+        if target is None:
+            results[name] = buf.getvalue()
+
+    return results
+
+
+def write_figure(fig, file, fmt='png', dpi=None, width=None):
+    """
+    Writes one format of a figure into a file-like object
+    like a HTTP response or an upload stream
+    :param fig: Figure
+    :param file: Writable file-like object
+    :param fmt: File format
+    :param dpi: Dots per inch
+    :param width: Width in pixels of a raster
+    """
+    options = {'format': fmt, 'file': file}
+    if width is not None:
+        options['width'] = width
+    export_figure(fig, {fmt: options}, dpi=dpi)
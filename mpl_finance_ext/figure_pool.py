@@ -0,0 +1,262 @@
+import contextlib
+import threading
+
+from six.moves import queue
+
+from .mpl_finance_ext import background_color
+from .mpl_finance_ext import fancy_design
+
+
+def _data_artists(axis):
+    return list(axis.lines) + list(axis.collections) + \
+        list(axis.patches) + list(axis.images) + \
+        list(axis.texts) + list(axis.artists)
+
+
+def _tick_labels(axis):
+    # Visibility and rotation of the x tick labels, e.g. the
+    # volume panel hides the labels of the candles
+    tick = axis.xaxis.get_major_ticks(1)[0]
+    return {
+        'labelbottom': tick.label1.get_visible(),
+        'labeltop': tick.label2.get_visible(),
+        'labelrotation': tick.label1.get_rotation(),
+    }
+
+
+class PooledFigure(object):
+    """
+    A figure with a fixed, already styled layout of axes.
+    Instances are handed out by FigurePool.figure().
+    """
+
+    def __init__(self, fig, axes):
+        self.fig = fig
+        self.axes = axes
+
+        # Everything the plotting functions may change on the
+        # styled axes and that has to be restored on clear()
+        self._state = [
+            (
+                axis.xaxis.get_major_locator(),
+                axis.xaxis.get_major_formatter(),
+                axis.yaxis.get_major_locator(),
+                axis.yaxis.get_major_formatter(),
+                axis.get_axes_locator(),
+                _tick_labels(axis),
+            )
+            for axis in axes
+        ]
+
+    def render_kwargs(self, index=0, **kwargs):
+        """
+        Returns the kwargs to draw on one of the axes with
+        the plotting functions of this package like
+            plot_candlestick(data, **pooled.render_kwargs(0))
+        :param index: Index of the axis in the layout
+        :param kwargs: Additional kwargs
+        :return: Dictionary
+        """
+        kwa = {
+            'fig': self.fig,
+            'axis': self.axes[index],
+            'use_pyplot': False,
+            'show': False,
+            'pre_styled': True,
+        }
+        kwa.update(kwargs)
+        return kwa
+
+    def clear(self):
+        """
+        Removes all data artists, legends, labels and twin axes
+        and keeps the styling of the layout
+        """
+        for twin in list(self.fig.axes):
+            if twin not in self.axes:
+                self.fig.delaxes(twin)
+
+        for index in range(len(self.axes)):
+            self.clear_axis(index)
+
+    def clear_axis(self, index):
+        """
+        Removes the data artists, legend and labels of one axis
+        and keeps its styling. Twin axes are not removed.
+        :param index: Index of the axis in the layout
+        """
+        axis, state = self.axes[index], self._state[index]
+
+        for artist in _data_artists(axis):
+            artist.remove()
+
+        if axis.legend_ is not None:
+            axis.legend_.remove()
+            axis.legend_ = None
+
+        axis.set_title('')
+        axis.set_xlabel('')
+        axis.set_ylabel('')
+
+        axis.xaxis.set_major_locator(state[0])
+        axis.xaxis.set_major_formatter(state[1])
+        axis.yaxis.set_major_locator(state[2])
+        axis.yaxis.set_major_formatter(state[3])
+        # Panels appended with make_axes_locatable replace it
+        axis.set_axes_locator(state[4])
+        axis.tick_params(axis='x', **state[5])
+
+        axis.relim()
+        axis.set_autoscale_on(True)
+
+
+class FigurePool(object):
+    """
+    Pool of figures that share the same layout. The layout is
+    built and styled once per figure. After a render only the
+    data artists are removed so the next chart starts on the
+    styled axes:
+
+        pool = FigurePool(layout=[
+            {'loc': (0, 0), 'rowspan': 4},
+            {'loc': (4, 0), 'rowspan': 4, 'sharex': 0},
+        ], shape=(8, 4))
+
+        with pool.figure() as pooled:
+            plot_candlestick(data, **pooled.render_kwargs(0))
+            plot(data, plot_columns=['RSI_14'],
+                 **pooled.render_kwargs(1))
+            pooled.fig.savefig(file)
+
+    Figures are created without pyplot so a pool can be used
+    from several threads.
+    """
+
+    def __init__(self, layout=None, shape=(4, 4), size=4,
+                 figsize=None, dpi=None, facecolor=background_color):
+        """
+        :param layout: List of dictionaries, one for each axis:
+            'loc': Location in the grid like in subplot2grid
+            'rowspan': Number of rows
+            'colspan': Number of columns. Default is the full width
+            'sharex': Index of the axis to share x with
+            'main_spine': Visible spine (see fancy_design)
+            If None one axis covers the whole grid.
+        :param shape: Shape of the grid
+        :param size: Maximum number of figures
+        :param figsize: Figure size in inches
+        :param dpi: Dots per inch
+        :param facecolor: Background color of figure and axes
+        """
+        if layout is None:
+            layout = [{'loc': (0, 0), 'rowspan': shape[0]}]
+
+        if not layout:
+            raise ValueError('The layout needs at least one axis')
+
+        if size < 1:
+            raise ValueError('Size of the pool must be at least 1')
+
+        self.layout = layout
+        self.shape = shape
+        self.size = size
+        self.figsize = figsize
+        self.dpi = dpi
+        self.facecolor = facecolor
+
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _build(self):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from matplotlib.gridspec import GridSpec
+
+        fig = Figure(
+            figsize=self.figsize, dpi=self.dpi,
+            facecolor=self.facecolor
+        )
+        FigureCanvasAgg(fig)
+        grid = GridSpec(*self.shape)
+
+        axes = list()
+        for panel in self.layout:
+            row, col = panel['loc']
+            rowspan = panel.get('rowspan', 1)
+            colspan = panel.get('colspan', self.shape[1] - col)
+
+            sharex = panel.get('sharex', None)
+            if sharex is not None:
+                sharex = axes[sharex]
+
+            axis = fig.add_subplot(
+                grid[row:row + rowspan, col:col + colspan],
+                sharex=sharex,
+                facecolor=self.facecolor
+            )
+            fancy_design(
+                axis, legend=False,
+                main_spine=panel.get('main_spine', 'left')
+            )
+            axes.append(axis)
+
+        return PooledFigure(fig, axes)
+
+    def acquire(self, timeout=None):
+        """
+        Takes a figure out of the pool. Blocks if all figures
+        are in use and the pool has reached its size.
+        :param timeout: Seconds to wait. None waits forever
+        :return: PooledFigure
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+
+        if create:
+            try:
+                return self._build()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise RuntimeError(
+                'No figure available after ' + str(timeout) + 's')
+
+    def release(self, pooled):
+        """
+        Clears the data of a figure and returns it to the pool.
+        A figure that can't be cleared is dropped.
+        :param pooled: PooledFigure from acquire()
+        """
+        try:
+            pooled.clear()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+        self._idle.put(pooled)
+
+    @contextlib.contextmanager
+    def figure(self, timeout=None):
+        """
+        Context manager version of acquire() and release()
+        :param timeout: Seconds to wait for a free figure
+        """
+        pooled = self.acquire(timeout=timeout)
+        try:
+            yield pooled
+        finally:
+            self.release(pooled)
@@ -0,0 +1,336 @@
+import io
+import json
+import struct
+
+import numpy as np
+
+from .mpl_finance_ext import _candle_geometry
+from .mpl_finance_ext import _prepare
+from .mpl_finance_ext import accent_color
+from .mpl_finance_ext import color_set
+from .mpl_finance_ext import label_colors
+from .price_flags import last_valid
+from .profiling import staged
+
+MAGIC = b'MFEG'
+VERSION = 1
+
+# Colors of the geometry are indices into this list. The first
+# entries are color_set, so plot column i has color i % 5 like
+# in the charts, then label_colors and the color of patterns
+# that match no filter.
+palette = list(color_set) + [label_colors, '#535353']
+_LABEL = len(color_set)
+_DEFAULT = _LABEL + 1
+_ACCENT = color_set.index(accent_color)
+
+_ALIGN = 8
+
+
+def _signal_geometry(signals, kwargs):
+    from .signal_evaluation import pair_signals
+
+    trading_axis = kwargs.get('_trading_axis', None)
+    if trading_axis is not None:
+        signals = trading_axis.map_signals(signals)
+
+    # Signals: x, price and 1 for BUY, 0 for SELL
+    points = np.array(
+        [(s[1], s[2]) for s in signals], dtype=float).reshape(-1, 2)
+    kinds = np.array([s[0] == 'BUY' for s in signals], dtype=np.uint8)
+
+    pairs = pair_signals(signals)
+    rects = np.array([
+        (buy[1], buy[2], sell[1] - buy[1], sell[2] - buy[2])
+        for buy, sell in pairs
+    ], dtype=float).reshape(-1, 4)
+
+    # Same colors and filters as draw_signal_evaluation
+    loss = rects[:, 3] < 0
+    keep = np.ones(len(rects), dtype=bool)
+    if kwargs.get('disable_red_signals', False):
+        keep &= ~loss
+    if kwargs.get('disable_green_signals', False):
+        keep &= loss
+    if not kwargs.get('signal_evaluation', True):
+        keep[:] = False
+    rects = rects[keep]
+    colors = np.where(loss[keep], _LABEL, _ACCENT).astype(np.uint8)
+
+    return {
+        'signal_points': points,
+        'signal_kinds': kinds,
+        'signal_rects': rects,
+        'signal_colors': colors,
+        # Annotation of the rectangles in percent
+        'signal_changes': rects[:, 3] / rects[:, 1] * 100.0,
+    }
+
+
+def _pattern_geometry(data, cs_patterns, kwargs):
+    trading_axis = kwargs.get('_trading_axis', None)
+    if trading_axis is not None:
+        cs_patterns = trading_axis.map_patterns(cs_patterns)
+
+    ohlc = data[['open', 'high', 'low', 'close']].values
+    index = data.index
+    bearish_filter = kwargs.get('bearish_filter', ['be'])
+    bullish_filter = kwargs.get('bullish_filter', ['bu'])
+
+    # Boxes like draw_pattern_evaluation: the rows of the
+    # pattern with a margin of 5 %
+    boxes = np.empty((len(cs_patterns), 4))
+    colors = np.empty(len(cs_patterns), dtype=np.uint8)
+    for i, pattern in enumerate(cs_patterns):
+        rows = ohlc[index.searchsorted(pattern[1], 'left'):
+                    index.searchsorted(pattern[2], 'right')]
+        if not len(rows):
+            raise ValueError('Index ' + str(pattern[1]) + ' not in data')
+        top, bottom = np.nanmax(rows), np.nanmin(rows)
+        margin = 0.05 * (top - bottom)
+        x = pattern[1] - 0.6
+        boxes[i] = x, top + margin, pattern[2] - x + 0.6, \
+            bottom - top - 2 * margin
+
+        colors[i] = _DEFAULT
+        if any(f in pattern[0] for f in bearish_filter):
+            colors[i] = _LABEL
+        if any(f in pattern[0] for f in bullish_filter):
+            colors[i] = _ACCENT
+
+    return {
+        'pattern_boxes': boxes,
+        'pattern_colors': colors,
+    }, [str(p[0]) for p in cs_patterns]
+
+
+@staged('geometry')
+def chart_geometry(data, signals=None, cs_patterns=None,
+                   plot_columns=None, **kwargs):
+    """
+    Returns the geometry of plot_candlestick as arrays instead
+    of matplotlib artists, e.g. for a front end that draws the
+    chart itself. The data runs through the same steps: window
+    of an OHLCPyramid, indicators, trading axis and max_candles.
+    Colors are indices into palette (color_set and label_colors).
+    :param data: Pandas DataFrame or OHLCPyramid
+    :param signals: Signals (see plot_candlestick)
+    :param cs_patterns: Candlestick patterns
+    :param plot_columns: Columns drawn as lines with a price flag
+    :param kwargs: kwargs of plot_candlestick that change the
+        geometry: 'window', 'target_bars', 'bband_std',
+        'trading_axis' (default True for a DatetimeIndex),
+        'max_candles', 'enable_flags', 'set_flags_at_the_end',
+        'signal_evaluation', 'disable_red_signals',
+        'disable_green_signals', 'bearish_filter',
+        'bullish_filter'
+    :return: Dictionary with numpy arrays and 'meta', a
+        dictionary of JSON values. All x values are relative
+        to meta['x_offset']. If candles are merged (max_candles)
+        the lines have one point per candle
+    """
+    import pandas as pd
+
+    if isinstance(data, pd.DataFrame) and \
+            isinstance(data.index, pd.DatetimeIndex):
+        # Candles are placed at integer positions
+        kwargs.setdefault('trading_axis', True)
+
+    data = _prepare(kwargs, data, plot_columns=plot_columns)
+    candles = _candle_geometry(
+        data['open'], data['high'],
+        data['low'], data['close'],
+        volumes=data['volume'] if 'volume' in data else None,
+        width=0.6,
+        max_candles=kwargs.get('max_candles', None)
+    )
+
+    x = np.asarray(data.index, dtype=float)
+    x_offset = float(x[0])
+    columns = [
+        col for col in (plot_columns or []) if col in data
+    ]
+    lines = data[columns].values.T.astype(float).reshape(
+        len(columns), len(x))
+    last = x[-1]
+
+    rows = None
+    if len(candles['x']) < len(x):
+        # With merged candles the lines are sampled at the last
+        # row of every candle, more points would share pixels
+        rows = candles['rows']
+        x, lines = candles['x'], lines[:, rows]
+
+    geometry = {
+        'candle_x': candles['x'],
+        'candle_open': candles['open'],
+        'candle_high': candles['high'],
+        'candle_low': candles['low'],
+        'candle_close': candles['close'],
+        'candle_up': candles['up'].astype(np.uint8),
+        'line_x': x,
+        'lines': lines,
+        'line_colors': np.array([
+            i % len(color_set)
+            for i, col in enumerate(plot_columns or []) if col in data
+        ], dtype=np.uint8),
+    }
+    if candles['volume'] is not None:
+        geometry['candle_volume'] = candles['volume']
+
+    trading_axis = kwargs.get('_trading_axis', None)
+    if trading_axis is not None and trading_axis.datetime:
+        # Times of the positions for the tick labels
+        positions = np.asarray(data.index, dtype=int)
+        if rows is not None:
+            positions = positions[rows]
+        geometry['time'] = trading_axis.times[positions]
+
+    if kwargs.get('enable_flags', True) and columns:
+        # Flag at the last valid value of every line, moved to
+        # the end of the chart with a dashed extension
+        flag_rows = last_valid(lines.T)
+        found = flag_rows >= 0
+        flag_rows = flag_rows[found]
+        end = last if kwargs.get('set_flags_at_the_end', True) \
+            else x[flag_rows]
+        geometry['flags'] = np.column_stack((
+            x[flag_rows], np.broadcast_to(end, flag_rows.shape),
+            lines[found, flag_rows]
+        ))
+        geometry['flag_colors'] = geometry['line_colors'][found]
+
+    patterns = list()
+    if signals:
+        geometry.update(_signal_geometry(signals, kwargs))
+    if cs_patterns and kwargs.get('cs_pattern_evaluation', True):
+        boxes, patterns = _pattern_geometry(data, cs_patterns, kwargs)
+        geometry.update(boxes)
+
+    # Coordinates as float32 relative to the first bar, so large
+    # x values keep their precision
+    for name, col in (('candle_x', slice(None)), ('line_x', slice(None)),
+                      ('signal_points', 0), ('signal_rects', 0),
+                      ('pattern_boxes', 0), ('flags', slice(0, 2))):
+        if name in geometry:
+            values = geometry[name] = geometry[name].astype(float)
+            values[..., col] -= x_offset
+    for name, values in geometry.items():
+        if values.dtype == float:
+            geometry[name] = values.astype(np.float32)
+
+    geometry['meta'] = {
+        'version': VERSION,
+        'x_offset': x_offset,
+        'half_width': float(candles['delta']),
+        'xlim': [float(v) - x_offset for v in candles['xlim']],
+        'columns': columns,
+        'patterns': patterns,
+        'palette': palette,
+    }
+    return geometry
+
+
+def write_geometry(geometry, file, fmt='mfeg'):
+    """
+    Writes the geometry of chart_geometry() into a file-like
+    object.
+
+    'mfeg' is a little-endian binary buffer for typed arrays:
+    b'MFEG', uint16 version, uint32 length of a JSON header,
+    the header and the arrays, each at a multiple of 8 bytes.
+    The header has the meta data and 'arrays', a list of
+    {'name', 'dtype', 'shape', 'offset'} with offsets from the
+    start of the buffer.
+
+    'npz' is a numpy .npz file with the meta data as JSON in
+    the array 'meta'.
+    :param geometry: Dictionary of chart_geometry()
+    :param file: Writable file-like object or path
+    :param fmt: 'mfeg' or 'npz'
+    """
+    meta = geometry['meta']
+    arrays = [
+        (name, np.ascontiguousarray(values).astype(
+            values.dtype.newbyteorder('<'), copy=False))
+        for name, values in geometry.items() if name != 'meta'
+    ]
+
+    if fmt == 'npz':
+        np.savez(file, meta=np.array(json.dumps(meta)), **dict(arrays))
+        return
+    if fmt != 'mfeg':
+        raise ValueError('Unknown geometry format ' + str(fmt))
+
+    def header(start):
+        table = list()
+        offset = start
+        for name, values in arrays:
+            table.append({
+                'name': name, 'dtype': values.dtype.str,
+                'shape': list(values.shape), 'offset': offset,
+            })
+            offset += -(-values.nbytes // _ALIGN) * _ALIGN
+        content = dict(meta, arrays=table)
+        return json.dumps(content, separators=(',', ':')).encode()
+
+    # The offsets depend on the length of the header
+    prefix = len(MAGIC) + 6
+    start = 0
+    encoded = header(start)
+    while start != -(-(prefix + len(encoded)) // _ALIGN) * _ALIGN:
+        start = -(-(prefix + len(encoded)) // _ALIGN) * _ALIGN
+        encoded = header(start)
+
+    close = isinstance(file, str)
+    if close:
+        file = open(file, 'wb')
+    try:
+        file.write(MAGIC + struct.pack('<HI', VERSION, len(encoded)))
+        file.write(encoded)
+        file.write(b'\0' * (start - prefix - len(encoded)))
+        for name, values in arrays:
+            file.write(values.tobytes())
+            file.write(b'\0' * (-values.nbytes % _ALIGN))
+    finally:
+        if close:
+            file.close()
+
+
+def geometry_bytes(geometry, fmt='mfeg'):
+    """
+    :param geometry: Dictionary of chart_geometry()
+    :param fmt: 'mfeg' or 'npz'
+    :return: Bytes of write_geometry()
+    """
+    buf = io.BytesIO()
+    write_geometry(geometry, buf, fmt=fmt)
+    return buf.getvalue()
+
+
+def read_geometry(buffer):
+    """
+    Reads a buffer of write_geometry(fmt='mfeg'). The arrays
+    are views of the buffer.
+    :param buffer: Bytes
+    :return: Dictionary like chart_geometry()
+    """
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError('Not a chart geometry buffer')
+
+    version, length = struct.unpack_from('<HI', buffer, len(MAGIC))
+    if version > VERSION:
+        raise ValueError(
+            'Unsupported geometry version ' + str(version))
+
+    start = len(MAGIC) + 6
+    meta = json.loads(bytes(buffer[start:start + length]).decode())
+    geometry = dict()
+    for entry in meta.pop('arrays'):
+        dtype = np.dtype(entry['dtype'])
+        count = int(np.prod(entry['shape']))
+        geometry[entry['name']] = np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=entry['offset']
+        ).reshape(entry['shape'])
+    geometry['meta'] = meta
+    return geometry
@@ -0,0 +1,207 @@
+import threading
+
+import matplotlib.colors as mcolors
+import numpy as np
+from matplotlib.patches import Polygon
+
+# Height of a gradient texture in pixels
+_STEPS = 100
+
+_textures = dict()
+_textures_lock = threading.Lock()
+
+
+def gradient_texture(color, alpha=1.0):
+    """
+    Returns the read-only RGBA texture of a vertical gradient
+    from transparent to color. Textures are cached per color
+    and alpha.
+    :param color: Color
+    :param alpha: Alpha at the top
+    :return: Array of shape (100, 1, 4)
+    """
+    key = (mcolors.to_rgb(color), float(alpha))
+    texture = _textures.get(key, None)
+    if texture is None:
+        texture = np.empty((_STEPS, 1, 4), dtype=float)
+        texture[:, :, :3] = key[0]
+        texture[:, :, -1] = np.linspace(0, key[1], _STEPS)[:, None]
+        texture.setflags(write=False)
+        with _textures_lock:
+            texture = _textures.setdefault(key, texture)
+    return texture
+
+
+def _first_per_bucket(bucket, mask):
+    # Index of the first True element of every bucket
+    index = np.flatnonzero(mask)
+    b = bucket[index]
+    keep = np.empty(len(index), dtype=bool)
+    keep[:1] = True
+    np.not_equal(b[1:], b[:-1], out=keep[1:])
+    return index[keep]
+
+
+def envelope(x, y, buckets):
+    """
+    Downsamples a line to the first, last, lowest and highest
+    point of every bucket (M4). The outline drawn with at most
+    one bucket per pixel column is the same as of the full line.
+    :param x: Sorted x values
+    :param y: y values without NaN
+    :param buckets: Number of buckets
+    :return: x, y
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n <= 4 * buckets or buckets < 1:
+        return x, y
+
+    xf = x.astype(float)
+    span = xf[-1] - xf[0]
+    if not span > 0 or np.any(xf[1:] < xf[:-1]):
+        return x, y
+
+    bucket = ((xf - xf[0]) * (buckets / span)).astype(np.intp)
+    np.minimum(bucket, buckets - 1, out=bucket)
+
+    change = np.empty(n, dtype=bool)
+    change[0] = True
+    np.not_equal(bucket[1:], bucket[:-1], out=change[1:])
+    starts = np.flatnonzero(change)
+    counts = np.diff(np.append(starts, n))
+
+    y_max = np.repeat(np.maximum.reduceat(y, starts), counts)
+    y_min = np.repeat(np.minimum.reduceat(y, starts), counts)
+
+    keep = np.unique(np.concatenate((
+        starts,
+        starts + counts - 1,
+        _first_per_bucket(bucket, y == y_max),
+        _first_per_bucket(bucket, y == y_min),
+    )))
+    return x[keep], y[keep]
+
+
+def gradient_fill(ax, x, y, color, alpha=1.0, zorder=None, buckets=None):
+    """
+    Fills the area under a line with a vertical color gradient.
+    The image is clipped with the outline of the line
+    downsampled to two buckets per pixel column.
+    :param ax: Axis
+    :param x: Sorted x values
+    :param y: y values without NaN
+    :param color: Color
+    :param alpha: Alpha at the top
+    :param zorder: zorder of the image
+    :param buckets: Number of buckets of the outline. Default
+        is twice the width of the axis in pixels
+    :return: image, clip path
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+
+    xmin, xmax, ymin, ymax = x.min(), x.max(), y.min(), y.max()
+    im = ax.imshow(
+        gradient_texture(color, alpha), aspect='auto',
+        extent=[xmin, xmax, ymin, ymax],
+        origin='lower', zorder=zorder
+    )
+
+    if buckets is None:
+        buckets = 2 * int(ax.bbox.width)
+    x, y = envelope(x, y, buckets)
+
+    xy = np.empty((len(x) + 3, 2))
+    xy[0] = xmin, ymin
+    xy[1:-2, 0] = x
+    xy[1:-2, 1] = y
+    xy[-2] = xmax, ymin
+    xy[-1] = xmin, ymin
+
+    clip_path = Polygon(xy, facecolor='none', edgecolor='none', closed=True)
+    ax.add_patch(clip_path)
+    im.set_clip_path(clip_path)
+    return im, clip_path
+
+
+def _column_top(x, y, edges):
+    # Highest value of the line in every pixel column
+    columns = len(edges) - 1
+    xf = x.astype(float)
+    centers = (edges[:-1] + edges[1:]) / 2.0
+
+    top = np.interp(centers, xf, y, left=-np.inf, right=-np.inf)
+    column = np.clip(
+        np.searchsorted(edges, xf, 'right') - 1, 0, columns - 1)
+
+    change = np.empty(len(column), dtype=bool)
+    change[0] = True
+    np.not_equal(column[1:], column[:-1], out=change[1:])
+    starts = np.flatnonzero(change)
+    # x is sorted, so every column appears in one run
+    index = column[starts]
+    top[index] = np.maximum(top[index], np.maximum.reduceat(y, starts))
+    return top
+
+
+def composite_gradient_fill(ax, fills, zorder=None, size=None):
+    """
+    Draws the gradients under several lines as one image
+    instead of one clipped image per line. Later lines are
+    composited over earlier ones.
+    :param ax: Axis
+    :param fills: List of (x, y, color, alpha) with sorted x
+        and y without NaN
+    :param zorder: zorder of the image
+    :param size: (width, height) of the image in pixels.
+        Default is the size of the axis
+    :return: image or None if there is nothing to fill
+    """
+    fills = [f for f in fills if len(f[0])]
+    if not fills:
+        return None
+
+    if size is None:
+        size = (int(ax.bbox.width), int(ax.bbox.height))
+    width, height = max(1, size[0]), max(1, size[1])
+
+    xmin = min(float(np.min(f[0])) for f in fills)
+    xmax = max(float(np.max(f[0])) for f in fills)
+    ymin = min(float(np.min(f[1])) for f in fills)
+    ymax = max(float(np.max(f[1])) for f in fills)
+    if xmax == xmin:
+        xmax = xmin + 1.0
+    if ymax == ymin:
+        ymax = ymin + 1.0
+
+    edges = np.linspace(xmin, xmax, width + 1)
+    rows = ymin + (np.arange(height) + 0.5) * ((ymax - ymin) / height)
+
+    # Premultiplied colors
+    image = np.zeros((height, width, 4), dtype=np.float32)
+    for x, y, color, alpha in fills:
+        x = np.asarray(x)
+        y = np.asarray(y, dtype=float)
+        low, high = y.min(), y.max()
+
+        top = _column_top(x, y, edges)
+        ramp = np.clip((rows - low) / ((high - low) or 1.0), 0, 1) * alpha
+        inside = (rows[:, None] >= low) & (rows[:, None] <= top[None, :])
+        a = np.where(inside, ramp[:, None], 0.0).astype(np.float32)
+
+        keep = 1.0 - a
+        for c, value in enumerate(mcolors.to_rgb(color)):
+            image[:, :, c] *= keep
+            image[:, :, c] += a * value
+        image[:, :, 3] *= keep
+        image[:, :, 3] += a
+
+    covered = image[:, :, 3] > 0
+    image[covered, :3] /= image[covered, 3:4]
+
+    return ax.imshow(
+        image, aspect='auto', extent=[xmin, xmax, ymin, ymax],
+        origin='lower', zorder=zorder, interpolation='nearest'
+    )
@@ -0,0 +1,531 @@
+import math
+
+import numpy as np
+
+from .indicators import _ATR
+from .indicators import _BBAND
+from .indicators import _EMA
+from .indicators import _MA
+from .indicators import _MACD
+from .indicators import _MACD_SIGNAL
+from .indicators import _RSI
+
+nan = float('nan')
+
+
+class _EWMState(object):
+    # Running numerator and denominator of an exponentially
+    # weighted mean. Gives the same values as _ewm_mean of
+    # the indicators module, one element at a time.
+    __slots__ = ('alpha', 'min_periods', 'adjust',
+                 'num', 'den', 'count', '_saved')
+
+    def __init__(self, alpha, min_periods=0, adjust=True):
+        self.alpha = alpha
+        self.min_periods = max(min_periods, 1)
+        self.adjust = adjust
+        self.num = 0.0
+        self.den = 0.0
+        self.count = 0
+        self._saved = None
+
+    def update(self, x, new_bar=True):
+        if new_bar or self._saved is None:
+            self._saved = (self.num, self.den, self.count)
+        else:
+            self.num, self.den, self.count = self._saved
+
+        w = 1.0 - self.alpha
+        if math.isnan(x):
+            self.num *= w
+            self.den *= w
+        elif self.adjust or self.count == 0:
+            # Without adjustment the first value has the weight 1
+            self.num = w * self.num + x
+            self.den = w * self.den + 1.0
+            self.count += 1
+        else:
+            self.num = w * self.num + self.alpha * x
+            self.den = w * self.den + self.alpha
+            self.count += 1
+        return self.value
+
+    @property
+    def value(self):
+        if self.count < self.min_periods:
+            return nan
+        return self.num / self.den
+
+
+class _Window(object):
+    # Last n values in a ring array with running sums of the
+    # values and their squares. The values are centered at the
+    # first valid value like in the batch computation. The sums
+    # are recomputed from the ring every n bars, so rounding
+    # errors don't add up over a long stream.
+    __slots__ = ('n', 'ring', 'pos', 'size', 'center',
+                 's1', 's2', 'count', '_since_sync')
+
+    def __init__(self, n):
+        if n < 1:
+            raise ValueError('Window must be at least 1')
+        self.n = n
+        self.ring = np.full(n, nan)
+        self.pos = -1
+        self.size = 0
+        self.center = None
+        self.s1 = 0.0
+        self.s2 = 0.0
+        self.count = 0
+        self._since_sync = 0
+
+    def _remove(self, x):
+        if not math.isnan(x):
+            d = x - self.center
+            self.s1 -= d
+            self.s2 -= d * d
+            self.count -= 1
+
+    def _add(self, x):
+        if not math.isnan(x):
+            if self.center is None:
+                self.center = x
+            d = x - self.center
+            self.s1 += d
+            self.s2 += d * d
+            self.count += 1
+
+    def _sync(self):
+        valid = self.ring[~np.isnan(self.ring)]
+        d = valid - self.center if self.center is not None else valid
+        self.s1 = float(d.sum())
+        self.s2 = float((d * d).sum())
+        self.count = len(valid)
+        self._since_sync = 0
+
+    def update(self, x, new_bar=True):
+        if new_bar or self.size == 0:
+            self.pos = (self.pos + 1) % self.n
+            self.size = min(self.size + 1, self.n)
+            self._since_sync += 1
+        self._remove(self.ring[self.pos])
+        self.ring[self.pos] = x
+        self._add(x)
+
+        if self._since_sync >= self.n:
+            self._sync()
+
+    @property
+    def full(self):
+        return self.size == self.n and self.count == self.n
+
+    def mean(self):
+        if not self.full:
+            return nan
+        return self.s1 / self.n + self.center
+
+    def std(self):
+        # Sample standard deviation (ddof=1)
+        if not self.full or self.n < 2:
+            return nan
+        var = (self.s2 - self.s1 * self.s1 / self.n) / (self.n - 1)
+        return math.sqrt(max(var, 0.0))
+
+
+class IncrementalIndicator(object):
+    """
+    Base class of the indicators that consume one bar at a time.
+    update() takes O(1) time and memory independent of the
+    length of the history. With new_bar=False the last bar is
+    replaced, e.g. when the close of the current bar changes
+    with every tick:
+
+        ema = IncrementalEMA(8)
+        for tick in ticks:
+            ema.update(tick, new_bar=is_new_bar(tick))
+        print(ema.value)
+
+    The values are the same as those of the vectorized
+    functions of the indicators module over the same bars.
+    """
+
+    # Names of the values, see values()
+    names = ()
+
+    # Columns of a bar that update() takes
+    _columns = ('close',)
+
+    def update(self, *args, **kwargs):
+        raise NotImplementedError
+
+    @property
+    def value(self):
+        """
+        Current value. NaN until enough bars were consumed
+        """
+        raise NotImplementedError
+
+    def values(self):
+        """
+        :return: Dictionary of the current values by name
+        """
+        return {self.names[0]: self.value}
+
+    def update_frame(self, data):
+        """
+        Consumes all bars of a DataFrame, e.g. to warm up the
+        state with the history before the stream starts
+        :param data: Pandas DataFrame with ohlc columns
+        :return: self
+        """
+        columns = self._columns
+        rows = zip(*[data[col].values for col in columns])
+        for row in rows:
+            self.update(*row)
+        return self
+
+
+class IncrementalSMA(IncrementalIndicator):
+    """
+    Simple moving average of the close prices
+    """
+
+    def __init__(self, n, name=None):
+        """
+        :param n: Window
+        :param name: Name of the value. Default is 'MA_n'
+        """
+        self.names = (name or 'MA_' + str(n),)
+        self._window = _Window(n)
+
+    def update(self, close, new_bar=True):
+        """
+        :param close: Close price
+        :param new_bar: If False the last bar is replaced
+        :return: Current value
+        """
+        self._window.update(close, new_bar)
+        return self._window.mean()
+
+    @property
+    def value(self):
+        return self._window.mean()
+
+
+class IncrementalEMA(IncrementalIndicator):
+    """
+    Exponential moving average of the close prices with span n
+    """
+
+    def __init__(self, n, name=None):
+        """
+        :param n: Span
+        :param name: Name of the value. Default is 'EMA_n'
+        """
+        self.names = (name or 'EMA_' + str(n),)
+        self._ewm = _EWMState(2.0 / (n + 1.0), min_periods=n)
+
+    def update(self, close, new_bar=True):
+        """
+        :param close: Close price
+        :param new_bar: If False the last bar is replaced
+        :return: Current value
+        """
+        return self._ewm.update(close, new_bar)
+
+    @property
+    def value(self):
+        return self._ewm.value
+
+
+class IncrementalRSI(IncrementalIndicator):
+    """
+    Relative strength index with Wilder's smoothing.
+    The values are between 0 and 1.
+    """
+
+    def __init__(self, n, name=None):
+        """
+        :param n: Window
+        :param name: Name of the value. Default is 'RSI_n'
+        """
+        self.names = (name or 'RSI_' + str(n),)
+        self._gain = _EWMState(1.0 / n, min_periods=n, adjust=False)
+        self._loss = _EWMState(1.0 / n, min_periods=n, adjust=False)
+        self._previous = None
+        self._last = None
+
+    def update(self, close, new_bar=True):
+        """
+        :param close: Close price
+        :param new_bar: If False the last bar is replaced
+        :return: Current value
+        """
+        if new_bar or self._last is None:
+            self._previous = self._last
+            new_bar = True
+        self._last = close
+
+        if self._previous is None:
+            # No change before the second bar
+            return nan
+
+        delta = close - self._previous
+        if math.isnan(delta):
+            gain = loss = nan
+        else:
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+        self._gain.update(gain, new_bar)
+        self._loss.update(loss, new_bar)
+        return self.value
+
+    @property
+    def value(self):
+        gain = self._gain.value
+        loss = self._loss.value
+        total = gain + loss
+        if math.isnan(total) or total == 0:
+            return nan
+        return gain / total
+
+
+class IncrementalBollinger(IncrementalIndicator):
+    """
+    Bollinger bands of the close prices
+    """
+
+    def __init__(self, n, std=2.0):
+        """
+        :param n: Window
+        :param std: Width of the bands in standard deviations
+        """
+        self.names = tuple(
+            'bband_' + band + '_' + str(n)
+            for band in ('upper', 'ave', 'lower')
+        )
+        self.std = std
+        self._window = _Window(n)
+
+    def update(self, close, new_bar=True):
+        """
+        :param close: Close price
+        :param new_bar: If False the last bar is replaced
+        :return: upper, average, lower
+        """
+        self._window.update(close, new_bar)
+        return self.value
+
+    @property
+    def value(self):
+        ave = self._window.mean()
+        sd = self._window.std()
+        return ave + sd * self.std, ave, ave - sd * self.std
+
+    def values(self):
+        return dict(zip(self.names, self.value))
+
+
+class IncrementalATR(IncrementalIndicator):
+    """
+    Average true range with Wilder's smoothing
+    """
+
+    _columns = ('high', 'low', 'close')
+
+    def __init__(self, n, name=None):
+        """
+        :param n: Window
+        :param name: Name of the value. Default is 'ATR_n'
+        """
+        self.names = (name or 'ATR_' + str(n),)
+        self._ewm = _EWMState(1.0 / n, min_periods=n, adjust=False)
+        self._previous = None
+        self._last = None
+
+    def update(self, high, low, close, new_bar=True):
+        """
+        :param high: High price
+        :param low: Low price
+        :param close: Close price
+        :param new_bar: If False the last bar is replaced
+        :return: Current value
+        """
+        if new_bar or self._last is None:
+            self._previous = self._last
+            new_bar = True
+        self._last = close
+
+        tr = high - low
+        if self._previous is not None:
+            prev = self._previous
+            moves = (abs(high - prev), abs(low - prev))
+            if math.isnan(moves[0] + moves[1]):
+                # NaN propagates like in numpy.maximum
+                tr = nan
+            else:
+                tr = max(tr, moves[0], moves[1])
+        return self._ewm.update(tr, new_bar)
+
+    @property
+    def value(self):
+        return self._ewm.value
+
+
+class IncrementalMACD(IncrementalIndicator):
+    """
+    Moving average convergence divergence
+    """
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        """
+        :param fast: Span of the fast EMA
+        :param slow: Span of the slow EMA
+        :param signal: Span of the signal line
+        """
+        suffix = '_'.join((str(fast), str(slow), str(signal)))
+        self.names = (
+            'MACD_' + str(fast) + '_' + str(slow),
+            'MACD_signal_' + suffix,
+            'MACD_hist_' + suffix,
+        )
+        self._fast = IncrementalEMA(fast)
+        self._slow = IncrementalEMA(slow)
+        self._signal = _EWMState(2.0 / (signal + 1.0), min_periods=signal)
+
+    def update(self, close, new_bar=True):
+        """
+        :param close: Close price
+        :param new_bar: If False the last bar is replaced
+        :return: macd, signal line, histogram
+        """
+        line = self._fast.update(close, new_bar) - \
+            self._slow.update(close, new_bar)
+        self._signal.update(line, new_bar)
+        return self.value
+
+    @property
+    def value(self):
+        line = self._fast.value - self._slow.value
+        signal_line = self._signal.value
+        return line, signal_line, line - signal_line
+
+    def values(self):
+        return dict(zip(self.names, self.value))
+
+
+def indicator_state(column, bband_std=2.0):
+    """
+    Creates the incremental indicator of a column name like
+    'EMA_8' or 'bband_upper_20'. The names are the same as for
+    indicator_columns().
+    :param column: Name of the column
+    :param bband_std: Width of bollinger bands
+    :return: IncrementalIndicator or None if the name is unknown
+    """
+    m = _MA.match(column)
+    if m:
+        return IncrementalSMA(int(m.group(1)), name=column)
+
+    m = _EMA.match(column)
+    if m:
+        return IncrementalEMA(int(m.group(1)))
+
+    m = _RSI.match(column)
+    if m:
+        return IncrementalRSI(int(m.group(1)))
+
+    m = _ATR.match(column)
+    if m:
+        return IncrementalATR(int(m.group(1)))
+
+    m = _BBAND.match(column)
+    if m:
+        return IncrementalBollinger(int(m.group(2)), std=bband_std)
+
+    m = _MACD.match(column)
+    if m:
+        return IncrementalMACD(int(m.group(1)), int(m.group(2)))
+
+    m = _MACD_SIGNAL.match(column)
+    if m:
+        return IncrementalMACD(
+            int(m.group(2)), int(m.group(3)), int(m.group(4)))
+
+    return None
+
+
+class IndicatorStream(object):
+    """
+    Keeps the incremental state of several indicator columns
+    of a live chart. Every bar is consumed in O(1) and the
+    current values can be appended to the overlay lines or
+    passed to add_price_flag:
+
+        stream = IndicatorStream(['EMA_8', 'bband_upper_20'])
+        stream.update_frame(history)
+        ...
+        values = stream.update(bar, new_bar=False)
+        line.set_data(x, np.append(y, values['EMA_8']))
+    """
+
+    def __init__(self, columns, bband_std=2.0):
+        """
+        :param columns: List of indicator names
+        :param bband_std: Width of bollinger bands
+        """
+        self.columns = list()
+        self._states = list()
+        self._by_column = dict()
+
+        for col in columns:
+            if col in self._by_column:
+                continue
+
+            state = indicator_state(col, bband_std=bband_std)
+            if state is None:
+                raise ValueError('Unknown indicator ' + str(col))
+
+            # One state for related columns like all bands
+            shared = next(
+                (s for s in self._states
+                 if type(s) is type(state) and s.names == state.names),
+                None
+            )
+            if shared is None:
+                self._states.append(state)
+                shared = state
+            self._by_column[col] = shared
+            self.columns.append(col)
+
+    def update(self, bar, new_bar=True):
+        """
+        Consumes a new bar or replaces the last one
+        :param bar: Dictionary or Pandas Series with the
+            keys 'high', 'low' and 'close'
+        :param new_bar: If False the last bar is replaced
+        :return: Dictionary of the current values
+        """
+        for state in self._states:
+            args = [bar[col] for col in state._columns]
+            state.update(*args, new_bar=new_bar)
+        return self.values()
+
+    def update_frame(self, data):
+        """
+        Consumes all bars of a DataFrame
+        :param data: Pandas DataFrame with ohlc columns
+        :return: self
+        """
+        for state in self._states:
+            state.update_frame(data)
+        return self
+
+    def values(self):
+        """
+        :return: Dictionary of the current values of all columns
+        """
+        result = dict()
+        for state in self._states:
+            result.update(state.values())
+        return dict((col, result[col]) for col in self.columns)
@@ -0,0 +1,384 @@
+import re
+import threading
+import weakref
+
+import numpy as np
+
+# Largest power of the decay factor within one block of
+# _linear_recurrence before the float64 range becomes a problem
+_EXP_LIMIT = 200.0
+
+
+def _linear_recurrence(u, w, s0=0.0):
+    """
+    Evaluates s[t] = w * s[t - 1] + u[t] without a Python loop
+    over the elements. Inside a block the recursion is written
+    as a cumulative sum scaled by powers of w:
+        s[j] = w^j * (w * s0 + sum_k<=j u[k] * w^-k)
+    Blocks are short enough that w^-k stays finite and the
+    last value of a block is carried into the next one.
+    :param u: Array of inputs
+    :param w: Decay factor
+    :param s0: Value before the first element
+    :return: Array
+    """
+    u = np.asarray(u, dtype=float)
+    n = len(u)
+    out = np.empty(n)
+    if n == 0:
+        return out
+
+    if w == 0:
+        out[:] = u
+        return out
+
+    if w >= 1:
+        np.cumsum(u, out=out)
+        out += s0
+        return out
+
+    block = int(max(1, min(n, _EXP_LIMIT / -np.log10(w))))
+    powers = w ** -np.arange(block, dtype=float)
+
+    carry = s0
+    for start in range(0, n, block):
+        chunk = u[start:start + block]
+        p = powers[:len(chunk)]
+        acc = np.cumsum(chunk * p)
+        acc += w * carry
+        acc /= p
+        out[start:start + len(chunk)] = acc
+        carry = acc[-1]
+
+    return out
+
+
+def _ewm_mean(values, alpha, min_periods=0, adjust=True):
+    # Same result as pandas Series.ewm(alpha=alpha,
+    # min_periods=min_periods, adjust=adjust).mean() for series
+    # without NaN values after the first valid value
+    x = np.asarray(values, dtype=float)
+    valid = ~np.isnan(x)
+    w = 1.0 - alpha
+
+    if adjust:
+        num = _linear_recurrence(np.where(valid, x, 0.0), w)
+        den = _linear_recurrence(valid.astype(float), w)
+    else:
+        u_num = np.where(valid, alpha * x, 0.0)
+        u_den = np.where(valid, alpha, 0.0)
+        first = np.flatnonzero(valid)
+        if len(first):
+            # The first observation has the weight 1
+            u_num[first[0]] = x[first[0]]
+            u_den[first[0]] = 1.0
+        num = _linear_recurrence(u_num, w)
+        den = _linear_recurrence(u_den, w)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = num / den
+
+    out[np.cumsum(valid) < max(min_periods, 1)] = np.nan
+    return out
+
+
+def _window_sum(a, n):
+    c = np.concatenate(([0.0], np.cumsum(a)))
+    return c[n:] - c[:-n]
+
+
+# Rows of a block of the rolling sums. Every block is centered at
+# the mean of its valid values and has its own cumulative sums, so
+# the rounding errors don't grow with the length and the drift of
+# the history.
+_BLOCK = 1024
+
+
+def _rolling_sums(x, n):
+    # Rolling sums of x and x^2 and the number of valid values.
+    # The sums are of the values minus the center of the window.
+    valid = ~np.isnan(x)
+    s1 = np.full(len(x), np.nan)
+    s2 = np.full(len(x), np.nan)
+    count = np.zeros(len(x))
+    center = np.zeros(len(x))
+
+    step = max(_BLOCK, 4 * n)
+    for first in range(n - 1, len(x), step):
+        last = min(first + step, len(x))
+        block = slice(first - n + 1, last)
+        v = valid[block]
+        c = x[block][v].mean() if v.any() else 0.0
+        d = np.where(v, x[block] - c, 0.0)
+
+        s1[first:last] = _window_sum(d, n)
+        s2[first:last] = _window_sum(d * d, n)
+        count[first:last] = _window_sum(v.astype(float), n)
+        center[first:last] = c
+    return s1, s2, count, center
+
+
+def sma(values, n):
+    """
+    Simple moving average
+    :param values: Array-like
+    :param n: Window
+    :return: Numpy array. The first n - 1 values are NaN
+    """
+    x = np.asarray(values, dtype=float)
+    s1, _, count, center = _rolling_sums(x, n)
+    out = s1 / n + center
+    out[count < n] = np.nan
+    return out
+
+
+def rolling_std(values, n):
+    """
+    Moving sample standard deviation (ddof=1)
+    :param values: Array-like
+    :param n: Window
+    :return: Numpy array
+    """
+    x = np.asarray(values, dtype=float)
+    s1, s2, count, _ = _rolling_sums(x, n)
+    var = (s2 - s1 * s1 / n) / (n - 1)
+    out = np.sqrt(np.clip(var, 0.0, None))
+    out[count < n] = np.nan
+    return out
+
+
+def ema(values, n):
+    """
+    Exponential moving average with span n like
+    pandas ewm(span=n, min_periods=n).mean()
+    :param values: Array-like
+    :param n: Span
+    :return: Numpy array
+    """
+    return _ewm_mean(values, 2.0 / (n + 1.0), min_periods=n)
+
+
+def rsi(close, n):
+    """
+    Relative strength index with Wilder's smoothing of the
+    close-to-close changes. The values are between 0 and 1.
+    The helper of the old examples used the directional
+    moves of high and low instead, see the README.
+    :param close: Array-like of close prices
+    :param n: Window
+    :return: Numpy array
+    """
+    close = np.asarray(close, dtype=float)
+    delta = np.empty(len(close))
+    delta[:1] = np.nan
+    delta[1:] = np.diff(close)
+
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    gain[np.isnan(delta)] = np.nan
+    loss[np.isnan(delta)] = np.nan
+
+    avg_gain = _ewm_mean(gain, 1.0 / n, min_periods=n, adjust=False)
+    avg_loss = _ewm_mean(loss, 1.0 / n, min_periods=n, adjust=False)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return avg_gain / (avg_gain + avg_loss)
+
+
+def bollinger_bands(close, n, std=2.0):
+    """
+    Bollinger bands
+    :param close: Array-like of close prices
+    :param n: Window
+    :param std: Width of the bands in standard deviations
+    :return: upper, average, lower as numpy arrays
+    """
+    ave = sma(close, n)
+    sd = rolling_std(close, n)
+    return ave + sd * std, ave, ave - sd * std
+
+
+def atr(high, low, close, n):
+    """
+    Average true range with Wilder's smoothing
+    :param high: Array-like of high prices
+    :param low: Array-like of low prices
+    :param close: Array-like of close prices
+    :param n: Window
+    :return: Numpy array
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+
+    tr = high - low
+    if len(close) > 1:
+        prev = close[:-1]
+        tr[1:] = np.maximum(
+            tr[1:],
+            np.maximum(np.abs(high[1:] - prev), np.abs(low[1:] - prev))
+        )
+    return _ewm_mean(tr, 1.0 / n, min_periods=n, adjust=False)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """
+    Moving average convergence divergence
+    :param close: Array-like of close prices
+    :param fast: Span of the fast EMA
+    :param slow: Span of the slow EMA
+    :param signal: Span of the signal line
+    :return: macd, signal line, histogram as numpy arrays
+    """
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+# Indicator columns -----------------------------------------
+
+_MA = re.compile(r'^S?MA_(\d+)$')
+_EMA = re.compile(r'^EMA_(\d+)$')
+_RSI = re.compile(r'^RSI_(\d+)$')
+_ATR = re.compile(r'^ATR_(\d+)$')
+_BBAND = re.compile(r'^bband_(upper|ave|lower)_(\d+)$')
+_MACD = re.compile(r'^MACD_(\d+)_(\d+)$')
+_MACD_SIGNAL = re.compile(r'^MACD_(signal|hist)_(\d+)_(\d+)_(\d+)$')
+
+
+def indicator_columns(data, column, bband_std=2.0):
+    """
+    Computes an indicator column from its name. Related columns
+    computed on the way (e.g. all bollinger bands) are returned
+    as well. Known names are:
+        'MA_n', 'SMA_n', 'EMA_n', 'RSI_n', 'ATR_n',
+        'bband_upper_n', 'bband_ave_n', 'bband_lower_n',
+        'MACD_fast_slow', 'MACD_signal_fast_slow_signal',
+        'MACD_hist_fast_slow_signal'
+    :param data: Pandas DataFrame with ohlc columns
+    :param column: Name of the column
+    :param bband_std: Width of bollinger bands
+    :return: Dictionary of numpy arrays or None if the name
+        is unknown
+    """
+    m = _MA.match(column)
+    if m:
+        return {column: sma(data['close'].values, int(m.group(1)))}
+
+    m = _EMA.match(column)
+    if m:
+        return {column: ema(data['close'].values, int(m.group(1)))}
+
+    m = _RSI.match(column)
+    if m:
+        return {column: rsi(data['close'].values, int(m.group(1)))}
+
+    m = _ATR.match(column)
+    if m:
+        return {column: atr(
+            data['high'].values, data['low'].values,
+            data['close'].values, int(m.group(1)))}
+
+    m = _BBAND.match(column)
+    if m:
+        n = m.group(2)
+        upper, ave, lower = bollinger_bands(
+            data['close'].values, int(n), bband_std)
+        return {
+            'bband_upper_' + n: upper,
+            'bband_ave_' + n: ave,
+            'bband_lower_' + n: lower,
+        }
+
+    m = _MACD.match(column)
+    if m:
+        fast, slow = int(m.group(1)), int(m.group(2))
+        return {column: ema(data['close'].values, fast) -
+                ema(data['close'].values, slow)}
+
+    m = _MACD_SIGNAL.match(column)
+    if m:
+        fast, slow, sig = m.group(2), m.group(3), m.group(4)
+        line, signal_line, hist = macd(
+            data['close'].values, int(fast), int(slow), int(sig))
+        suffix = '_'.join((fast, slow, sig))
+        return {
+            'MACD_' + fast + '_' + slow: line,
+            'MACD_signal_' + suffix: signal_line,
+            'MACD_hist_' + suffix: hist,
+        }
+
+    return None
+
+
+# Computed columns per DataFrame object. An entry is dropped
+# when its DataFrame is garbage collected.
+_cache = dict()
+_cache_lock = threading.Lock()
+
+
+def _fingerprint(data, bband_std):
+    if data.empty:
+        return (0, bband_std)
+    return (len(data), data.index[-1], bband_std)
+
+
+def _cached_columns(data, bband_std):
+    key = id(data)
+    fingerprint = _fingerprint(data, bband_std)
+
+    with _cache_lock:
+        entry = _cache.get(key, None)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+
+        columns = dict()
+        _cache[key] = (fingerprint, columns)
+        if entry is None:
+            weakref.finalize(data, _cache.pop, key, None)
+        return columns
+
+
+def clear_indicator_cache():
+    """
+    Drops all memoized indicator columns. Only needed if a
+    DataFrame was changed in place without changing its length
+    or last index.
+    """
+    with _cache_lock:
+        _cache.clear()
+
+
+def add_indicators(data, columns, bband_std=2.0):
+    """
+    Returns the DataFrame with all indicator columns of the
+    list that are missing in data. Columns are computed once
+    per DataFrame and memoized, so several panels that use the
+    same dataset share them. See indicator_columns() for the
+    known names. Unknown names are ignored.
+    :param data: Pandas DataFrame with ohlc columns
+    :param columns: List of column names
+    :param bband_std: Width of bollinger bands
+    :return: data or a new DataFrame with the added columns
+    """
+    if columns is None:
+        return data
+
+    available = set(data)
+    missing = [col for col in columns if col not in available]
+    if not missing:
+        return data
+
+    cached = _cached_columns(data, bband_std)
+    added = dict()
+    for col in missing:
+        if col not in cached:
+            values = indicator_columns(data, col, bband_std=bband_std)
+            if values is None:
+                continue
+            cached.update(values)
+        added[col] = cached[col]
+
+    if not added:
+        return data
+    return data.assign(**added)
@@ -0,0 +1,174 @@
+import os
+
+import numpy as np
+
+_OHLC = ('open', 'high', 'low', 'close')
+
+
+def chart_columns(plot_columns=None, time_column=None, columns=None):
+    """
+    Returns the columns a chart needs: time, open, high, low,
+    close and the plot columns
+    :param plot_columns: Plot columns of the chart
+    :param time_column: Name of the time column
+    :param columns: Further columns like 'volume'
+    :return: List of column names
+    """
+    needed = list()
+    for col in [time_column] + list(_OHLC) + \
+            list(plot_columns or []) + list(columns or []):
+        if col is not None and col not in needed:
+            needed.append(col)
+    return needed
+
+
+def _project(available, plot_columns, time_column, columns):
+    # Columns of the file that are read. Plot columns that are not
+    # in the file are skipped, indicators like 'EMA_8' are computed
+    # by the plot functions.
+    required = chart_columns(None, time_column, columns)
+    missing = [col for col in required if col not in available]
+    if missing:
+        raise ValueError('Columns not found: ' + ', '.join(missing))
+
+    return [
+        col for col in chart_columns(plot_columns, time_column, columns)
+        if col in available
+    ]
+
+
+def _bound(value):
+    if isinstance(value, str):
+        import pandas as pd
+        return pd.Timestamp(value).to_pydatetime()
+    return value
+
+
+def _read_dataset(path, fmt, plot_columns, time_column,
+                  start, stop, columns):
+    try:
+        import pyarrow.dataset as ds
+    except ImportError:
+        raise ImportError('Reading ' + fmt + ' files needs pyarrow')
+
+    dataset = ds.dataset(path, format=fmt)
+    names = _project(
+        dataset.schema.names, plot_columns, time_column, columns)
+
+    condition = None
+    if time_column is not None:
+        field = ds.field(time_column)
+        if start is not None:
+            condition = field >= _bound(start)
+        if stop is not None:
+            upper = field < _bound(stop)
+            condition = upper if condition is None else condition & upper
+    elif start is not None or stop is not None:
+        raise ValueError('A time range needs a time_column')
+
+    # Row groups outside the range are skipped with their statistics
+    table = dataset.to_table(columns=names, filter=condition)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def read_parquet(path, plot_columns=None, time_column=None,
+                 start=None, stop=None, columns=None):
+    """
+    Reads the columns of a chart from a parquet file or directory.
+    Only the needed columns are read and row groups outside the
+    time range are skipped. Needs pyarrow.
+    :param path: File or directory
+    :param plot_columns: Plot columns of the chart. Indicator
+        columns that are not in the file are skipped, the plot
+        functions compute them
+    :param time_column: Name of the time column
+    :param start: Start of the time range
+    :param stop: End of the time range (exclusive)
+    :param columns: Further columns like 'volume'
+    :return: Pandas DataFrame
+    """
+    return _read_dataset(
+        path, 'parquet', plot_columns, time_column, start, stop, columns)
+
+
+def read_feather(path, plot_columns=None, time_column=None,
+                 start=None, stop=None, columns=None):
+    """
+    Reads the columns of a chart from a feather (Arrow IPC) file.
+    The file is memory-mapped and only the needed columns are
+    read. Needs pyarrow.
+    :param path: File or directory
+    :param plot_columns: Plot columns of the chart
+    :param time_column: Name of the time column
+    :param start: Start of the time range
+    :param stop: End of the time range (exclusive)
+    :param columns: Further columns like 'volume'
+    :return: Pandas DataFrame
+    """
+    return _read_dataset(
+        path, 'feather', plot_columns, time_column, start, stop, columns)
+
+
+def read_npy_dir(directory, plot_columns=None, time_column=None,
+                 start=None, stop=None, columns=None):
+    """
+    Reads the columns of a chart from a directory with one .npy
+    file per column like written by write_npy_dir(). The files
+    are memory-mapped, the time range is found by binary search
+    in the sorted time column and only the rows of the range
+    of the needed columns are copied into the DataFrame.
+    :param directory: Directory
+    :param plot_columns: Plot columns of the chart
+    :param time_column: Name of the sorted time column
+    :param start: Start of the time range
+    :param stop: End of the time range (exclusive)
+    :param columns: Further columns like 'volume'
+    :return: Pandas DataFrame
+    """
+    import pandas as pd
+
+    available = [
+        name[:-4] for name in os.listdir(directory)
+        if name.endswith('.npy')
+    ]
+    names = _project(available, plot_columns, time_column, columns)
+    arrays = dict(
+        (name, np.load(
+            os.path.join(directory, name + '.npy'), mmap_mode='r'))
+        for name in names
+    )
+
+    first, last = 0, len(arrays[names[0]]) if names else 0
+    if time_column is not None:
+        time = arrays[time_column]
+        if start is not None:
+            first = int(np.searchsorted(
+                time, np.asarray(start, dtype=time.dtype), 'left'))
+        if stop is not None:
+            last = int(np.searchsorted(
+                time, np.asarray(stop, dtype=time.dtype), 'left'))
+    elif start is not None or stop is not None:
+        raise ValueError('A time range needs a time_column')
+
+    # The DataFrame copies the rows of the range once
+    last = max(first, last)
+    return pd.DataFrame(dict(
+        (name, arrays[name][first:last]) for name in names
+    ), columns=names)
+
+
+def write_npy_dir(data, directory, columns=None):
+    """
+    Writes columns of a DataFrame as one .npy file per column
+    :param data: Pandas DataFrame
+    :param directory: Directory
+    :param columns: Columns to write. Default are all columns
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    for col in columns or list(data):
+        np.save(
+            os.path.join(directory, str(col) + '.npy'),
+            np.ascontiguousarray(data[col].values)
+        )
@@ -1,18 +1,18 @@
-import matplotlib.pyplot as plt
 import matplotlib.transforms as mtrans
 import numpy as np
-import pandas as pd
 from matplotlib.collections import LineCollection, PolyCollection
 from matplotlib.patches import BoxStyle
-from matplotlib.patches import Polygon
 import matplotlib.colors as mcolors
-from six.moves import xrange, zip
-from mpl_toolkits.mplot3d import Axes3D
+from six.moves import zip
 
-from .angled_box_style import AngledBoxStyle
-from .candlestick_pattern_evaluation import draw_pattern_evaluation
-from .signal_evaluation import draw_signal_evaluation
-from .signal_evaluation import draw_verticals
+from .gradient import composite_gradient_fill
+from .gradient import gradient_fill
+from .indicators import add_indicators
+from .price_flags import PriceFlags
+from .price_flags import last_valid
+from .profiling import staged
+from .pyramid import OHLCPyramid
+from .trading_axis import TradingAxis
 
 import logging
 logger = logging.getLogger('mpl_finance_ext')
@@ -27,63 +27,129 @@ green = '#00fc01'  # '#13bebc'
 
 color_set = ['#13bebc', '#b0c113', '#c1139e', '#c17113', '#0d8382']
 
-# Create angled box style
-BoxStyle._style_list["angled"] = AngledBoxStyle
 
+def _pyplot():
+    # Importing pyplot selects a backend. It is only loaded
+    # when a function needs it and not on package import.
+    import matplotlib.pyplot as plt
+    return plt
 
+
+def _register_angled_box_style():
+    # Create angled box style on first use
+    if "angled" not in BoxStyle._style_list:
+        from .angled_box_style import AngledBoxStyle
+        BoxStyle._style_list["angled"] = AngledBoxStyle
+
+
+def _candle_geometry(opens, highs, lows, closes, volumes=None,
+                     width=4.0, index_fix=True, max_candles=None):
+    """
+    Computes the x positions, half widths and up/down masks
+    of the candles once for the candles and the volume panel
+    :param opens: Pandas Series of open prices
+    :param highs: High prices
+    :param lows: Low prices
+    :param closes: Close prices
+    :param volumes: Volumes or None
+    :param width: Width of a candle
+    :param index_fix: If True the candles are placed at the
+        index values of opens, otherwise at 0..N-1
+    :param max_candles: If there are more rows, consecutive
+        rows are aggregated into one candle
+    :return: Dictionary. 'rows' are the last rows of the candles
+    """
+    o = np.asarray(opens, dtype=float)
+    h = np.asarray(highs, dtype=float)
+    l = np.asarray(lows, dtype=float)
+    c = np.asarray(closes, dtype=float)
+    v = None if volumes is None else np.asarray(volumes, dtype=float)
+
+    x = np.asarray(opens.index, dtype=float) if index_fix \
+        else np.arange(len(o), dtype=float)
+    xlim = (x[0], x[-1]) if len(x) else (0.0, 0.0)
+
+    # Rows marked with -1 are skipped
+    rows = np.arange(len(o))
+    valid = (o != -1) & (c != -1)
+    if not valid.all():
+        o, h, l, c, x = o[valid], h[valid], l[valid], c[valid], x[valid]
+        v = None if v is None else v[valid]
+        rows = rows[valid]
+
+    delta = width - 0.16
+    n = len(o)
+    if max_candles is not None and n > max_candles > 0:
+        # Level of detail: k rows per candle
+        k = int(np.ceil(n / float(max_candles)))
+        starts = np.arange(0, n, k)
+        ends = np.minimum(starts + k, n) - 1
+        o, c = o[starts], c[ends]
+        h = np.fmax.reduceat(h, starts)
+        l = np.fmin.reduceat(l, starts)
+        v = None if v is None else np.add.reduceat(v, starts)
+        x = (x[starts] + x[ends]) / 2.0
+        rows = rows[ends]
+        delta *= k
+
+    return {
+        'x': x, 'delta': delta, 'up': c > o, 'xlim': xlim,
+        'open': o, 'high': h, 'low': l, 'close': c, 'volume': v,
+        'rows': rows,
+    }
+
+
+def _boxes(x, delta, y0, y1):
+    # Vertices of rectangles from y0 to y1
+    boxes = np.empty((len(x), 4, 2))
+    boxes[:, :2, 0] = (x - delta)[:, None]
+    boxes[:, 2:, 0] = (x + delta)[:, None]
+    boxes[:, 0, 1] = boxes[:, 3, 1] = y0
+    boxes[:, 1, 1] = boxes[:, 2, 1] = y1
+    return boxes
+
+
+@staged('candlestick')
 def _candlestick2_ohlc(
         ax, opens, highs, lows, closes,
         width=4.0, colorup=accent_color, colordown=label_colors,
-        alpha=0.75, index_fix=True
+        alpha=0.75, index_fix=True, merge_wicks=False, geometry=None
 ):
     # Functions not supported in macOS
     # colorup = mcolors.to_rgba(colorup, alpha)
     # colordown = mcolors.to_rgba(colordown, alpha)
-    line_colors = list()
-    poly_colors_up = list()
-    poly_colors_down = list()
-
-    count = 0
-    delta = width - 0.16
-    poly_segments_up = list()
-    poly_segments_down = list()
-    line_segments = list()
-
-    for i, open, close, high, low in zip(
-            xrange(len(opens)), opens, closes, highs, lows):
-        if index_fix:
-            i = opens.index[count]
-            count += 1
-        if open != -1 and close != -1:
-            # Simple modification to draw a line for open == close
-            # if open == close:
-            #     open -= 0.01 * abs(high - low)
-
-            if close > open:
-                poly_segments_up.append(
-                    ((i - delta, open), (i - delta, close),
-                     (i + delta, close), (i + delta, open))
-                )
-                poly_colors_up.append(colorup)
-                if close < high:
-                    line_segments.append(((i, close), (i, high)))
-                    line_colors.append(colorup)
-                if low < open:
-                    line_segments.append(((i, low), (i, open)))
-                    line_colors.append(colorup)
-
-            else:
-                poly_segments_down.append(
-                    ((i - delta, open), (i - delta, close),
-                     (i + delta, close), (i + delta, open))
-                )
-                poly_colors_down.append(colordown)
-                if open < high:
-                    line_segments.append(((i, open), (i, high)))
-                    line_colors.append(colordown)
-                if low < close:
-                    line_segments.append(((i, low), (i, close)))
-                    line_colors.append(colordown)
+    if geometry is None:
+        geometry = _candle_geometry(
+            opens, highs, lows, closes,
+            width=width, index_fix=index_fix)
+
+    x, delta, up = geometry['x'], geometry['delta'], geometry['up']
+    o, h = geometry['open'], geometry['high']
+    l, c = geometry['low'], geometry['close']
+
+    bodies = _boxes(x, delta, o, c)
+
+    # Upper and lower wick of every candle in this order
+    top = np.maximum(o, c)
+    bottom = np.minimum(o, c)
+    wicks = np.empty((len(x), 2, 2, 2))
+    wicks[:, :, :, 0] = x[:, None, None]
+    wicks[:, 0, 0, 1] = top
+    wicks[:, 0, 1, 1] = h
+    wicks[:, 1, 0, 1] = l
+    wicks[:, 1, 1, 1] = bottom
+
+    drawn = np.stack((top < h, l < bottom), axis=1)
+    line_segments = wicks[drawn]
+    segments_up = np.repeat(up[:, None], 2, axis=1)[drawn]
+
+    if merge_wicks:
+        line_segments, line_colors = _merge_segments(
+            line_segments, segments_up, colorup, colordown)
+    else:
+        line_colors = np.where(
+            segments_up[:, None],
+            mcolors.to_rgba(colorup), mcolors.to_rgba(colordown))
 
     use_aa = 0,  # use tuple here
     line_collection = LineCollection(
@@ -95,28 +161,24 @@ def _candlestick2_ohlc(
     )
 
     bar_collection_down = PolyCollection(
-        poly_segments_down,
+        bodies[~up],
         facecolors=label_colors,
-        edgecolors=poly_colors_down,
+        edgecolors=colordown,
         antialiaseds=use_aa,
         linewidths=0,
     )
 
     bar_collection_up = PolyCollection(
-        poly_segments_up,
+        bodies[up],
         facecolors=accent_color,
-        edgecolors=poly_colors_up,
+        edgecolors=colorup,
         antialiaseds=use_aa,
         linewidths=0,
     )
 
-    if index_fix:
-        minx, maxx = closes.index[0], closes.index[-1]
-    else:
-        minx, maxx = 0, len(line_segments)
-
-    miny = min([low for low in lows if low != -1])
-    maxy = max([high for high in highs if high != -1])
+    minx, maxx = geometry['xlim']
+    miny = np.nanmin(l) if len(l) else 0.0
+    maxy = np.nanmax(h) if len(h) else 0.0
 
     corners = (minx, miny), (maxx, maxy)
     ax.update_datalim(corners)
@@ -128,6 +190,93 @@ def _candlestick2_ohlc(
     return line_collection, bar_collection_up, bar_collection_down
 
 
+@staged('volume')
+def _volume_panel(kwa, ax, geometry):
+    """
+    Draws the volume as two PolyCollections with the x positions,
+    widths and colors of the candles on an axis that shares x
+    :param kwa: kwargs of plot_candlestick
+    :param ax: Axis of the candles
+    :param geometry: Result of _candle_geometry
+    :return: Volume axis or None
+    """
+    vax = kwa.get('volume_axis', None)
+    if vax is None and not kwa.get('volume', False):
+        return None
+
+    if geometry['volume'] is None:
+        logger.warning('Column volume not found in dataset')
+        return None
+
+    created = vax is None
+    if created:
+        from mpl_toolkits.axes_grid1 import make_axes_locatable
+        vax = make_axes_locatable(ax).append_axes(
+            'bottom', size='25%', pad=0.1, sharex=ax,
+            facecolor=background_color
+        )
+        ax.tick_params(axis='x', labelbottom=False)
+
+    x, delta, up = geometry['x'], geometry['delta'], geometry['up']
+    volume = geometry['volume']
+    bars = _boxes(x, delta, 0.0, volume)
+
+    use_aa = 0,  # use tuple here
+    bar_collection_down = PolyCollection(
+        bars[~up],
+        facecolors=label_colors,
+        edgecolors=label_colors,
+        antialiaseds=use_aa,
+        linewidths=0,
+    )
+    bar_collection_up = PolyCollection(
+        bars[up],
+        facecolors=accent_color,
+        edgecolors=accent_color,
+        antialiaseds=use_aa,
+        linewidths=0,
+    )
+
+    minx, maxx = geometry['xlim']
+    maxy = np.nanmax(volume) if len(volume) else 1.0
+    vax.update_datalim(((minx, 0.0), (maxx, maxy)))
+    vax.autoscale_view()
+
+    vax.add_collection(bar_collection_up)
+    vax.add_collection(bar_collection_down)
+    _rasterize(kwa, bar_collection_up, bar_collection_down)
+
+    if created or not kwa.get('pre_styled', False):
+        fancy_design(vax, legend=False)
+    vax.tick_params(axis='x', labelrotation=kwa.get('xtickrotation', 35))
+    return vax
+
+
+def _merge_segments(segments, up, colorup, colordown):
+    # One polyline per color. The NaN vertices split it
+    # into the single segments again
+    merged = list()
+    colors = list()
+    order = (True, False) if len(up) and up[0] else (False, True)
+    for is_up in order:
+        selected = segments[up == is_up]
+        if not len(selected):
+            continue
+        path = np.full((len(selected), 3, 2), np.nan)
+        path[:, :2] = selected
+        merged.append(path.reshape(-1, 2))
+        colors.append(colorup if is_up else colordown)
+    return merged, colors
+
+
+def _rasterize(kwa, *artists):
+    # Heavy data layers are embedded as images in vector
+    # output while text, axes and annotations stay vectors
+    if kwa.get('rasterize_data', False):
+        for artist in artists:
+            artist.set_rasterized(True)
+
+
 def _add_text_box(fig, axis, text, x_p, y_p):
     x = axis.get_xlim()
     y = axis.get_ylim()
@@ -149,6 +298,7 @@ def _add_text_box(fig, axis, text, x_p, y_p):
 
 def _vspan(kwa, ax):
     # Vertical span and lines:
+    trading_axis = kwa.get('_trading_axis', None)
     vlines = kwa.get('vline', None)
     if vlines is not None:
         linestyle = '--'
@@ -169,8 +319,15 @@ def _vspan(kwa, ax):
             if 'alpha' in vline:
                 alpha = vline['alpha']
 
+            index = vline['ix']
+            if trading_axis is not None:
+                if not trading_axis.in_range([index])[0]:
+                    # Not in the window of the chart
+                    continue
+                index = trading_axis.positions(index)
+
             plot_vline(
-                axis=ax, index=vline['ix'],
+                axis=ax, index=index,
                 linestyle=linestyle,
                 color=color, linewidth=linewidth,
                 alpha=alpha
@@ -189,8 +346,14 @@ def _vspan(kwa, ax):
             if 'alpha' in vspan:
                 alpha = vspan['alpha']
 
+            index = vspan['ix']
+            if trading_axis is not None:
+                index = trading_axis.clip(*index)
+                if index is None:
+                    continue
+
             plot_vspan(
-                axis=ax, index=vspan['ix'],
+                axis=ax, index=index,
                 color=color, alpha=alpha
             )
 
@@ -208,6 +371,7 @@ def set_axis_label(axis, x=None, y=None, z=None, title=None):
         axis.set_title(title)
 
 
+@staged('decoration')
 def _decoration(kwa, ax, legend):
     # Names, title, labels
     ax.locator_params(axis='x', tight=False)
@@ -230,10 +394,16 @@ def _decoration(kwa, ax, legend):
     )
 
     main_spine = kwa.get('main_spine', 'left')
-    fancy_design(ax, legend, main_spine=main_spine)
+    if kwa.get('pre_styled', False):
+        # Spines, ticks and grid are already styled
+        if legend:
+            _fancy_legend(ax)
+    else:
+        fancy_design(ax, legend, main_spine=main_spine)
 
     rotation = kwa.get('xtickrotation', 35)
-    plt.setp(ax.get_xticklabels(), rotation=rotation)
+    for label in ax.get_xticklabels():
+        label.set_rotation(rotation)
 
     if kwa.get('disable_x_ticks', False):
         # Deactivates labels always for all shared axes
@@ -284,20 +454,76 @@ def xhline(kwa, ax):
             )
 
 
+def _new_figure(kwa, **fig_kw):
+    # Without pyplot the figure gets its own Agg canvas and is
+    # never registered in the global figure manager. This allows
+    # rendering independent charts from several threads.
+    if kwa.get('use_pyplot', True):
+        return _pyplot().figure(**fig_kw)
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(**fig_kw)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+@staged('save')
 def _save_or_show(kwa, fig):
     save = kwa.get('save', '')
     if save:
-        plt.savefig(save, facecolor=fig.get_facecolor())
+        fig.savefig(
+            save, facecolor=fig.get_facecolor(),
+            dpi=kwa.get('save_dpi', None)
+        )
 
     if kwa.get('axis', None) is None and \
-            kwa.get('show', True):
-        plt.show()
+            kwa.get('show', True) and \
+            kwa.get('use_pyplot', True):
+        _pyplot().show()
+
+
+@staged('gradient_fill')
+def _gradient_fill(kwa, ax, series, line, color):
+    # Gradient under the line. The texture is shared by all
+    # lines of the same color and the clip path follows a
+    # downsampled outline of the line.
+    series = series.dropna()
+    if series.empty:
+        return
+
+    alpha = line.get_alpha()
+    alpha = 1.0 if alpha is None else alpha
+
+    if kwa.get('gradient_composite', False):
+        # Drawn later as one image for all lines
+        kwa.setdefault('_gradient_fills', list()).append(
+            (series.index.values, series.values, color, alpha))
+        return
+
+    im, clip_path = gradient_fill(
+        ax, series.index.values, series.values, color,
+        alpha=alpha, zorder=line.get_zorder()
+    )
+    _rasterize(kwa, im, clip_path)
+
+
+@staged('gradient_fill')
+def _composite_gradient_fill(kwa, ax, zorder):
+    fills = kwa.pop('_gradient_fills', None)
+    if fills:
+        im = composite_gradient_fill(ax, fills, zorder=zorder)
+        _rasterize(kwa, im)
 
 
 def _plot(fig, ax, kwa, legend=True, data=None, plot_columns=None):
 
     if plot_columns is None and data is not None:
-        plot_columns = list(data)
+        # All columns with prices, not e.g. a time column
+        plot_columns = [
+            col for col in data if data[col].dtype.kind in 'biuf'
+        ]
 
     # Plot columns
     enable_flags = kwa.get('enable_flags', True)
@@ -311,6 +537,7 @@ def _plot(fig, ax, kwa, legend=True, data=None, plot_columns=None):
 
     if plot_columns is not None and data is not None:
         avaiable_columns = list(data)
+        flag_columns, flag_colors = list(), list()
         for i, col in enumerate(plot_columns):
             if col in avaiable_columns:
                 color = color_set[i % len(color_set)]
@@ -319,42 +546,32 @@ def _plot(fig, ax, kwa, legend=True, data=None, plot_columns=None):
                 line, = ax.plot(series, linewidth=0.7, color=color)
 
                 if gradient_fill:
-                    # From https://stackoverflow.com/questions/29321835/is-it-possible-to-get-color-gradients-
-                    #           under-curve-in-matplotlib?answertab=votes#tab-top
-                    series.dropna(inplace=True)
-                    x = series.index
-                    y = series.values
-
-                    zorder = line.get_zorder()
-                    alpha = line.get_alpha()
-                    alpha = 1.0 if alpha is None else alpha
-
-                    z = np.empty((100, 1, 4), dtype=float)
-                    rgb = mcolors.colorConverter.to_rgb(color)
-                    z[:, :, :3] = rgb
-                    z[:, :, -1] = np.linspace(0, alpha, 100)[:, None]
-
-                    xmin, xmax, ymin, ymax = x.min(), x.max(), y.min(), y.max()
-                    im = ax.imshow(z, aspect='auto', extent=[xmin, xmax, ymin, ymax],
-                                   origin='lower', zorder=zorder)
-
-                    xy = np.column_stack([x, y])
-                    xy = np.vstack([[xmin, ymin], xy, [xmax, ymin], [xmin, ymin]])
-                    clip_path = Polygon(xy, facecolor='none', edgecolor='none', closed=True)
-                    ax.add_patch(clip_path)
-                    im.set_clip_path(clip_path)
+                    _gradient_fill(kwa, ax, series, line, color)
 
                 if enable_flags:
-                    add_price_flag(
-                        fig=fig, axis=ax,
-                        series=data[col],
-                        color=color,
-                        last_index=last_index
-                    )
+                    flag_columns.append(col)
+                    flag_colors.append(color)
             else:
                 logger.warning('Column ' + str(col) +
                                ' not found in dataset')
 
+        if flag_columns:
+            # All flags at once, overlapping flags are moved apart
+            PriceFlags.of(ax).set_frame(
+                data, flag_columns, flag_colors, last_index=last_index)
+
+    if gradient_fill and ax.lines:
+        # Below the lines like the separate gradients
+        _composite_gradient_fill(
+            kwa, ax, zorder=ax.lines[0].get_zorder() - 0.01)
+        # imshow sets the limits to the extent of the last image
+        ax.relim()
+        ax.autoscale_view()
+
+    trading_axis = kwa.get('_trading_axis', None)
+    if trading_axis is not None:
+        trading_axis.install(ax)
+
     _decoration(kwa, ax, legend)
     _vspan(kwa, ax)
     xhline(kwa, ax)
@@ -363,14 +580,57 @@ def _plot(fig, ax, kwa, legend=True, data=None, plot_columns=None):
     return fig, ax
 
 
-def _head(kwargs, data=None, convert_to_numeric=False):
+def _prepare(kwargs, data=None, convert_to_numeric=False, plot_columns=None):
+    """
+    Prepares the data of a chart: reads the window of an
+    OHLCPyramid, computes missing indicator columns, places the
+    bars on a trading axis and converts the columns to numbers.
+    Charts with several panels (see ChartSpec) prepare every
+    dataset once and pass _prepared=True to the plot functions.
+    :param kwargs: kwargs of the plot function. The trading
+        axis is stored in '_trading_axis'
+    :param data: Pandas DataFrame or OHLCPyramid
+    :param convert_to_numeric: If True all columns are
+        converted to numbers
+    :param plot_columns: Columns of the chart
+    :return: Pandas DataFrame
+    """
+    import pandas as pd
+
+    times = None
+    if isinstance(data, OHLCPyramid):
+        # Read the window from the matching timeframe
+        start, stop = kwargs.get('window', None) or (None, None)
+        time_column = data.time_column
+        data = data.window(
+            start, stop, bars=kwargs.get('target_bars', 500))
+        # The window has an integer index, the trading axis is
+        # labeled with the times of the bars
+        times = data[time_column].values
+
+    if plot_columns is not None and isinstance(data, pd.DataFrame):
+        # Compute missing indicator columns like 'EMA_8'
+        data = add_indicators(
+            data, plot_columns,
+            bband_std=kwargs.get('bband_std', 2.0)
+        )
 
-    if kwargs.get('reset_index', False) or kwargs.get('gradient_fill', False):
-        data = data.reset_index()
-        if 'Date' in list(data):
-            data.drop(['Date'], axis=1, inplace=True)
+    trading_axis = kwargs.get('trading_axis', False)
+    if trading_axis is not False and trading_axis is not None \
+            and isinstance(data, pd.DataFrame):
+        if times is None:
+            times = data.index.values
+        if isinstance(trading_axis, TradingAxis):
+            positions = trading_axis.positions(times)
+        else:
+            trading_axis = TradingAxis(times)
+            positions = np.arange(len(data))
+
+        # Bars are placed at their position in trading time
+        data = data.copy(deep=False)
+        data.index = positions
+        kwargs['_trading_axis'] = trading_axis
 
-    # Prepare data ------------------------------------------
     if data is not None:
         if not isinstance(data, pd.DataFrame):
             raise ValueError('Data must be a pandas DataFrame')
@@ -379,16 +639,43 @@ def _head(kwargs, data=None, convert_to_numeric=False):
             raise ValueError('DataFrame is empty')
 
         if convert_to_numeric:
+            data = data.copy(deep=False)
             for col in list(data):
                 data[col] = pd.to_numeric(
                     data[col], errors='coerce')
 
+    return data
+
+
+@staged('head')
+def _head(kwargs, data=None, convert_to_numeric=False, plot_columns=None):
+    if not kwargs.get('_prepared', False):
+        data = _prepare(
+            kwargs, data, convert_to_numeric=convert_to_numeric,
+            plot_columns=plot_columns
+        )
+
+    if kwargs.get('reset_index', False) or kwargs.get('gradient_fill', False):
+        data = data.reset_index()
+        if 'Date' in list(data):
+            data.drop(['Date'], axis=1, inplace=True)
+
     # Build ax ----------------------------------------------
     fig = kwargs.get('fig', None)
+    ax = kwargs.get('axis', None)
+
+    if not kwargs.get('use_pyplot', True):
+        if fig is None:
+            fig = ax.figure if ax is not None else \
+                _new_figure(kwargs, facecolor=background_color)
+        if ax is None:
+            ax = fig.add_subplot(111, facecolor=background_color)
+        return data, fig, ax
+
+    plt = _pyplot()
     if fig is None:
         fig, _ = plt.subplots(facecolor=background_color)
 
-    ax = kwargs.get('axis', None)
     if ax is None:
         ax = plt.subplot2grid(
             (4, 4), (0, 0),
@@ -413,6 +700,7 @@ def _scatter(fig, ax, kwa, legend=True, data=None):
     return fig, ax
 
 
+@staged('signal_evaluation')
 def _signal_eval(ax, signals, kwargs):
     """
     Plots the signals
@@ -430,6 +718,16 @@ def _signal_eval(ax, signals, kwargs):
     :return:
     """
     if signals is not None:
+        from .signal_evaluation import draw_signal_evaluation
+        from .signal_evaluation import draw_verticals
+
+        trading_axis = kwargs.get('_trading_axis', None)
+        if trading_axis is not None:
+            signals = trading_axis.map_signals(signals)
+            if not signals:
+                # All signals are outside of the chart
+                return
+
         if kwargs.get('draw_verticals', True):
             draw_verticals(axis=ax, signals=signals)
         if kwargs.get('signal_evaluation', True):
@@ -449,6 +747,7 @@ def _signal_eval(ax, signals, kwargs):
             )
 
 
+@staged('pattern_evaluation')
 def _pattern_eval(data, ax, cs_patterns, kwargs):
     """
     Plots the candlestick patterns
@@ -471,6 +770,13 @@ def _pattern_eval(data, ax, cs_patterns, kwargs):
     """
     if cs_patterns is not None:
         if kwargs.get('cs_pattern_evaluation', True):
+            from .candlestick_pattern_evaluation import \
+                draw_pattern_evaluation
+
+            trading_axis = kwargs.get('_trading_axis', None)
+            if trading_axis is not None:
+                cs_patterns = trading_axis.map_patterns(cs_patterns)
+
             df = data[['open', 'high', 'low', 'close']]
             draw_pattern_evaluation(
                 axis=ax,
@@ -483,6 +789,19 @@ def _pattern_eval(data, ax, cs_patterns, kwargs):
             )
 
 
+def _fancy_legend(axis):
+    legend = axis.legend(
+        loc='best', fancybox=True, framealpha=0.3
+    )
+
+    legend.get_frame().set_facecolor(background_color)
+    legend.get_frame().set_edgecolor(label_colors)
+
+    for line, text in zip(legend.get_lines(),
+                          legend.get_texts()):
+        text.set_color(line.get_color())
+
+
 def fancy_design(axis, legend=True, main_spine='left'):
     """
     This function changes the design for
@@ -496,16 +815,7 @@ def fancy_design(axis, legend=True, main_spine='left'):
         can be left, right, top, bottom
     """
     if legend:
-        legend = axis.legend(
-            loc='best', fancybox=True, framealpha=0.3
-        )
-
-        legend.get_frame().set_facecolor(background_color)
-        legend.get_frame().set_edgecolor(label_colors)
-
-        for line, text in zip(legend.get_lines(),
-                              legend.get_texts()):
-            text.set_color(line.get_color())
+        _fancy_legend(axis)
 
     axis.grid(linestyle='dotted', color=label_colors, alpha=0.7, animated=True)
 
@@ -534,68 +844,66 @@ def fancy_design(axis, legend=True, main_spine='left'):
     )
 
 
-def add_price_flag(fig, axis, series, color, last_index=None):
+def add_price_flag(fig, axis, series, color, last_index=None,
+                   name=None):
     """
     Add a price flag at the end of the data
-    series in the chart
+    series in the chart. All flags of an axis are managed by
+    one PriceFlags, so flags don't overlap.
     :param fig: Figure
     :param axis: Axis
-    :param series: Pandas Series
+    :param series: Pandas Series or a single value like the
+        current value of an incremental indicator. A single
+        value is placed at last_index
     :param color: Color of the flag
     :param last_index: Last index
+    :param name: Name of the flag. A flag with the same name
+        is moved instead of added. Default is the name of the
+        series
+    :return: PriceFlags of the axis
     """
-
-    series = series.dropna()
-    value = series.tail(1)
-
-    try:
-        index = value.index.tolist()[0]
-        if last_index is not None:
-            axis.plot(
-                [index, last_index], [value.values[0], value.values[0]],
-                color=color, linewidth=0.6, linestyle='--', alpha=0.6
-            )
-        else:
-            last_index = index
-
-        trans_offset = mtrans.offset_copy(
-            axis.transData, fig=fig,
-            x=0.05, y=0.0, units='inches'
-        )
-
-        # Add price text box for candlestick
-        x = value.values[0]
-        if isinstance(x, float):
-            x = format(x, '.6f')
-
-        axis.text(
-            last_index, value.values, x,
-            size=7, va="center", ha="left",
-            transform=trans_offset,
-            color='white',
-            bbox=dict(
-                boxstyle="angled,pad=0.2",
-                alpha=0.6, color=color
-            )
-        )
-
-    except IndexError:
-        pass
-
-
+    flags = PriceFlags.of(axis)
+    if name is None:
+        name = getattr(series, 'name', None)
+    if name is None:
+        name = len(flags.names)
+
+    if np.isscalar(series):
+        if last_index is None:
+            raise ValueError('A single value needs a last_index')
+        flags.set_flags(
+            [name], [last_index], [series], [color],
+            last_index=last_index)
+        return flags
+
+    if np.asarray(series).dtype.kind not in 'biuf':
+        # Times and strings have no price
+        return flags
+
+    rows = last_valid(np.asarray(series, dtype=float)[:, None])
+    if rows[0] >= 0:
+        flags.set_flags(
+            [name], [series.index.values[rows[0]]],
+            [series.values[rows[0]]], [color], last_index=last_index)
+    return flags
+
+
+@staged('plot_candlestick')
 def plot_candlestick(
         data, signals=None, cs_patterns=None,
         plot_columns=None, **kwargs):
     """
     This function plots a candlestick chart
-    :param data: Pandas DataFrame
+    :param data: Pandas DataFrame or OHLCPyramid
     :param signals: List of signals with structure
         [(signal, index, price), ... ]. Signal can be 'BUY'
         or 'SELL'
     :param cs_patterns: List of candlestick patterns with structure
     patterns = [... , ['pattern_name', start_index, stop_index], ... ]
     :param plot_columns: List of columns in the given DataFrame like
-        plot_columns=['bband_upper_20', 'bband_lower_20']
+        plot_columns=['bband_upper_20', 'bband_lower_20'].
+        Missing indicator columns like 'EMA_8' or 'RSI_14' are
+        computed (see indicators.indicator_columns)
     :param kwargs:
         'fig': Figure.
         'axis': Axis. If axis is not given the chart will
@@ -646,25 +954,72 @@ def plot_candlestick(
         'xlabel': x label
         'ylabel': y label
         'gradient_fill': If True color gradients are activated
+        'gradient_composite': If True the gradients of all
+            columns are drawn as one image without clip paths
+        'bband_std': Width of computed bollinger bands in
+            standard deviations. Default is 2
+        'window': Time window (start, stop) read from an
+            OHLCPyramid. Default is all bars
+        'target_bars': Maximum number of bars read from an
+            OHLCPyramid. The finest timeframe with at most this
+            number of bars in the window is used. Default is 500
+        'trading_axis': If True the bars are placed without gaps
+            in trading time and the x ticks show the times of the
+            index. Signals, patterns, vlines and vspans are given
+            as times of the index. A TradingAxis can be passed to
+            share it between panels
+        'rasterize_data': If True the data layers (candles, filled
+            areas and gradients) are rasterized when the chart is
+            saved as vector graphic like svg or pdf. Text, axes and
+            annotations stay vectors. The resolution is set with
+            'save_dpi'
+        'merge_wicks': If True all wicks of the same color are
+            drawn as one path. Reduces the size of vector output
+        'volume': If True the 'volume' column is drawn as bars in a
+            panel below the candles that shares the x axis
+        'volume_axis': Axis of the volume bars. Implies volume=True
+        'max_candles': If there are more rows, consecutive rows are
+            merged into at most this number of candles and volume
+            bars
         'title': title
         'disable_x_ticks': Disables the x ticks
         'show': If true the chart will be plt.show()
         'save': Save the image to a specified path like
             save='path_to_picture.png'
+        'save_dpi': Dots per inch of the saved image
+        'use_pyplot': If False pyplot is not used at all. A new
+            figure is a matplotlib.figure.Figure with its own
+            FigureCanvasAgg and nothing is shown. Use this to
+            render charts from several threads at the same time.
+        'pre_styled': If True the axis was already styled with
+            fancy_design (e.g. by a FigurePool) and only the
+            legend is updated
     :return: fig, ax
     """
-    data, fig, ax = _head(kwargs=kwargs, data=data)
+    data, fig, ax = _head(
+        kwargs=kwargs, data=data, plot_columns=plot_columns)
 
     # Add candlestick
-    _candlestick2_ohlc(
+    geometry = _candle_geometry(
+        data['open'], data['high'],
+        data['low'], data['close'],
+        volumes=data['volume'] if 'volume' in data else None,
+        width=0.6,
+        max_candles=kwargs.get('max_candles', None)
+    )
+    collections = _candlestick2_ohlc(
         ax,
         data['open'], data['high'],
         data['low'], data['close'],
         width=0.6,
         colorup=accent_color,
         colordown=label_colors,
-        alpha=1
+        alpha=1,
+        merge_wicks=kwargs.get('merge_wicks', False),
+        geometry=geometry
     )
+    _rasterize(kwargs, *collections)
+    _volume_panel(kwargs, ax, geometry)
 
     _signal_eval(ax, signals, kwargs)
     _pattern_eval(data, ax, cs_patterns, kwargs)
@@ -678,19 +1033,22 @@ def plot_candlestick(
     )
 
 
+@staged('plot_filled_ohlc')
 def plot_filled_ohlc(
         data, signals=None, cs_patterns=None,
         plot_columns=None, **kwargs):
     """
     This function plots a filled ohlc line chart
-    :param data: Pandas DataFrame
+    :param data: Pandas DataFrame or OHLCPyramid
     :param signals: List of signals with structure
         [(signal, index, price), ... ]. Signal can be 'BUY'
         or 'SELL'
     :param cs_patterns: List of candlestick patterns with structure
     patterns = [... , ['pattern_name', start_index, stop_index], ... ]
     :param plot_columns: List of columns in the given DataFrame like
-        plot_columns=['bband_upper_20', 'bband_lower_20']
+        plot_columns=['bband_upper_20', 'bband_lower_20'].
+        Missing indicator columns like 'EMA_8' or 'RSI_14' are
+        computed (see indicators.indicator_columns)
     :param kwargs:
         'fig': Figure.
         'axis': Axis. If axis is not given the chart will
@@ -741,17 +1099,45 @@ def plot_filled_ohlc(
         'xlabel': x label
         'ylabel': y label
         'gradient_fill': If True color gradients are activated
+        'gradient_composite': If True the gradients of all
+            columns are drawn as one image without clip paths
+        'bband_std': Width of computed bollinger bands in
+            standard deviations. Default is 2
+        'window': Time window (start, stop) read from an
+            OHLCPyramid. Default is all bars
+        'target_bars': Maximum number of bars read from an
+            OHLCPyramid. The finest timeframe with at most this
+            number of bars in the window is used. Default is 500
+        'trading_axis': If True the bars are placed without gaps
+            in trading time and the x ticks show the times of the
+            index. Signals, patterns, vlines and vspans are given
+            as times of the index. A TradingAxis can be passed to
+            share it between panels
+        'rasterize_data': If True the data layers (candles, filled
+            areas and gradients) are rasterized when the chart is
+            saved as vector graphic like svg or pdf. Text, axes and
+            annotations stay vectors. The resolution is set with
+            'save_dpi'
         'title': title
         'disable_x_ticks': Disables the x ticks
         'show': If true the chart will be plt.show()
         'save': Save the image to a specified path like
             save='path_to_picture.png'
+        'save_dpi': Dots per inch of the saved image
+        'use_pyplot': If False pyplot is not used at all. A new
+            figure is a matplotlib.figure.Figure with its own
+            FigureCanvasAgg and nothing is shown. Use this to
+            render charts from several threads at the same time.
+        'pre_styled': If True the axis was already styled with
+            fancy_design (e.g. by a FigurePool) and only the
+            legend is updated
     :return: fig, ax
     """
-    data, fig, ax = _head(kwargs=kwargs, data=data)
+    data, fig, ax = _head(
+        kwargs=kwargs, data=data, plot_columns=plot_columns)
 
     # Add filled_ohlc
-    ax.fill_between(
+    upper = ax.fill_between(
         data.index,
         data['close'],
         data['high'],
@@ -761,7 +1147,7 @@ def plot_filled_ohlc(
         alpha=0.35,
         edgecolor=accent_color
     )
-    ax.fill_between(
+    lower = ax.fill_between(
         data.index,
         data['close'],
         data['low'],
@@ -771,6 +1157,7 @@ def plot_filled_ohlc(
         alpha=0.35,
         edgecolor=label_colors
     )
+    _rasterize(kwargs, upper, lower)
 
     _signal_eval(ax, signals, kwargs)
     _pattern_eval(data, ax, cs_patterns, kwargs)
@@ -784,6 +1171,7 @@ def plot_filled_ohlc(
     )
 
 
+@staged('scatter')
 def scatter(data, **kwargs):
     """
     This function provides a simple way to plot scattered data
@@ -834,10 +1222,19 @@ def scatter(data, **kwargs):
         'show': If true the chart will be plt.show()
         'save': Save the image to a specified path like
             save='path_to_picture.png'
+        'save_dpi': Dots per inch of the saved image
+        'use_pyplot': If False pyplot is not used at all. A new
+            figure is a matplotlib.figure.Figure with its own
+            FigureCanvasAgg and nothing is shown. Use this to
+            render charts from several threads at the same time.
+        'pre_styled': If True the axis was already styled with
+            fancy_design (e.g. by a FigurePool) and only the
+            legend is updated
     :return: fig, ax
     """
 
-    data, fig, ax = _head(kwargs=kwargs, data=data, convert_to_numeric=False)
+    # data is a list of tuples and no DataFrame
+    _, fig, ax = _head(kwargs=kwargs)
 
     return _scatter(
         fig=fig,
@@ -848,6 +1245,7 @@ def scatter(data, **kwargs):
     )
 
 
+@staged('scatter_3d')
 def scatter_3d(data, class_conditions=None, threshold=0, **kwargs):
     """
         This function provides a simple way to plot scattered data
@@ -879,9 +1277,14 @@ def scatter_3d(data, class_conditions=None, threshold=0, **kwargs):
             'zlabel': z label
             'title': title
             'show': If true the chart will be plt.show()
-        :return: None
+            'use_pyplot': If False the figure is created without
+                pyplot (see plot_candlestick)
+        :return: fig, ax
         """
-    fig = plt.figure()
+    # Registers the 3d projection
+    from mpl_toolkits.mplot3d import Axes3D  # noqa: F401
+
+    fig = _new_figure(kwargs)
     ax = fig.add_subplot(111, projection='3d')
 
     set_axis_label(
@@ -915,17 +1318,22 @@ def scatter_3d(data, class_conditions=None, threshold=0, **kwargs):
                 else:
                     ax.scatter(point[0], point[1], point[2], color=color_below_th)
 
-    if kwargs.get('show', False):
-        plt.show()
+    if kwargs.get('show', False) and kwargs.get('use_pyplot', True):
+        _pyplot().show()
+
+    return fig, ax
 
 
+@staged('plot')
 def plot(data, plot_columns=None, **kwargs):
     """
     This function provides a simple way to plot time series
     for example data['close'].
     :param data: Pandas DataFrame object
     :param plot_columns: Name of the columns to plot.
-        If plot_columns is None all columns well be ploted
+        If plot_columns is None all numeric columns well be ploted.
+        Missing indicator columns like 'EMA_8' or 'RSI_14' are
+        computed (see indicators.indicator_columns)
     :param kwargs:
         'fig': Figure.
         'axis': Axis. If axis is not given the chart will
@@ -968,6 +1376,17 @@ def plot(data, plot_columns=None, **kwargs):
         'xlabel': x label
         'ylabel': y label
         'gradient_fill': If True color gradients are activated
+        'gradient_composite': If True the gradients of all
+            columns are drawn as one image without clip paths
+        'bband_std': Width of computed bollinger bands in
+            standard deviations. Default is 2
+        'trading_axis': If True the x axis shows the times of the
+            index without gaps (see plot_candlestick)
+        'rasterize_data': If True the data layers (candles, filled
+            areas and gradients) are rasterized when the chart is
+            saved as vector graphic like svg or pdf. Text, axes and
+            annotations stay vectors. The resolution is set with
+            'save_dpi'
         'title': title
         'disable_x_ticks': Disables the x ticks
         'reset_index': Reset the index if True
@@ -975,10 +1394,19 @@ def plot(data, plot_columns=None, **kwargs):
         'show': If true the chart will be plt.show()
         'save': Save the image to a specified path like
             save='path_to_picture.png'
+        'save_dpi': Dots per inch of the saved image
+        'use_pyplot': If False pyplot is not used at all. A new
+            figure is a matplotlib.figure.Figure with its own
+            FigureCanvasAgg and nothing is shown. Use this to
+            render charts from several threads at the same time.
+        'pre_styled': If True the axis was already styled with
+            fancy_design (e.g. by a FigurePool) and only the
+            legend is updated
     :return: fig, ax
     """
 
-    data, fig, ax = _head(kwargs=kwargs, data=data)
+    data, fig, ax = _head(
+        kwargs=kwargs, data=data, plot_columns=plot_columns)
 
     return _plot(
         fig=fig,
@@ -990,6 +1418,7 @@ def plot(data, plot_columns=None, **kwargs):
     )
 
 
+@staged('bar')
 def bar(data, **kwargs):
     """
     This function provides a simple way to plot a barchart
@@ -1008,6 +1437,14 @@ def bar(data, **kwargs):
         'show': If true the chart will be plt.show()
         'save': Save the image to a specified path like
             save='path_to_picture.png'
+        'save_dpi': Dots per inch of the saved image
+        'use_pyplot': If False pyplot is not used at all. A new
+            figure is a matplotlib.figure.Figure with its own
+            FigureCanvasAgg and nothing is shown. Use this to
+            render charts from several threads at the same time.
+        'pre_styled': If True the axis was already styled with
+            fancy_design (e.g. by a FigurePool) and only the
+            legend is updated
     :return: fig, ax
     """
     # prepare data
@@ -1034,7 +1471,8 @@ def bar(data, **kwargs):
         color=accent_color
     )
 
-    plt.yticks(y_pos, objects)
+    ax.set_yticks(y_pos)
+    ax.set_yticklabels(objects)
 
     return _plot(
         fig=fig,
@@ -1043,6 +1481,7 @@ def bar(data, **kwargs):
     )
 
 
+@staged('hist')
 def hist(data, **kwargs):
     """
     This function provides a simple way to plot a histogram
@@ -1064,6 +1503,14 @@ def hist(data, **kwargs):
         'show': If true the chart will be plt.show()
         'save': Save the image to a specified path like
             save='path_to_picture.png'
+        'save_dpi': Dots per inch of the saved image
+        'use_pyplot': If False pyplot is not used at all. A new
+            figure is a matplotlib.figure.Figure with its own
+            FigureCanvasAgg and nothing is shown. Use this to
+            render charts from several threads at the same time.
+        'pre_styled': If True the axis was already styled with
+            fancy_design (e.g. by a FigurePool) and only the
+            legend is updated
     :return: fig, ax
     """
     # Generate chart
@@ -0,0 +1,153 @@
+import numpy as np
+
+from .figure_pool import FigurePool
+from .indicators import add_indicators
+from .mpl_finance_ext import plot_candlestick
+from .profiling import staged
+from .pyramid import _to_period
+
+# A4 landscape
+_A4 = (11.69, 8.27)
+
+
+def page_windows(index, period=None, bars=None):
+    """
+    Splits a sorted index into windows of a fixed time period
+    or a fixed number of bars
+    :param index: Sorted index values. Datetimes or numbers
+    :param period: Length of a window like '1D' for datetimes or
+        a number in the unit of the index. Windows are aligned
+        to multiples of the period
+    :param bars: Number of bars of a window
+    :return: List of (start, stop) row positions
+    """
+    if (period is None) == (bars is None):
+        raise ValueError('Either period or bars must be set')
+
+    values = np.asarray(index)
+    n = len(values)
+    if n == 0:
+        return []
+
+    if bars is not None:
+        if bars < 1:
+            raise ValueError('A page needs at least one bar')
+        starts = np.arange(0, n, int(bars))
+    else:
+        datetime = np.issubdtype(values.dtype, np.datetime64)
+        if datetime:
+            values = values.astype('datetime64[ns]').view(np.int64)
+        keys = values // _to_period(period, datetime)
+
+        change = np.empty(n, dtype=bool)
+        change[0] = True
+        np.not_equal(keys[1:], keys[:-1], out=change[1:])
+        starts = np.flatnonzero(change)
+
+    stops = np.append(starts[1:], n)
+    return [(int(a), int(b)) for a, b in zip(starts, stops)]
+
+
+def in_window(signals, cs_patterns, first, last):
+    """
+    Returns the signals and candlestick patterns of a window
+    :param signals: Signals like [['BUY', x, price], ...]
+    :param cs_patterns: Patterns like [[name, start, stop], ...]
+    :param first: First x of the window
+    :param last: Last x of the window (inclusive)
+    :return: signals, cs_patterns. Patterns that overlap the
+        border are clipped to the window. None instead of an
+        empty list, the plot functions expect at least one
+    """
+    if signals:
+        signals = [
+            s for s in signals if first <= s[1] <= last
+        ] or None
+    if cs_patterns:
+        cs_patterns = [
+            [p[0], max(p[1], first), min(p[2], last)] + list(p[3:])
+            for p in cs_patterns if p[2] >= first and p[1] <= last
+        ] or None
+    return signals or None, cs_patterns or None
+
+
+@staged('pdf_pages')
+def write_pdf_pages(file, data, func=plot_candlestick, period=None,
+                    bars=None, signals=None, cs_patterns=None,
+                    plot_columns=None, figsize=_A4, dpi=None,
+                    metadata=None, **kwargs):
+    """
+    Writes a long history as a multi-page PDF with one page per
+    window. One figure is styled once and reused for all pages,
+    only its data artists are swapped. Every page is written
+    into the PDF before the next one is drawn, so the memory
+    of the figure is bounded by one window:
+
+        write_pdf_pages('audit.pdf', data, period='1D',
+                        plot_columns=['EMA_8'], signals=signals)
+
+    With an iterable of DataFrames, e.g. a generator that reads
+    one window after the other with read_npy_dir(), only one
+    window of the data is in memory at a time.
+    :param file: Path or writable file-like object
+    :param data: Pandas DataFrame or iterable of DataFrames
+        with one DataFrame per page
+    :param func: plot_candlestick or plot_filled_ohlc
+    :param period: Time period of a page like '1D'. See
+        page_windows()
+    :param bars: Number of bars of a page
+    :param signals: Signals (see plot_candlestick). Every page
+        gets the signals of its window
+    :param cs_patterns: Candlestick patterns
+    :param plot_columns: Columns. Indicators of a DataFrame are
+        computed once for the whole history, so they don't
+        restart on every page
+    :param figsize: Page size in inches. Default is A4 landscape
+    :param dpi: Dots per inch of rasterized layers
+    :param metadata: PDF metadata like {'Title': 'BTC 2018'}
+    :param kwargs: kwargs of func. Without 'title' every page
+        is titled with its first and last index. Pages with a
+        DatetimeIndex use trading_axis=True by default
+    :return: Number of pages
+    """
+    import pandas as pd
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    if isinstance(data, pd.DataFrame):
+        data = add_indicators(
+            data, plot_columns, bband_std=kwargs.get('bband_std', 2.0))
+        pages = (
+            data.iloc[start:stop]
+            for start, stop in page_windows(data.index.values, period, bars)
+        )
+    else:
+        pages = data
+
+    pool = FigurePool(figsize=figsize, dpi=dpi, size=1)
+    count = 0
+    with PdfPages(file, metadata=metadata) as pdf, \
+            pool.figure() as pooled:
+        for page in pages:
+            if page.empty:
+                continue
+
+            first, last = page.index[0], page.index[-1]
+            page_signals, page_patterns = in_window(
+                signals, cs_patterns, first, last)
+
+            options = dict(kwargs)
+            if isinstance(page.index, pd.DatetimeIndex):
+                # Candles are placed at integer positions
+                options.setdefault('trading_axis', True)
+            options.setdefault('title', '{} - {}'.format(first, last))
+            func(
+                page, signals=page_signals, cs_patterns=page_patterns,
+                plot_columns=plot_columns,
+                **pooled.render_kwargs(0, **options)
+            )
+
+            pdf.savefig(pooled.fig, facecolor=pooled.fig.get_facecolor())
+            pooled.clear()
+            count += 1
+
+    return count
@@ -0,0 +1,323 @@
+import numpy as np
+from matplotlib.artist import Artist
+from matplotlib.artist import allow_rasterization
+from matplotlib.collections import LineCollection
+from matplotlib.transforms import IdentityTransform
+
+from .profiling import staged
+
+
+def last_valid(values):
+    """
+    Finds the last non-NaN value of every column in one pass.
+    Columns that end with a value are not scanned at all.
+    :param values: 2D array, one column per series
+    :return: Row of the last value of every column, -1 if a
+        column has none
+    """
+    values = np.asarray(values, dtype=float)
+    n = values.shape[0]
+    rows = np.full(values.shape[1], n - 1 if n else -1, dtype=np.intp)
+    if not n:
+        return rows
+
+    gaps = np.flatnonzero(np.isnan(values[-1]))
+    if len(gaps):
+        valid = ~np.isnan(values[:, gaps])
+        rows[gaps] = np.where(
+            valid.any(axis=0),
+            n - 1 - np.argmax(valid[::-1], axis=0), -1)
+    return rows
+
+
+def _numeric(values):
+    # Numbers and booleans can be flagged, times and strings not
+    return np.asarray(values).dtype.kind in 'biuf'
+
+
+def _value(value):
+    # A current value that moves a flag, None and NaN don't
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if np.isnan(value) else value
+
+
+def resolve_overlaps(y, height):
+    """
+    Moves positions apart so that boxes of the given height
+    don't overlap, with the least total movement. The sorted
+    positions are swept once, overlapping boxes are merged
+    into a stack centered on their wanted positions.
+    :param y: Wanted centers
+    :param height: Height of a box
+    :return: Centers in the order of y
+    """
+    y = np.asarray(y, dtype=float)
+    order = np.argsort(y, kind='stable')
+
+    # Stacks: first center, number of boxes and the sum of the
+    # wanted first center of every member
+    starts, sizes, sums = list(), list(), list()
+    for value in y[order]:
+        starts.append(value)
+        sizes.append(1)
+        sums.append(value)
+        while len(starts) > 1 and \
+                starts[-2] + sizes[-2] * height > starts[-1]:
+            size, total = sizes.pop(), sums.pop()
+            starts.pop()
+            # Members of the upper stack move up by the lower one
+            sums[-1] += total - size * sizes[-1] * height
+            sizes[-1] += size
+            starts[-1] = sums[-1] / sizes[-1]
+
+    resolved = np.empty(len(y))
+    resolved[order] = np.repeat(starts, sizes) + height * np.concatenate(
+        [np.arange(size) for size in sizes] or [np.empty(0)])
+    return resolved
+
+
+class PriceFlags(Artist):
+    """
+    The price flags of one axis: a text box with the last
+    value of every series at the end of the chart and a dashed
+    line from the value to the box. All lines are one
+    LineCollection. The boxes are placed at draw time in
+    display coordinates, boxes that would overlap are moved
+    apart (see resolve_overlaps), so they stay readable after
+    zooming and resizing.
+
+        flags = PriceFlags.of(ax)
+        flags.set_frame(data, ['EMA_8', 'MA_36'], last_index=x)
+        ...
+        flags.update(new_bars, last_index=x)
+    """
+
+    zorder = 3
+
+    def __init__(self, axis, size=7, offset=0.05, pad=0.2,
+                 animated=False):
+        """
+        :param axis: Axis
+        :param size: Font size of the values
+        :param offset: Distance between the end and the boxes
+            in inches
+        :param pad: Padding of the boxes relative to the size
+        :param animated: If True the flags are only drawn with
+            axis.draw_artist(), e.g. for blitting
+        """
+        from .mpl_finance_ext import _register_angled_box_style
+
+        super(PriceFlags, self).__init__()
+        _register_angled_box_style()
+
+        self.size = size
+        self.offset = offset
+        self.pad = pad
+        self.set_animated(animated)
+
+        self.names = list()
+        self.colors = list()
+        self._x = np.empty(0)
+        self._y = np.empty(0)
+        self._end = np.empty(0)
+        self._texts = list()
+
+        self._lines = LineCollection(
+            [], linewidths=0.6, linestyles='--', alpha=0.6,
+            animated=animated)
+        axis.add_collection(self._lines, autolim=False)
+        axis.add_artist(self)
+        self.set_clip_on(False)
+
+    @classmethod
+    def of(cls, axis, **kwargs):
+        """
+        Returns the flags of an axis and creates them on first use
+        :param axis: Axis
+        :param kwargs: kwargs of PriceFlags for new flags
+        :return: PriceFlags
+        """
+        flags = getattr(axis, '_price_flags', None)
+        if flags is None or flags.axes is not axis:
+            flags = axis._price_flags = cls(axis, **kwargs)
+        return flags
+
+    def _convert(self, values):
+        return np.asarray(
+            self.axes.xaxis.convert_units(np.asarray(values)),
+            dtype=float)
+
+    def _changed(self):
+        segments = np.empty((len(self._x), 2, 2))
+        segments[:, 0, 0] = self._x
+        segments[:, 1, 0] = self._end
+        segments[:, :, 1] = self._y[:, None]
+        # Flags without an end have no line
+        drawn = ~np.isnan(self._end)
+        self._lines.set_segments(segments[drawn])
+        self._lines.set_color(
+            [c for c, d in zip(self.colors, drawn) if d])
+
+        for text, value in zip(self._texts, self._y):
+            text.set_text(
+                '' if np.isnan(value) else format(value, '.6f'))
+        self.stale = True
+
+    @staged('price_flag')
+    def set_flags(self, names, x, values, colors, last_index=None):
+        """
+        Sets flags. Flags with a new name are added, the others
+        are moved in place.
+        :param names: Names of the series
+        :param x: x of the last value of every series
+        :param values: Last values
+        :param colors: Colors
+        :param last_index: End of the chart. The boxes are placed
+            there with a dashed line from the value. If None the
+            boxes are placed at the values.
+        """
+        x = self._convert(x)
+        values = np.asarray(values, dtype=float)
+        end = np.full(len(x), np.nan if last_index is None
+                      else self._convert([last_index])[0])
+
+        for name, color in zip(names, colors):
+            if name not in self.names:
+                # matplotlib.text loads the font manager
+                from matplotlib.text import Text
+
+                self.names.append(name)
+                self.colors.append(color)
+                self._texts.append(Text(
+                    0, 0, '', size=self.size, va='center', ha='left',
+                    color='white', transform=IdentityTransform(),
+                    bbox=dict(boxstyle='angled,pad=' + str(self.pad),
+                              alpha=0.6, color=color)
+                ))
+                self._texts[-1].set_figure(self.axes.figure)
+
+        count = len(self.names)
+        pad = count - len(self._x)
+        if pad:
+            self._x = np.append(self._x, np.full(pad, np.nan))
+            self._y = np.append(self._y, np.full(pad, np.nan))
+            self._end = np.append(self._end, np.full(pad, np.nan))
+
+        rows = np.array([self.names.index(n) for n in names], dtype=int)
+        if len(rows):
+            self._x[rows] = x
+            self._y[rows] = values
+            self._end[rows] = end
+        self._changed()
+
+    def set_frame(self, data, columns, colors=None, last_index=None):
+        """
+        Sets the flags of DataFrame columns at their last valid
+        values
+        :param data: Pandas DataFrame
+        :param columns: Columns. Columns that are not numeric
+            are skipped
+        :param colors: Color of every column. Default is
+            color_set like the lines of the plot functions
+        :param last_index: End of the chart
+        """
+        if colors is None:
+            from .mpl_finance_ext import color_set
+            colors = [
+                color_set[i % len(color_set)] for i in range(len(columns))
+            ]
+        # Columns that are not numbers like a time column get no
+        # flag, like with the default plot_columns of all columns
+        keep = [_numeric(data[col].values) for col in columns]
+        columns = [c for c, k in zip(columns, keep) if k]
+        colors = [c for c, k in zip(colors, keep) if k]
+        if not columns:
+            return
+
+        values = data[columns].values
+        rows = last_valid(values)
+        found = rows >= 0
+        rows = rows[found]
+        self.set_flags(
+            [c for c, f in zip(columns, found) if f],
+            data.index.values[rows],
+            values[rows, np.flatnonzero(found)],
+            [c for c, f in zip(colors, found) if f],
+            last_index=last_index
+        )
+
+    def update(self, data, last_index=None):
+        """
+        Moves the flags in place after bars were appended
+        :param data: DataFrame with the new bars of some of the
+            series or a dictionary of names and current values,
+            e.g. of an IndicatorStream. Current values are placed
+            at last_index. NaN, None and values that are not
+            numbers keep the flag where it is.
+        :param last_index: End of the chart
+        """
+        if isinstance(data, dict):
+            if last_index is None:
+                raise ValueError('Current values need a last_index')
+            current = dict(
+                (name, _value(value)) for name, value in data.items()
+                if name in self.names
+            )
+            names = [
+                name for name, value in current.items() if value is not None
+            ]
+            values = [current[name] for name in names]
+            x = [last_index] * len(names)
+        else:
+            names = [
+                name for name in data
+                if name in self.names and _numeric(data[name].values)
+            ]
+            values = data[names].values
+            rows = last_valid(values)
+            found = rows >= 0
+            names = [n for n, f in zip(names, found) if f]
+            x = data.index.values[rows[found]]
+            values = values[rows[found], np.flatnonzero(found)]
+
+        colors = [self.colors[self.names.index(n)] for n in names]
+        self.set_flags(names, x, values, colors, last_index=last_index)
+
+        if last_index is not None:
+            # All lines end at the new end of the chart
+            self._end[:] = self._convert([last_index])[0]
+            self._changed()
+
+    def remove(self):
+        if self._lines.axes is not None:
+            self._lines.remove()
+        super(PriceFlags, self).remove()
+
+    @allow_rasterization
+    def draw(self, renderer):
+        if not self.get_visible() or not self.names:
+            return
+
+        shown = ~np.isnan(self._y)
+        if not shown.any():
+            return
+
+        x = np.where(np.isnan(self._end), self._x, self._end)
+        points = self.axes.transData.transform(
+            np.column_stack((x, self._y))[shown])
+        points[:, 0] += self.offset * self.axes.figure.dpi
+
+        # Height of a box with its padding
+        texts = [t for t, s in zip(self._texts, shown) if s]
+        size = renderer.points_to_pixels(self.size)
+        height = texts[0].get_window_extent(renderer).height + \
+            2 * self.pad * size + 1.0
+        points[:, 1] = resolve_overlaps(points[:, 1], height)
+
+        for text, point in zip(texts, points):
+            text.set_position(point)
+            text.draw(renderer)
+        self.stale = False
@@ -0,0 +1,246 @@
+import functools
+import sys
+import threading
+import time
+import tracemalloc
+
+import logging
+logger = logging.getLogger('mpl_finance_ext')
+
+_local = threading.local()
+_callbacks = list()
+
+
+def add_stage_callback(callback):
+    """
+    Registers a function that is called with the record
+    of every finished stage in every thread:
+        {'name': 'head', 'depth': 1, 'wall': 0.001,
+         'blocks': 120, 'memory': None}
+    :param callback: Function with one parameter
+    """
+    _callbacks.append(callback)
+
+
+def remove_stage_callback(callback):
+    """
+    Removes a function registered with add_stage_callback
+    :param callback: Function
+    """
+    _callbacks.remove(callback)
+
+
+class _Stage(object):
+    # Measures one internal stage. If neither a profiler is
+    # active in this thread nor a callback is registered
+    # the only work is one attribute lookup.
+    __slots__ = ('name', '_profiler', '_start',
+                 '_blocks', '_memory', '_depth')
+
+    def __init__(self, name):
+        self.name = name
+        self._start = None
+
+    def __enter__(self):
+        profiler = getattr(_local, 'profiler', None)
+        if profiler is None and not _callbacks:
+            return self
+
+        self._profiler = profiler
+        self._depth = getattr(_local, 'depth', 0)
+        _local.depth = self._depth + 1
+
+        self._memory = tracemalloc.get_traced_memory()[0] \
+            if tracemalloc.is_tracing() else None
+        self._blocks = sys.getallocatedblocks()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self._start is None:
+            return False
+
+        wall = time.perf_counter() - self._start
+        blocks = sys.getallocatedblocks() - self._blocks
+        memory = None
+        if self._memory is not None and tracemalloc.is_tracing():
+            memory = tracemalloc.get_traced_memory()[0] - self._memory
+        _local.depth = self._depth
+
+        record = {
+            'name': self.name,
+            'depth': self._depth,
+            'wall': wall,
+            'blocks': blocks,
+            'memory': memory,
+        }
+
+        if self._profiler is not None:
+            self._profiler._add(record)
+        for callback in list(_callbacks):
+            callback(record)
+        return False
+
+
+def stage(name):
+    """
+    Context manager that measures an internal stage
+    :param name: Name of the stage
+    """
+    return _Stage(name)
+
+
+def staged(name):
+    """
+    Decorator version of stage()
+    :param name: Name of the stage
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class StageProfiler(object):
+    """
+    Records wall time and allocations of the internal stages
+    of all charts rendered in the current thread:
+
+        with StageProfiler(log=True) as profiler:
+            fig, ax = plot_candlestick(data, use_pyplot=False)
+            fig.savefig('chart.png')
+        print(profiler.report())
+
+    Allocations are the change of the number of memory blocks
+    allocated by the interpreter. With trace_memory=True the
+    change of memory traced by tracemalloc is recorded too.
+    """
+
+    def __init__(self, log=False, trace_memory=False):
+        """
+        :param log: If True every stage is logged with the
+            mpl_finance_ext logger
+        :param trace_memory: If True tracemalloc is started
+        """
+        self.log = log
+        self.trace_memory = trace_memory
+        self.records = list()
+        self._previous = None
+        self._started_tracing = False
+
+    def __enter__(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+        self._previous = getattr(_local, 'profiler', None)
+        _local.profiler = self
+        return self
+
+    def __exit__(self, *exc):
+        _local.profiler = self._previous
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return False
+
+    def _add(self, record):
+        self.records.append(record)
+        if self.log:
+            logger.info(
+                '%s%s: %.3f ms, %d blocks',
+                '  ' * record['depth'], record['name'],
+                record['wall'] * 1000.0, record['blocks']
+            )
+
+    def report(self):
+        """
+        :return: Dictionary with all stage records in the
+            order they finished and the totals per stage
+        """
+        totals = dict()
+        for record in self.records:
+            total = totals.setdefault(record['name'], {
+                'calls': 0, 'wall': 0.0, 'blocks': 0
+            })
+            total['calls'] += 1
+            total['wall'] += record['wall']
+            total['blocks'] += record['blocks']
+
+        return {
+            'stages': list(self.records),
+            'totals': totals,
+        }
+
+
+def profile_draw(fig, log=False):
+    """
+    Draws a figure and measures the render time of every artist.
+    Inclusive time contains the time of the children of an
+    artist, exclusive time does not.
+    :param fig: Figure
+    :param log: If True the result is logged with the
+        mpl_finance_ext logger
+    :return: List of dictionaries sorted by exclusive time:
+        {'artist': 'PolyCollection', 'label': '_child0',
+         'inclusive': 0.02, 'exclusive': 0.02, 'calls': 1}
+    """
+    stats = dict()
+    stack = list()
+
+    def wrap(artist, draw):
+        def timed_draw(renderer, *args, **kwargs):
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return draw(renderer, *args, **kwargs)
+            finally:
+                inclusive = time.perf_counter() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += inclusive
+
+                entry = stats.setdefault(id(artist), {
+                    'artist': type(artist).__name__,
+                    'label': artist.get_label(),
+                    'inclusive': 0.0,
+                    'exclusive': 0.0,
+                    'calls': 0,
+                })
+                entry['inclusive'] += inclusive
+                entry['exclusive'] += inclusive - children
+                entry['calls'] += 1
+        return timed_draw
+
+    artists = list()
+    seen = set()
+    for artist in fig.findobj():
+        if id(artist) not in seen:
+            seen.add(id(artist))
+            artists.append(artist)
+
+    for artist in artists:
+        artist.draw = wrap(artist, artist.draw)
+
+    try:
+        fig.canvas.draw()
+    finally:
+        for artist in artists:
+            del artist.draw
+
+    result = sorted(
+        stats.values(), key=lambda e: e['exclusive'], reverse=True)
+
+    if log:
+        for entry in result:
+            logger.info(
+                '%s %s: %.3f ms (%.3f ms inclusive)',
+                entry['artist'], entry['label'],
+                entry['exclusive'] * 1000.0,
+                entry['inclusive'] * 1000.0
+            )
+
+    return result
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .render_cache import normalize
+
+# How the columns of a bar are aggregated. All other
+# columns (e.g. volume) are summed.
+_FIRST = ('open',)
+_LAST = ('close',)
+_MAX = ('high',)
+_MIN = ('low',)
+
+_META = 'pyramid.json'
+
+
+def _to_int(value, datetime):
+    # Times as int64. With a datetime time column anything
+    # pandas understands is accepted like '2018-03-14 17:00'.
+    if value is None:
+        return None
+    if datetime:
+        import pandas as pd
+        return pd.Timestamp(value).value
+    return int(value)
+
+
+def _to_period(value, datetime):
+    if datetime:
+        import pandas as pd
+        return pd.Timedelta(value).value
+    return int(value)
+
+
+def aggregate_ohlc(time, values, columns, period):
+    """
+    Aggregates bars into buckets of a fixed period with one
+    reduceat per column
+    :param time: Sorted int64 array with the start of every bar
+    :param values: Array of shape (rows, len(columns))
+    :param columns: Names of the columns
+    :param period: Length of a bucket in the unit of time
+    :return: time, values of the aggregated bars
+    """
+    n = len(time)
+    if n == 0:
+        return time[:0].copy(), values[:0].copy()
+
+    bucket = time // period
+    change = np.empty(n, dtype=bool)
+    change[0] = True
+    np.not_equal(bucket[1:], bucket[:-1], out=change[1:])
+    starts = np.flatnonzero(change)
+    ends = np.empty_like(starts)
+    ends[:-1] = starts[1:] - 1
+    ends[-1] = n - 1
+
+    out = np.empty((len(starts), len(columns)))
+    for j, col in enumerate(columns):
+        column = values[:, j]
+        if col in _FIRST:
+            out[:, j] = column[starts]
+        elif col in _LAST:
+            out[:, j] = column[ends]
+        elif col in _MAX:
+            out[:, j] = np.maximum.reduceat(column, starts)
+        elif col in _MIN:
+            out[:, j] = np.minimum.reduceat(column, starts)
+        else:
+            out[:, j] = np.add.reduceat(column, starts)
+
+    return bucket[starts] * period, out
+
+
+class OHLCPyramid(object):
+    """
+    OHLC bars of several timeframes. Every level is built from
+    the level below with vectorized aggregation and stored as
+    one contiguous int64 time array and one float64 block of
+    the columns, optionally memory-mapped in a directory:
+
+        pyramid = OHLCPyramid(data, periods=[300, 3600, 86400],
+                              time_column='date')
+        plot_candlestick(pyramid, window=(start, stop),
+                         target_bars=300)
+
+    A window is read from the finest level that has at most
+    the target number of bars in it. Choosing the level and
+    slicing it are binary searches, the raw bars below are
+    not touched.
+    """
+
+    def __init__(self, data, periods, time_column='date',
+                 columns=None, directory=None):
+        """
+        :param data: Pandas DataFrame sorted by time
+        :param periods: Increasing periods of the levels above
+            the raw bars. Every period must be a multiple of the
+            one before. In the unit of the time column or, for a
+            datetime column, like '5min' or '1h'
+        :param time_column: Column with the time of the bars. If
+            None the index is used
+        :param columns: Aggregated columns. Default are open,
+            high, low, close and volume if available
+        :param directory: If given the levels are stored as .npy
+            files in this directory and memory-mapped
+        """
+        if columns is None:
+            columns = [
+                col for col in ('open', 'high', 'low', 'close', 'volume')
+                if col in data
+            ]
+
+        times = data.index.values if time_column is None \
+            else data[time_column].values
+        self.datetime = bool(np.issubdtype(times.dtype, np.datetime64))
+        if self.datetime:
+            times = times.astype('datetime64[ns]')
+
+        self.time_column = time_column or 'date'
+        self.columns = list(columns)
+        self.periods = [_to_period(p, self.datetime) for p in periods]
+        self.directory = directory
+
+        for lower, upper in zip(self.periods, self.periods[1:]):
+            if upper <= lower or upper % lower:
+                raise ValueError(
+                    'Every period must be a multiple of the one before')
+
+        time = np.ascontiguousarray(
+            times.view(np.int64) if self.datetime
+            else times.astype(np.int64))
+        if len(time) > 1 and np.any(time[1:] < time[:-1]):
+            raise ValueError('Data must be sorted by time')
+
+        values = np.ascontiguousarray(
+            data[self.columns].values, dtype=float)
+
+        self.levels = [self._store(0, time, values)]
+        for i, period in enumerate(self.periods):
+            time, values = aggregate_ohlc(
+                self.levels[-1][0], self.levels[-1][1],
+                self.columns, period)
+            self.levels.append(self._store(i + 1, time, values))
+
+        if directory is not None:
+            with open(os.path.join(directory, _META), 'w') as f:
+                json.dump({
+                    'columns': self.columns,
+                    'periods': self.periods,
+                    'time_column': self.time_column,
+                    'datetime': self.datetime,
+                    'levels': len(self.levels),
+                }, f)
+
+    def _store(self, level, time, values):
+        if self.directory is None:
+            return time, values
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        stored = list()
+        for name, array in (('time', time), ('values', values)):
+            path = os.path.join(
+                self.directory, name + '_' + str(level) + '.npy')
+            mapped = np.lib.format.open_memmap(
+                path, mode='w+', dtype=array.dtype, shape=array.shape)
+            mapped[...] = array
+            mapped.flush()
+            del mapped
+            stored.append(np.load(path, mmap_mode='r'))
+        return tuple(stored)
+
+    @classmethod
+    def open(cls, directory):
+        """
+        Opens a pyramid stored in a directory without loading
+        the levels into memory
+        :param directory: Directory of a pyramid
+        :return: OHLCPyramid
+        """
+        with open(os.path.join(directory, _META)) as f:
+            meta = json.load(f)
+
+        pyramid = cls.__new__(cls)
+        pyramid.columns = meta['columns']
+        pyramid.periods = meta['periods']
+        pyramid.time_column = meta['time_column']
+        pyramid.datetime = meta['datetime']
+        pyramid.directory = directory
+        pyramid.levels = [
+            (
+                np.load(os.path.join(
+                    directory, 'time_' + str(i) + '.npy'), mmap_mode='r'),
+                np.load(os.path.join(
+                    directory, 'values_' + str(i) + '.npy'), mmap_mode='r'),
+            )
+            for i in range(meta['levels'])
+        ]
+        return pyramid
+
+    def _bounds(self, level, start, stop):
+        time = self.levels[level][0]
+        # The first bar that contains start and all bars that
+        # begin before stop
+        first = 0 if start is None else \
+            max(int(np.searchsorted(time, start, 'right')) - 1, 0)
+        last = len(time) if stop is None else \
+            int(np.searchsorted(time, stop, 'left'))
+        return first, max(first, last)
+
+    def select(self, start=None, stop=None, bars=500):
+        """
+        Finds the finest level with at most the given number of
+        bars in the window
+        :param start: Start time. None is the first bar
+        :param stop: End time (exclusive). None is the last bar
+        :param bars: Target number of bars
+        :return: level, first row, end row
+        """
+        start = _to_int(start, self.datetime)
+        stop = _to_int(stop, self.datetime)
+
+        for level in range(len(self.levels)):
+            first, last = self._bounds(level, start, stop)
+            if last - first <= bars:
+                return level, first, last
+
+        return (level,) + self._bounds(level, start, stop)
+
+    def window(self, start=None, stop=None, bars=500):
+        """
+        Returns the bars of a time window from the finest level
+        with at most the given number of bars. The DataFrame has
+        an integer index like the data of the plot functions and
+        the time of every bar in the time column.
+        :param start: Start time
+        :param stop: End time (exclusive)
+        :param bars: Target number of bars
+        :return: Pandas DataFrame
+        """
+        import pandas as pd
+
+        level, first, last = self.select(start, stop, bars)
+        time, values = self.levels[level]
+
+        data = pd.DataFrame(
+            np.asarray(values[first:last]), columns=self.columns)
+        time = np.asarray(time[first:last])
+        if self.datetime:
+            time = time.view('datetime64[ns]')
+        data.insert(0, self.time_column, time)
+        return data
+
+    def cache_token(self):
+        """
+        :return: Values that define the pyramid, for cache keys
+            (see render_cache.normalize). The levels above the
+            raw bars follow from them. The hash of the raw bars
+            is computed once, a pyramid doesn't change
+        """
+        digest = getattr(self, '_digest', None)
+        if digest is None:
+            h = hashlib.blake2b(digest_size=20)
+            h.update(repr(normalize(self.levels[0])).encode())
+            digest = self._digest = h.hexdigest()
+        return (self.columns, self.periods, self.time_column,
+                self.datetime, digest)
+
+    def __len__(self):
+        return len(self.levels[0][0])
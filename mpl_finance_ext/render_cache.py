@@ -0,0 +1,405 @@
+import collections
+import functools
+import hashlib
+import io
+import os
+import threading
+import types
+
+import numpy as np
+
+# Keyword arguments that don't change the rendered image
+_IGNORED_KWARGS = ('fig', 'axis', 'show', 'save', 'use_pyplot', 'pre_styled')
+
+
+def normalize(value):
+    """
+    Turns a value into a structure with a stable repr, e.g. for
+    cache keys. Arrays and pandas objects are hashed by their
+    content, objects with a cache_token() method like
+    TradingAxis and OHLCPyramid are replaced by the token and
+    functions are keyed by their code and closure.
+    :param value: Value like the kwargs of a plot function
+    :return: Tuples, strings and numbers
+    :raise TypeError: If the repr of the value doesn't depend on
+        its content
+    """
+    if isinstance(value, dict):
+        return tuple(sorted(
+            (str(k), normalize(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return ('set',) + tuple(sorted(
+            (normalize(v) for v in value), key=repr))
+    if isinstance(value, np.ndarray):
+        h = hashlib.blake2b(digest_size=20)
+        _hash_values(h, value.ravel())
+        return ('ndarray', value.dtype.str, value.shape, h.hexdigest())
+    if isinstance(value, np.generic):
+        return value.item()
+
+    token = getattr(value, 'cache_token', None)
+    if token is not None:
+        return (type(value).__name__, normalize(token()))
+    if type(value).__module__.startswith('pandas'):
+        pandas_value = _normalize_pandas(value)
+        if pandas_value is not None:
+            return pandas_value
+    if callable(value):
+        func_value = _normalize_callable(value)
+        if func_value is not None:
+            return func_value
+
+    # The default repr has the id of the object, an unhashable
+    # object may change after its key was made
+    if type(value).__repr__ is object.__repr__ or \
+            getattr(value, '__hash__', None) is None:
+        raise TypeError(
+            'No cache key for ' + type(value).__name__ +
+            ', give it a cache_token() method')
+    return value
+
+
+def _normalize_callable(value):
+    # Functions are keyed by their name, code, defaults and the
+    # contents of their closure, so different lambdas or closures
+    # of the same name get different keys
+    if isinstance(value, functools.partial):
+        return ('partial', normalize(value.func),
+                normalize(value.args), normalize(value.keywords))
+    if isinstance(value, types.MethodType):
+        return ('method', normalize(value.__func__),
+                normalize(value.__self__))
+
+    name = getattr(value, '__module__', None), \
+        getattr(value, '__qualname__', None)
+    if isinstance(value, types.FunctionType):
+        closure = tuple(
+            _cell_contents(cell) for cell in value.__closure__ or ())
+        return ('function', name, _normalize_code(value.__code__),
+                normalize(value.__defaults__),
+                normalize(value.__kwdefaults__), closure)
+    if isinstance(value, (type, types.BuiltinFunctionType)):
+        return ('callable',) + name
+    # Other callable objects are keyed like any other value
+    return None
+
+
+def _cell_contents(cell):
+    try:
+        return normalize(cell.cell_contents)
+    except ValueError:
+        # Empty cell
+        return ('cell',)
+
+
+def _normalize_code(code):
+    h = hashlib.blake2b(digest_size=20)
+    h.update(code.co_code)
+    consts = tuple(
+        _normalize_code(c) if isinstance(c, types.CodeType)
+        else normalize(c) for c in code.co_consts)
+    h.update(repr((consts, code.co_names)).encode())
+    return h.hexdigest()
+
+
+def _normalize_pandas(value):
+    import pandas as pd
+
+    h = hashlib.blake2b(digest_size=20)
+    if isinstance(value, pd.DataFrame):
+        _hash_frame(h, value)
+        return ('DataFrame', h.hexdigest())
+    if isinstance(value, pd.Series):
+        h.update(repr((value.name, str(value.dtype))).encode())
+        _hash_values(h, value.index.values)
+        _hash_values(h, value.values)
+        return ('Series', h.hexdigest())
+    if isinstance(value, pd.Index):
+        h.update(repr((value.name, str(value.dtype))).encode())
+        _hash_values(h, value.values)
+        return ('Index', h.hexdigest())
+    return None
+
+
+def _hash_values(h, values):
+    values = np.asarray(values)
+    if values.dtype.kind in 'biufcmM':
+        h.update(np.ascontiguousarray(values).view(np.uint8))
+    else:
+        import pandas as pd
+        h.update(pd.util.hash_pandas_object(
+            pd.Series(values), index=False).values.view(np.uint8))
+
+
+def _hash_frame(h, data):
+    h.update(repr((list(data), [str(t) for t in data.dtypes])).encode())
+    _hash_values(h, data.index.values)
+    for col in data:
+        _hash_values(h, data[col].values)
+
+
+def render_image(func, data, signals=None, cs_patterns=None,
+                 plot_columns=None, fmt='png', dpi=None, **kwargs):
+    """
+    Renders a chart without pyplot and returns the image. Can be
+    called from threads and, with a picklable func like
+    plot_candlestick, in worker processes.
+    :param func: plot_candlestick, plot_filled_ohlc or plot
+    :param data: Pandas DataFrame
+    :param signals: Signals (see plot_candlestick)
+    :param cs_patterns: Candlestick patterns
+    :param plot_columns: Columns
+    :param fmt: Image format like 'png' or 'svg'
+    :param dpi: Dots per inch
+    :param kwargs: kwargs of the plot function
+    :return: Bytes
+    """
+    if signals is not None:
+        kwargs['signals'] = signals
+    if cs_patterns is not None:
+        kwargs['cs_patterns'] = cs_patterns
+    for k in _IGNORED_KWARGS:
+        kwargs.pop(k, None)
+    kwargs['use_pyplot'] = False
+    kwargs['show'] = False
+
+    fig, _ = func(data, plot_columns=plot_columns, **kwargs)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=dpi,
+                facecolor=fig.get_facecolor())
+    return buf.getvalue()
+
+
+class RenderCache(object):
+    """
+    Cache for rendered charts. The key is a hash of the data,
+    signals, patterns and all kwargs that change the image.
+    Images are kept in a LRU memory tier and optionally in a
+    size bounded directory on disk:
+
+        cache = RenderCache(max_items=256, directory='/tmp/charts')
+        png = cache.render(plot_candlestick, data,
+                           signals=signals, plot_columns=['EMA_8'])
+
+    On a hit nothing is rendered at all.
+    """
+
+    def __init__(self, max_items=128, directory=None,
+                 max_disk_bytes=256 * 1024 ** 2):
+        """
+        :param max_items: Number of images in memory
+        :param directory: Directory of the disk tier. If None
+            only the memory tier is used
+        :param max_disk_bytes: Maximum size of the disk tier
+        """
+        self.max_items = max_items
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = collections.OrderedDict()
+        self._disk = collections.OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        if directory is not None:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            self._scan_directory()
+
+    def _scan_directory(self):
+        entries = list()
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, name, stat.st_size))
+
+        # Oldest first
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def key(self, func, data, signals=None, cs_patterns=None,
+            plot_columns=None, fmt='png', dpi=None, **kwargs):
+        """
+        Returns the cache key of a chart
+        :param func: Plot function like plot_candlestick
+        :param data: Pandas DataFrame or OHLCPyramid
+        :param signals: Signals
+        :param cs_patterns: Candlestick patterns
+        :param plot_columns: Columns
+        :param fmt: Image format
+        :param dpi: Dots per inch
+        :param kwargs: kwargs of the plot function
+        :return: Hex string
+        :raise TypeError: If a kwarg has no cache key, see
+            normalize()
+        """
+        h = hashlib.blake2b(digest_size=20)
+        if hasattr(data, 'cache_token'):
+            # OHLCPyramid
+            h.update(repr(normalize(data)).encode())
+        else:
+            _hash_frame(h, data)
+
+        options = dict(
+            (k, v) for k, v in kwargs.items()
+            if k not in _IGNORED_KWARGS
+        )
+        h.update(repr(normalize((
+            func, signals, cs_patterns, plot_columns,
+            fmt, dpi, options
+        ))).encode())
+
+        return h.hexdigest()
+
+    def get(self, key, fmt='png'):
+        """
+        Returns the cached image or None
+        :param key: Key from key()
+        :param fmt: Image format
+        :return: Bytes or None
+        """
+        with self._lock:
+            image = self._memory.get(key, None)
+            if image is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return image
+
+            name = key + '.' + fmt
+            if name in self._disk:
+                try:
+                    with open(os.path.join(self.directory, name), 'rb') as f:
+                        image = f.read()
+                except (IOError, OSError):
+                    self._disk_bytes -= self._disk.pop(name)
+                else:
+                    self._disk.move_to_end(name)
+                    self._put_memory(key, image)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return image
+
+            self.misses += 1
+            return None
+
+    def put(self, key, image, fmt='png'):
+        """
+        Adds an image to the cache
+        :param key: Key from key()
+        :param image: Bytes
+        :param fmt: Image format
+        """
+        with self._lock:
+            self._put_memory(key, image)
+            if self.directory is not None:
+                self._put_disk(key + '.' + fmt, image)
+
+    def _put_memory(self, key, image):
+        self._memory[key] = image
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _put_disk(self, name, image):
+        if len(image) > self.max_disk_bytes:
+            return
+
+        path = os.path.join(self.directory, name)
+        tmp = path + '.' + str(threading.get_ident()) + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(image)
+        os.replace(tmp, path)
+
+        if name in self._disk:
+            self._disk_bytes -= self._disk.pop(name)
+        self._disk[name] = len(image)
+        self._disk_bytes += len(image)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            name, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self.disk_evictions += 1
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def render(self, func, data, signals=None, cs_patterns=None,
+               plot_columns=None, fmt='png', dpi=None, **kwargs):
+        """
+        Returns the image of a chart. The chart is only rendered
+        if it is not in the cache.
+        :param func: plot_candlestick, plot_filled_ohlc or plot
+        :param data: Pandas DataFrame
+        :param signals: Signals (see plot_candlestick)
+        :param cs_patterns: Candlestick patterns
+        :param plot_columns: Columns
+        :param fmt: Image format like 'png' or 'svg'
+        :param dpi: Dots per inch
+        :param kwargs: kwargs of the plot function
+        :return: Bytes
+        """
+        key = self.key(
+            func, data, signals=signals, cs_patterns=cs_patterns,
+            plot_columns=plot_columns, fmt=fmt, dpi=dpi, **kwargs
+        )
+
+        image = self.get(key, fmt)
+        if image is not None:
+            return image
+
+        image = render_image(
+            func, data, signals=signals, cs_patterns=cs_patterns,
+            plot_columns=plot_columns, fmt=fmt, dpi=dpi, **kwargs
+        )
+
+        self.put(key, image, fmt)
+        return image
+
+    def stats(self):
+        """
+        :return: Dictionary with hit and miss counters
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'disk_evictions': self.disk_evictions,
+                'memory_items': len(self._memory),
+                'disk_items': len(self._disk),
+                'disk_bytes': self._disk_bytes,
+            }
+
+    def clear(self):
+        """
+        Removes all images from memory and disk
+        """
+        with self._lock:
+            self._memory.clear()
+            for name in list(self._disk):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+            self._disk.clear()
+            self._disk_bytes = 0
@@ -0,0 +1,463 @@
+import os
+import subprocess
+
+import numpy as np
+
+from .indicators import add_indicators
+from .mpl_finance_ext import _candle_geometry
+from .mpl_finance_ext import _candlestick2_ohlc
+from .mpl_finance_ext import accent_color
+from .mpl_finance_ext import background_color
+from .mpl_finance_ext import color_set
+from .mpl_finance_ext import fancy_design
+from .mpl_finance_ext import label_colors
+from .price_flags import PriceFlags
+from .profiling import staged
+from .trading_axis import TradingAxis
+
+
+class FFmpegWriter(object):
+    """
+    Pipes raw RGBA frames into ffmpeg. The process is started
+    with the size of the first frame:
+
+        with FFmpegWriter('replay.mp4', fps=60) as writer:
+            Replay(data, signals).write(writer)
+    """
+
+    def __init__(self, path, fps=30, codec='libx264',
+                 ffmpeg='ffmpeg', extra_args=None):
+        """
+        :param path: Output file
+        :param fps: Frames per second
+        :param codec: Video codec
+        :param ffmpeg: ffmpeg executable
+        :param extra_args: Further output arguments of ffmpeg
+        """
+        self.path = path
+        self.fps = fps
+        self.codec = codec
+        self.ffmpeg = ffmpeg
+        self.extra_args = list(extra_args or [])
+        self._process = None
+
+    def _start(self, width, height):
+        command = [
+            self.ffmpeg, '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgba',
+            '-s', '{}x{}'.format(width, height),
+            '-r', str(self.fps), '-i', '-',
+            '-vcodec', self.codec, '-pix_fmt', 'yuv420p',
+        ] + self.extra_args + [self.path]
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def __call__(self, rgba):
+        """
+        Writes a frame
+        :param rgba: uint8 array of shape (height, width, 4)
+        """
+        if self._process is None:
+            self._start(rgba.shape[1], rgba.shape[0])
+        self._process.stdin.write(np.ascontiguousarray(rgba).data)
+
+    def close(self):
+        """
+        Finishes the video
+        """
+        if self._process is None:
+            return
+        process, self._process = self._process, None
+        process.stdin.close()
+        if process.wait() != 0:
+            raise RuntimeError(
+                'ffmpeg failed with exit code ' + str(process.returncode))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ImageSequenceWriter(object):
+    """
+    Writes every frame as an image file with Pillow
+    """
+
+    def __init__(self, pattern='frame_%05d.png'):
+        """
+        :param pattern: Path with a number format like
+            'frames/%05d.png'. The extension sets the format
+        """
+        directory = os.path.dirname(pattern)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.pattern = pattern
+        self.count = 0
+
+    def __call__(self, rgba):
+        """
+        Writes a frame
+        :param rgba: uint8 array of shape (height, width, 4)
+        """
+        from PIL import Image
+
+        image = Image.fromarray(np.asarray(rgba), 'RGBA')
+        path = self.pattern % self.count
+        if not path.lower().endswith('.png'):
+            image = image.convert('RGB')
+        image.save(path)
+        self.count += 1
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Replay(object):
+    """
+    Replays a backtest bar by bar. The styled axes and all past
+    candles, indicator lines and closed trades are a static
+    background that is drawn once per view. A frame restores the
+    background, draws only the new bars and closed trades on top
+    of it and then the open trade, the price flags and the P&L
+    (blitting). The view jumps ahead by half a window when the
+    last bar reaches its right edge and grows when a bar leaves
+    the price range, only then the figure is drawn completely:
+
+        replay = Replay(data, signals, plot_columns=['EMA_8'])
+        with FFmpegWriter('replay.mp4', fps=60) as writer:
+            replay.write(writer)
+
+    The price range only depends on the bars up to the current
+    one, so the replay does not look ahead.
+    """
+
+    def __init__(self, data, signals=None, plot_columns=None,
+                 window=200, figsize=None, dpi=100, width=0.6,
+                 bband_std=2.0):
+        """
+        :param data: Pandas DataFrame with ohlc columns. The
+            bars are placed on a TradingAxis of the index
+        :param signals: Signals like [('BUY', index, price), ...]
+            with index values of data
+        :param plot_columns: Indicator columns. Missing columns
+            like 'EMA_8' are computed
+        :param window: Number of bars of the view
+        :param figsize: Figure size in inches
+        :param dpi: Dots per inch of the frames
+        :param width: Width of a candle
+        :param bband_std: Width of computed bollinger bands
+        """
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        from .signal_evaluation import pair_signals
+
+        if data.empty:
+            raise ValueError('DataFrame is empty')
+        if window < 2:
+            raise ValueError('The window needs at least 2 bars')
+
+        data = add_indicators(data, plot_columns, bband_std=bband_std)
+        self.axis = TradingAxis(data.index.values)
+        self.window = int(window)
+        self.width = width
+
+        self._open = data['open'].values.astype(float)
+        self._high = data['high'].values.astype(float)
+        self._low = data['low'].values.astype(float)
+        self._close = data['close'].values.astype(float)
+        self._lines = [
+            data[col].values.astype(float)
+            for col in plot_columns or [] if col in data
+        ]
+
+        # Trades as (entry row, entry price, exit row, exit price).
+        # An open trade at the end has no exit row.
+        self._trades = list()
+        for buy, sell in pair_signals(
+                self.axis.map_signals(signals or []), include_open=True):
+            self._trades.append((
+                buy[1], buy[2],
+                None if sell is None else sell[1],
+                None if sell is None else sell[2],
+            ))
+        self._closing = dict(
+            (trade[2], trade) for trade in self._trades
+            if trade[2] is not None
+        )
+        self._entries = np.array(
+            [t[0] for t in self._trades], dtype=np.int64)
+
+        # Realized P&L after every exit in the order of the exits
+        closed = sorted(
+            (t[2], (t[3] - t[1]) / t[1] * 100)
+            for t in self._trades if t[2] is not None
+        )
+        self._exits = np.array([c[0] for c in closed], dtype=np.int64)
+        self._realized = np.concatenate(
+            ([0.0], np.cumsum([c[1] for c in closed])))
+
+        self.fig = Figure(
+            figsize=figsize, dpi=dpi, facecolor=background_color)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(111, facecolor=background_color)
+        fancy_design(self.ax, legend=False)
+        self.ax.tick_params(axis='x', labelrotation=35)
+        # Room for the rotated time labels
+        self.fig.subplots_adjust(bottom=0.2)
+        self.axis.install(self.ax)
+        self._dynamic_artists()
+
+        self._static = list()
+        self._background = None
+        self._position = -1
+        self._view = (0, self.window)
+        self._ylim = None
+
+    def _dynamic_artists(self):
+        # Reused for every frame and excluded from the full draw
+        from matplotlib.patches import Rectangle
+
+        ax = self.ax
+
+        self._segments = [
+            ax.plot([], [], color=color_set[i % len(color_set)],
+                    linewidth=0.7, animated=True)[0]
+            for i in range(len(self._lines))
+        ]
+
+        self._trade_patch = Rectangle(
+            (0, 0), 0, 0, linewidth=1, alpha=0.4, animated=True)
+        ax.add_patch(self._trade_patch)
+        self._trade_text = ax.text(
+            0, 0, '', color='#535353', fontsize=12, ha='center',
+            va='center', zorder=100, clip_on=True, animated=True)
+        self._trade_dots = ax.plot(
+            [], [], linestyle='', marker='o', markersize=3,
+            zorder=100, animated=True)[0]
+
+        # Close and indicators, flags that would overlap are
+        # moved apart
+        self._flags = PriceFlags(ax, animated=True)
+        self._flag_colors = [label_colors] + [
+            color_set[i % len(color_set)] for i in range(len(self._lines))
+        ]
+
+        self._pnl = ax.text(
+            0.01, 0.97, '', transform=ax.transAxes, color='#535353',
+            fontsize=9, ha='left', va='top', zorder=120, animated=True)
+
+    def __len__(self):
+        return len(self._close)
+
+    # Drawing ---------------------------------------------
+
+    def _candles(self, start, stop):
+        geometry = _candle_geometry(
+            self._open[start:stop], self._high[start:stop],
+            self._low[start:stop], self._close[start:stop],
+            width=self.width, index_fix=False
+        )
+        geometry['x'] += start
+        return _candlestick2_ohlc(
+            self.ax, None, None, None, None, width=self.width,
+            colorup=accent_color, colordown=label_colors, alpha=1,
+            geometry=geometry
+        )
+
+    def _set_trade(self, trade, position):
+        # Rectangle from the entry to the exit or the current bar
+        x, y, exit_row, exit_price = trade
+        if exit_row is None or exit_row > position:
+            exit_row, exit_price = position, self._close[position]
+        w, h = exit_row - x, exit_price - y
+
+        color = label_colors if h < 0 else accent_color
+        self._trade_patch.set_bounds(x, y, w, h)
+        self._trade_patch.set_color(color)
+        self._trade_text.set_position((x + w / 2.0, y + h / 2.0))
+        self._trade_text.set_text(str(round(h / y * 100, 3)))
+        self._trade_dots.set_data([x, x + w], [y, y + h])
+        self._trade_dots.set_color(color)
+        return h / y * 100
+
+    def _trade_layer(self):
+        return self._trade_patch, self._trade_text, self._trade_dots
+
+    def _static_trade(self, trade):
+        # Copies of the trade artists for the full draw
+        from matplotlib.patches import Rectangle
+
+        self._set_trade(trade, trade[2])
+        patch = self._trade_patch
+        rect = Rectangle(
+            patch.get_xy(), patch.get_width(), patch.get_height(),
+            color=patch.get_facecolor()[:3], linewidth=1, alpha=0.4)
+        self.ax.add_patch(rect)
+        text = self.ax.text(
+            *self._trade_text.get_position(),
+            s=self._trade_text.get_text(), color='#535353',
+            fontsize=12, ha='center', va='center', zorder=100,
+            clip_on=True)
+        dots, = self.ax.plot(
+            *self._trade_dots.get_data(), linestyle='', marker='o',
+            markersize=3, color=self._trade_dots.get_color(), zorder=100)
+        return [rect, text, dots]
+
+    def _price_range(self, start, stop):
+        values = [self._low[start:stop], self._high[start:stop]] + \
+            [line[start:stop] for line in self._lines]
+        low = min(np.nanmin(v) if np.any(~np.isnan(v)) else np.inf
+                  for v in values)
+        high = max(np.nanmax(v) if np.any(~np.isnan(v)) else -np.inf
+                   for v in values)
+        return low, high
+
+    def _redraw(self, position):
+        # Full draw of the static layer of the view
+        for artist in self._static:
+            artist.remove()
+
+        start, stop = self._view
+        stop = position + 1
+        self._static = list(self._candles(start, stop))
+        x = np.arange(start, stop)
+        for segment, values in zip(self._segments, self._lines):
+            self._static.append(self.ax.plot(
+                x, values[start:stop], color=segment.get_color(),
+                linewidth=0.7)[0])
+        for trade in self._trades:
+            if trade[2] is not None and start <= trade[2] <= position:
+                self._static.extend(self._static_trade(trade))
+
+        low, high = self._price_range(start, stop)
+        margin = (high - low) * 0.1 or abs(high) * 0.01 or 1.0
+        self._ylim = (low - margin, high + margin)
+
+        self.ax.set_xlim(self._view[0] - 1, self._view[1])
+        self.ax.set_ylim(self._ylim)
+        self.canvas.draw()
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def _append(self, previous, position):
+        # Draws the bars after previous into the background
+        self.canvas.restore_region(self._background)
+        ax = self.ax
+
+        for artist in self._candles(previous + 1, position + 1):
+            ax.draw_artist(artist)
+            artist.remove()
+
+        x = np.arange(previous, position + 1)
+        for segment, values in zip(self._segments, self._lines):
+            segment.set_data(x, values[previous:position + 1])
+            ax.draw_artist(segment)
+
+        for row in range(previous + 1, position + 1):
+            trade = self._closing.get(row, None)
+            if trade is not None:
+                self._set_trade(trade, row)
+                for artist in self._trade_layer():
+                    ax.draw_artist(artist)
+
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def _overlay(self, position):
+        # Open trade, price flags and P&L of the current bar
+        self.canvas.restore_region(self._background)
+        ax = self.ax
+
+        realized = self._realized[
+            np.searchsorted(self._exits, position, 'right')]
+
+        # Trades don't overlap, only the last entry can be open
+        open_change = None
+        last = np.searchsorted(self._entries, position, 'right') - 1
+        if last >= 0:
+            trade = self._trades[last]
+            if trade[2] is None or trade[2] > position:
+                open_change = self._set_trade(trade, position)
+                for artist in self._trade_layer():
+                    ax.draw_artist(artist)
+
+        values = [series[position] for series in [self._close] + self._lines]
+        self._flags.set_flags(
+            range(len(values)), [position] * len(values), values,
+            self._flag_colors)
+        ax.draw_artist(self._flags)
+
+        text = 'P&L {:+.3f}%'.format(realized)
+        if open_change is not None:
+            text += '   open {:+.3f}%'.format(open_change)
+        self._pnl.set_text(text)
+        ax.draw_artist(self._pnl)
+
+    @staged('replay_frame')
+    def draw(self, position):
+        """
+        Draws the chart up to a bar
+        :param position: Row of the last visible bar
+        :return: uint8 array of shape (height, width, 4). It is
+            a view of the canvas that changes with the next frame
+        """
+        n = len(self)
+        position = int(position)
+        if position < 0 or position >= n:
+            raise ValueError('Position out of range')
+
+        previous = self._position
+        start, stop = self._view
+        redraw = self._background is None or position < previous
+
+        if position >= stop or position < start:
+            start = max(0, position - self.window // 2)
+            self._view = (start, start + self.window)
+            redraw = True
+        elif not redraw and position > previous:
+            low, high = self._price_range(previous + 1, position + 1)
+            redraw = low < self._ylim[0] or high > self._ylim[1]
+
+        if redraw:
+            self._redraw(position)
+        elif position > previous:
+            self._append(previous, position)
+
+        self._position = position
+        self._overlay(position)
+        return np.asarray(self.canvas.buffer_rgba())
+
+    def frames(self, start=0, stop=None, step=1):
+        """
+        Generator of the frames of a replay
+        :param start: Row of the first frame
+        :param stop: Row after the last frame. Default is the end
+        :param step: Bars per frame
+        :return: Generator of uint8 arrays (see draw())
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        for position in range(start, stop, step):
+            yield self.draw(position)
+
+    def write(self, writer, start=0, stop=None, step=1):
+        """
+        Passes every frame to a writer
+        :param writer: Callable with an RGBA array like
+            FFmpegWriter or ImageSequenceWriter
+        :param start: Row of the first frame
+        :param stop: Row after the last frame
+        :param step: Bars per frame
+        :return: Number of frames
+        """
+        count = 0
+        for rgba in self.frames(start, stop, step):
+            writer(rgba)
+            count += 1
+        return count
@@ -0,0 +1,587 @@
+# -*- coding: utf-8 -*-
+"""
+Local HTTP service that renders charts of OHLC files:
+
+    python -m mpl_finance_ext.server --source btc=/data/btc.parquet
+
+    GET  /render?source=btc&start=2018-03-01&stop=2018-03-08
+              &columns=EMA_8,MA_36&format=png
+    POST /render with the same fields as JSON and signals like
+         {"source": "btc", "signals": [["BUY", "2018-03-02", 9500.0]]}
+    GET  /metrics
+    GET  /health
+"""
+import collections
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from .export import write_figure
+from .figure_pool import FigurePool
+from .geometry import chart_geometry
+from .geometry import write_geometry
+from .loaders import read_feather
+from .loaders import read_npy_dir
+from .loaders import read_parquet
+from .mpl_finance_ext import plot
+from .mpl_finance_ext import plot_candlestick
+from .mpl_finance_ext import plot_filled_ohlc
+from .paginate import in_window
+from .pyramid import OHLCPyramid
+from .render_cache import RenderCache
+from .render_cache import normalize
+
+logger = logging.getLogger('mpl_finance_ext')
+
+CHARTS = {
+    'candlestick': plot_candlestick,
+    'filled_ohlc': plot_filled_ohlc,
+    'plot': plot,
+}
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'svg': 'image/svg+xml',
+    'pdf': 'application/pdf',
+    # Chart geometry for front ends that draw the chart, see
+    # geometry.write_geometry
+    'mfeg': 'application/octet-stream',
+}
+
+# kwargs of the plot functions a request may set
+OPTIONS = (
+    'name', 'title', 'xlabel', 'ylabel', 'volume', 'max_candles',
+    'bband_std', 'gradient_fill', 'gradient_composite', 'merge_wicks',
+    'draw_verticals', 'signal_evaluation', 'signal_evaluation_form',
+    'disable_red_signals', 'disable_green_signals', 'dots',
+    'enable_flags', 'set_flags_at_the_end', 'xhline_red', 'xhline_green',
+    'xtickrotation', 'disable_x_ticks',
+)
+
+
+class ChartSource(object):
+    """
+    An OHLC file or directory the service reads windows from:
+    parquet and feather files, directories of .npy files
+    (write_npy_dir) and OHLCPyramid directories. Only the needed
+    columns and rows of the window are read.
+    """
+
+    def __init__(self, path, time_column='date'):
+        """
+        :param path: File or directory
+        :param time_column: Name of the sorted time column
+        """
+        if not os.path.exists(path):
+            raise ValueError('Source not found: ' + path)
+
+        self.path = path
+        self.time_column = time_column
+        self.pyramid = None
+
+        if os.path.isdir(path):
+            if os.path.exists(os.path.join(path, 'pyramid.json')):
+                self.kind = 'pyramid'
+                self.pyramid = OHLCPyramid.open(path)
+                self.time_column = self.pyramid.time_column
+            else:
+                self.kind = 'npy'
+        else:
+            self.kind = os.path.splitext(path)[1].lstrip('.').lower()
+            if self.kind not in ('parquet', 'feather'):
+                raise ValueError('Unknown source format: ' + path)
+
+    def version(self):
+        """
+        :return: Latest modification time of the source. Part
+            of the cache key, so a rewritten file is rendered again
+        """
+        stamp = os.path.getmtime(self.path)
+        if os.path.isdir(self.path):
+            for name in os.listdir(self.path):
+                stamp = max(stamp, os.path.getmtime(
+                    os.path.join(self.path, name)))
+        return stamp
+
+    def read(self, plot_columns=None, start=None, stop=None,
+             bars=500, columns=None):
+        """
+        Reads a window with the time column as index
+        :param plot_columns: Plot columns
+        :param start: Start time
+        :param stop: End time (exclusive)
+        :param bars: Target number of bars of a pyramid
+        :param columns: Further columns like 'volume'
+        :return: Pandas DataFrame
+        """
+        if self.kind == 'pyramid':
+            data = self.pyramid.window(start, stop, bars=bars)
+        elif self.kind == 'npy':
+            data = read_npy_dir(
+                self.path, plot_columns, self.time_column,
+                start, stop, columns)
+        else:
+            reader = read_parquet if self.kind == 'parquet' \
+                else read_feather
+            data = reader(
+                self.path, plot_columns, self.time_column,
+                start, stop, columns)
+        return data.set_index(self.time_column)
+
+
+def _split(value):
+    if value is None or isinstance(value, list):
+        return value
+    return [v for v in str(value).split(',') if v]
+
+
+def _signal(signal, index):
+    # JSON has no times, signals at a DatetimeIndex are strings
+    try:
+        name, at, price = signal
+    except (TypeError, ValueError):
+        raise ValueError('Signals must be [signal, time, price]')
+    if index.dtype.kind == 'M':
+        import pandas as pd
+        at = pd.Timestamp(at)
+    return name, at, float(price)
+
+
+# Fields of a query string that are JSON
+_JSON_FIELDS = ('signals', 'options')
+
+
+def _query(query):
+    # Query string values are strings, only the signals and the
+    # options are decoded. A start like 2017 stays a time.
+    from urllib.parse import parse_qsl
+
+    request = dict()
+    for key, value in parse_qsl(query):
+        request[key] = value
+        if key in _JSON_FIELDS:
+            try:
+                request[key] = json.loads(value)
+            except ValueError:
+                pass
+    return request
+
+
+def _time(request, name):
+    # Times are strings like in JSON, a number would be compared
+    # with the datetime column of the source
+    value = request.get(name, None)
+    if value is None:
+        return None
+
+    import pandas as pd
+    message = name + ' must be a time like 2018-03-01'
+    if not isinstance(value, str):
+        raise ValueError(message)
+    try:
+        pd.Timestamp(value)
+    except ValueError:
+        raise ValueError(message)
+    return value
+
+
+def _bounded(request, name, cast, maximum, default=None):
+    value = request.get(name, None)
+    if value is None:
+        return default
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(name + ' must be a number')
+    if not 1 <= value <= maximum:
+        raise ValueError(
+            name + ' must be between 1 and ' + str(maximum))
+    return value
+
+
+class ChartService(object):
+    """
+    Renders chart requests with a warm FigurePool and a
+    RenderCache. Requests with the same key that arrive while
+    the chart is rendered wait for this render instead of
+    starting their own. The key is a hash of the request and of
+    the modification time of the source, so a hit does not read
+    the data at all.
+    """
+
+    def __init__(self, sources, pool_size=4, figsize=None, dpi=100,
+                 cache=None, timeout=30.0, max_bars=5000, max_dpi=300,
+                 max_width=4096):
+        """
+        :param sources: Dictionary of names and ChartSources
+        :param pool_size: Number of figures rendered at the same
+            time
+        :param figsize: Figure size in inches
+        :param dpi: Default dots per inch
+        :param cache: RenderCache. Default is a RenderCache with
+            256 images in memory
+        :param timeout: Seconds a request waits for a figure
+        :param max_bars: Maximum number of bars of a request.
+            Larger windows are merged into this many candles
+        :param max_dpi: Maximum dots per inch of a request
+        :param max_width: Maximum width in pixels of a request
+        """
+        self.sources = sources
+        self.dpi = dpi
+        self.timeout = timeout
+        self.max_bars = max_bars
+        self.max_dpi = max_dpi
+        self.max_width = max_width
+        self.cache = RenderCache(max_items=256) if cache is None else cache
+
+        self.pool = FigurePool(size=pool_size, figsize=figsize, dpi=dpi)
+        # Build and style all figures before the first request
+        warm = [self.pool.acquire() for _ in range(pool_size)]
+        for pooled in warm:
+            self.pool.release(pooled)
+
+        self._lock = threading.Lock()
+        self._inflight = dict()
+        self._latencies = collections.deque(maxlen=2048)
+        self.requests = 0
+        self.renders = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def _parse(self, request):
+        source = request.get('source', None)
+        if source not in self.sources:
+            raise KeyError('Unknown source ' + str(source))
+
+        chart = request.get('chart', 'candlestick')
+        if chart not in CHARTS:
+            raise ValueError('Unknown chart ' + str(chart))
+
+        fmt = str(request.get('format', 'png')).lower()
+        if fmt not in CONTENT_TYPES:
+            raise ValueError('Unknown format ' + fmt)
+        if fmt == 'mfeg' and chart != 'candlestick':
+            raise ValueError('Geometry is only available for candlestick')
+
+        options = request.get('options', None) or dict()
+        for key in options:
+            if key not in OPTIONS:
+                raise ValueError('Unknown option ' + str(key))
+
+        # The size of the image is bounded like the number of bars
+        bars = _bounded(request, 'bars', int, self.max_bars, 500)
+        dpi = _bounded(request, 'dpi', float, self.max_dpi)
+        width = _bounded(request, 'width', int, self.max_width)
+
+        return {
+            'source': source,
+            'chart': chart,
+            'format': fmt,
+            'start': _time(request, 'start'),
+            'stop': _time(request, 'stop'),
+            'columns': _split(request.get('columns', None)),
+            'signals': request.get('signals', None),
+            'dpi': dpi,
+            'width': width,
+            'bars': bars,
+            'options': options,
+        }
+
+    def key(self, parsed):
+        """
+        :param parsed: Parsed request
+        :return: Cache key
+        """
+        h = hashlib.blake2b(digest_size=20)
+        stamp = self.sources[parsed['source']].version()
+        h.update(repr(normalize((parsed, stamp))).encode())
+        return h.hexdigest()
+
+    def _render(self, parsed):
+        source = self.sources[parsed['source']]
+        options = dict(parsed['options'])
+        extra = ['volume'] if options.get('volume', False) else None
+        data = source.read(
+            parsed['columns'], parsed['start'], parsed['stop'],
+            bars=parsed['bars'], columns=extra
+        )
+        if data.empty:
+            raise ValueError('No bars in the window')
+
+        func = CHARTS[parsed['chart']]
+        signals = parsed['signals']
+        if func is plot:
+            signals = None
+        else:
+            options.setdefault('max_candles', parsed['bars'])
+            if signals:
+                signals, _ = in_window(
+                    [_signal(s, data.index) for s in signals], None,
+                    data.index[0], data.index[-1])
+
+        buf = io.BytesIO()
+        if parsed['format'] == 'mfeg':
+            # Nothing is drawn, the front end gets the arrays
+            geometry = chart_geometry(
+                data, signals=signals, plot_columns=parsed['columns'],
+                trading_axis=True, **options)
+            write_geometry(geometry, buf)
+            return buf.getvalue()
+
+        try:
+            pooled = self.pool.acquire(timeout=self.timeout)
+        except RuntimeError as e:
+            raise TimeoutError(str(e))
+        try:
+            kwargs = pooled.render_kwargs(0, trading_axis=True, **options)
+            if signals:
+                kwargs['signals'] = signals
+            func(data, plot_columns=parsed['columns'], **kwargs)
+            write_figure(
+                pooled.fig, buf, fmt=parsed['format'],
+                dpi=parsed['dpi'] or self.dpi, width=parsed['width'])
+        finally:
+            self.pool.release(pooled)
+        return buf.getvalue()
+
+    def render(self, request):
+        """
+        Returns the image of a chart request
+        :param request: Dictionary with:
+            'source': Name of the source
+            'chart': 'candlestick', 'filled_ohlc' or 'plot'
+            'start', 'stop': Time window (stop exclusive)
+            'columns': Plot columns like ['EMA_8'] or 'EMA_8,MA_36'.
+                Indicators are computed
+            'signals': [[signal, time, price], ...]
+            'format': 'png', 'jpg', 'svg', 'pdf' or 'mfeg' for
+                the geometry of a candlestick chart
+            'dpi': Dots per inch
+            'width': Width of a raster in pixels
+            'bars': Maximum number of candles. Default is 500
+            'options': kwargs of the plot function, see OPTIONS
+        :return: Bytes, content type
+        :raise KeyError: If the source is unknown
+        :raise ValueError: If the request is invalid
+        :raise TimeoutError: If no figure was free in time
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self.requests += 1
+
+        try:
+            parsed = self._parse(request)
+            key = self.key(parsed)
+            fmt = parsed['format']
+
+            image = self.cache.get(key, fmt)
+            if image is None:
+                with self._lock:
+                    future = self._inflight.get(key, None)
+                    owner = future is None
+                    if owner:
+                        future = self._inflight[key] = Future()
+                    else:
+                        self.coalesced += 1
+
+                if owner:
+                    try:
+                        image = self._render(parsed)
+                        self.cache.put(key, image, fmt)
+                        future.set_result(image)
+                        with self._lock:
+                            self.renders += 1
+                    except Exception as e:
+                        future.set_exception(e)
+                        raise
+                    finally:
+                        with self._lock:
+                            del self._inflight[key]
+                else:
+                    image = future.result()
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+        return image, CONTENT_TYPES[fmt]
+
+    def metrics(self):
+        """
+        :return: Dictionary with counters, the latency percentiles
+            of the last requests in milliseconds and the cache
+            statistics
+        """
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000.0
+            metrics = {
+                'requests': self.requests,
+                'renders': self.renders,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+                'inflight': len(self._inflight),
+                'pool_size': self.pool.size,
+            }
+
+        for q in (50, 95, 99):
+            metrics['latency_p' + str(q) + '_ms'] = \
+                float(np.percentile(latencies, q)) if len(latencies) else None
+        metrics['cache'] = self.cache.stats()
+        return metrics
+
+
+def _handler(service):
+    from http.server import BaseHTTPRequestHandler
+
+    class ChartRequestHandler(BaseHTTPRequestHandler):
+
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status, body, content_type='application/json'):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, status, value):
+            self._send(status, json.dumps(value).encode())
+
+        def _render(self, request):
+            if not isinstance(request, dict):
+                self._json(400, {'error': 'Request must be an object'})
+                return
+
+            try:
+                image, content_type = service.render(request)
+            except KeyError as e:
+                if request.get('source', None) in service.sources:
+                    # Not an unknown source but a failed render
+                    self._failed(e)
+                else:
+                    self._json(404, {'error': str(e.args[0])})
+            except ValueError as e:
+                self._json(400, {'error': str(e)})
+            except TimeoutError as e:
+                # No free figure in time
+                self._json(503, {'error': str(e)})
+            except Exception as e:
+                self._failed(e)
+            else:
+                self._send(200, image, content_type)
+
+        def _failed(self, e):
+            logger.exception('Rendering failed')
+            self._json(500, {'error': str(e)})
+
+        def do_GET(self):
+            path, _, query = self.path.partition('?')
+            if path == '/render':
+                self._render(_query(query))
+            elif path == '/metrics':
+                self._json(200, service.metrics())
+            elif path == '/health':
+                self._json(200, {'status': 'ok'})
+            else:
+                self._json(404, {'error': 'Not found'})
+
+        def do_POST(self):
+            if self.path.partition('?')[0] != '/render':
+                self._json(404, {'error': 'Not found'})
+                return
+
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                request = json.loads(self.rfile.read(length).decode())
+            except ValueError:
+                self._json(400, {'error': 'Invalid JSON'})
+                return
+            self._render(request)
+
+        def log_message(self, format, *args):
+            logger.debug('%s ' + format, self.address_string(), *args)
+
+    return ChartRequestHandler
+
+
+def make_server(service, host='127.0.0.1', port=8765):
+    """
+    Creates the HTTP server of a ChartService. Every request is
+    handled in its own thread.
+    :param service: ChartService
+    :param host: Host. Default is only the local machine
+    :param port: Port
+    :return: http.server.ThreadingHTTPServer
+    """
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), _handler(service))
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Local chart rendering service')
+    parser.add_argument('--source', action='append', default=[],
+                        metavar='NAME=PATH',
+                        help='Parquet or feather file, npy or pyramid '
+                             'directory. Can be repeated')
+    parser.add_argument('--time-column', default='date')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--figsize', default=None,
+                        help='Figure size in inches like 10,6')
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--max-dpi', type=int, default=300)
+    parser.add_argument('--max-width', type=int, default=4096)
+    parser.add_argument('--cache-items', type=int, default=256)
+    parser.add_argument('--cache-dir', default=None)
+    args = parser.parse_args(argv)
+
+    sources = dict()
+    for spec in args.source:
+        name, sep, path = spec.partition('=')
+        if not sep:
+            parser.error('--source must be NAME=PATH')
+        sources[name] = ChartSource(path, time_column=args.time_column)
+    if not sources:
+        parser.error('At least one --source is needed')
+
+    figsize = None
+    if args.figsize:
+        figsize = tuple(float(v) for v in args.figsize.split(','))
+
+    service = ChartService(
+        sources, pool_size=args.pool_size, figsize=figsize, dpi=args.dpi,
+        max_dpi=args.max_dpi, max_width=args.max_width,
+        cache=RenderCache(max_items=args.cache_items,
+                          directory=args.cache_dir)
+    )
+    server = make_server(service, args.host, args.port)
+    print('Serving {} on http://{}:{}'.format(
+        ', '.join(sorted(sources)), args.host, server.server_address[1]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
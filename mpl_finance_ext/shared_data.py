@@ -0,0 +1,252 @@
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+
+from .indicators import add_indicators
+from .loaders import chart_columns
+
+_BLOCK = 'block.npy'
+_INDEX = 'index.npy'
+
+
+def _shared_directory():
+    # /dev/shm is memory, files there are never written to disk
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+
+def window_overlays(data, signals=None, cs_patterns=None):
+    """
+    Returns the signals and candlestick patterns that are in
+    the index range of a window. Patterns keep their index
+    values and are clipped to the window, the plot functions
+    find their rows by index value. None instead of an empty
+    list, the plot functions expect at least one.
+    :param data: Window like SharedOHLC.window()
+    :param signals: [[signal, index, price], ...]
+    :param cs_patterns: [['pattern_name', start_index, stop_index], ...]
+    :return: signals, cs_patterns
+    """
+    from .paginate import in_window
+
+    if data.empty:
+        return None, None
+    return in_window(signals, cs_patterns, data.index[0], data.index[-1])
+
+
+class SharedOHLC(object):
+    """
+    OHLC and indicator columns of one series in a single
+    float64 block that several processes read without copies.
+    The block is a memory-mapped file, by default in /dev/shm.
+    The handle is pickled as the file name, so a process pool
+    attaches to the same pages instead of receiving a copy of
+    the data with every task:
+
+        with SharedOHLC.create(data, plot_columns=['EMA_8']) as shared:
+            pool.map(render_day, [(shared, a, b) for a, b in days])
+
+        def render_day(args):
+            shared, start, stop = args
+            window = shared.window(start, stop)
+            plot_candlestick(window, plot_columns=['EMA_8'], ...)
+
+    Windows are DataFrames with views of the block, the memory
+    of all workers together grows with the size of the series,
+    not with the number of workers. The views are read-only.
+    """
+
+    def __init__(self, path, columns, index_kind):
+        """
+        Attaches to an existing block. Use SharedOHLC.create()
+        to make one.
+        :param path: Directory of the block
+        :param columns: Names of the rows of the block
+        :param index_kind: Numpy kind of the index like 'M' or 'i'
+        """
+        self.path = path
+        self.columns = list(columns)
+        self.index_kind = index_kind
+        self._owner = False
+        self._finalizer = None
+        self._attach()
+
+    def _attach(self):
+        self.block = np.load(
+            os.path.join(self.path, _BLOCK), mmap_mode='r')
+        self.index_values = np.load(
+            os.path.join(self.path, _INDEX), mmap_mode='r')
+        if self.index_kind == 'M':
+            self.index_values = self.index_values.view('datetime64[ns]')
+
+    @classmethod
+    def create(cls, data, plot_columns=None, columns=None,
+               directory=None, bband_std=2.0):
+        """
+        Copies the chart columns of a DataFrame into a new block.
+        Indicator columns like 'EMA_8' are computed over the whole
+        series first, so windows do not start with a warm-up.
+        :param data: Pandas DataFrame with open, high, low, close
+            and a sorted index
+        :param plot_columns: Plot columns of the charts
+        :param columns: Further columns like 'volume'
+        :param directory: Parent directory of the block. Default
+            is /dev/shm if available, else the temp directory
+        :param bband_std: Width of computed bollinger bands
+        :return: SharedOHLC that removes the block on unlink(),
+            at the end of a with statement or when it is
+            garbage collected
+        """
+        if not data.index.is_monotonic_increasing:
+            raise ValueError('The index must be sorted')
+
+        data = add_indicators(data, plot_columns, bband_std=bband_std)
+        names = [
+            col for col in chart_columns(plot_columns, columns=columns)
+            if col in data
+        ]
+        missing = [
+            col for col in chart_columns(None, columns=columns)
+            if col not in data
+        ]
+        if missing:
+            raise ValueError('Columns not found: ' + ', '.join(missing))
+
+        index = np.asarray(data.index.values)
+        if index.dtype.kind not in 'Mmiuf':
+            raise ValueError('The index must be numeric or datetime')
+        kind = index.dtype.kind
+
+        path = tempfile.mkdtemp(
+            prefix='mpl_finance_ext_',
+            dir=directory or _shared_directory())
+        try:
+            # One row per column, every column is contiguous
+            block = np.lib.format.open_memmap(
+                os.path.join(path, _BLOCK), mode='w+',
+                dtype=np.float64, shape=(len(names), len(data)))
+            for row, col in enumerate(names):
+                block[row] = data[col].values
+            block.flush()
+            del block
+
+            if kind in 'Mm':
+                index = index.view(np.int64)
+            np.save(os.path.join(path, _INDEX), index)
+        except Exception:
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+
+        shared = cls(path, names, kind)
+        shared._owner = True
+        shared._finalizer = weakref.finalize(
+            shared, shutil.rmtree, path, True)
+        return shared
+
+    def __getstate__(self):
+        return {
+            'path': self.path,
+            'columns': self.columns,
+            'index_kind': self.index_kind,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._owner = False
+        self._finalizer = None
+        self._attach()
+
+    def __len__(self):
+        return self.block.shape[1]
+
+    @property
+    def nbytes(self):
+        """
+        :return: Size of the block and the index in bytes
+        """
+        return self.block.nbytes + self.index_values.nbytes
+
+    def bounds(self, start=None, stop=None):
+        """
+        Finds the rows of an index range by binary search
+        :param start: First index value. With a datetime index
+            anything pandas understands like '2018-03-14'
+        :param stop: End of the range (exclusive)
+        :return: first row, end row
+        """
+        if self.index_kind == 'M':
+            import pandas as pd
+            if start is not None:
+                start = pd.Timestamp(start).to_datetime64()
+            if stop is not None:
+                stop = pd.Timestamp(stop).to_datetime64()
+
+        first = 0 if start is None else int(
+            np.searchsorted(self.index_values, start, 'left'))
+        last = len(self) if stop is None else int(
+            np.searchsorted(self.index_values, stop, 'left'))
+        return first, max(first, last)
+
+    def rows(self, first=None, last=None, columns=None):
+        """
+        Returns rows by position like page_windows() returns them
+        :param first: First row
+        :param last: End row (exclusive)
+        :param columns: Columns. Default are all columns, only
+            these are views of the block without a copy
+        :return: Pandas DataFrame
+        """
+        import pandas as pd
+
+        window = slice(first, last)
+        if columns is None:
+            values = self.block[:, window]
+            columns = self.columns
+        else:
+            values = self.block[[self.columns.index(c) for c in columns],
+                                window]
+
+        # The transposed block becomes the single float block of
+        # the DataFrame without a copy
+        return pd.DataFrame(
+            values.T, columns=columns, copy=False,
+            index=pd.Index(self.index_values[window], copy=False)
+        )
+
+    def window(self, start=None, stop=None, columns=None):
+        """
+        Returns the rows of an index range
+        :param start: First index value
+        :param stop: End of the range (exclusive)
+        :param columns: Columns. Default are all columns
+        :return: Pandas DataFrame
+        """
+        return self.rows(*self.bounds(start, stop), columns=columns)
+
+    def close(self):
+        """
+        Detaches from the block. Views that are still used keep
+        it mapped.
+        """
+        self.block = None
+        self.index_values = None
+
+    def unlink(self):
+        """
+        Removes the block. Processes that are attached keep their
+        mapping until they close it.
+        """
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._owner:
+            self.close()
+            self.unlink()
@@ -21,14 +21,17 @@ def draw_verticals(axis, signals):
                          alpha=0.8, linestyle='-')
 
 
-def draw_signal_evaluation(axis, signals, **kwargs):
-
-    if not signals:
-        raise ValueError('The given list of signals is empty')
-
+def pair_signals(signals, include_open=False):
+    """
+    Pairs every BUY with the next SELL. Further BUYs before the
+    SELL and SELLs without a BUY are skipped.
+    :param signals: List of signals like [('BUY', index, price), ...]
+    :param include_open: If True a last BUY without SELL is
+        added as [buy signal, None]
+    :return: List of [buy signal, sell signal]
+    """
     signal_pairs = list()
 
-    # Create list of BUY and SELL pairs --------------
     buy_flag = False
     t = list()
     for signal in signals:
@@ -41,6 +44,19 @@ def draw_signal_evaluation(axis, signals, **kwargs):
             signal_pairs.append(t)
             t = list()
 
+    if include_open and t:
+        signal_pairs.append([t[0], None])
+
+    return signal_pairs
+
+
+def draw_signal_evaluation(axis, signals, **kwargs):
+
+    if not signals:
+        raise ValueError('The given list of signals is empty')
+
+    signal_pairs = pair_signals(signals)
+
     # Analysis ----------------------------------------
     # Excelent source of arrow examples:
     # http://matthiaseisen.com/matplotlib/shapes/arrow/
@@ -0,0 +1,187 @@
+import numpy as np
+
+_DAY = 24 * 3600 * 10 ** 9
+
+
+class TradingAxis(object):
+    """
+    Gap-free x axis in trading time. Every bar gets the next
+    integer position, so nights, weekends and holidays take no
+    space. Times are mapped to positions by binary search in the
+    sorted times and the tick labels map positions back to
+    times. Zooming only formats the visible ticks, the data is
+    never mapped again:
+
+        plot_candlestick(data, signals=signals, trading_axis=True)
+
+    With trading_axis=True the index of the data is used. Pass
+    a TradingAxis to share it between panels.
+    """
+
+    def __init__(self, times, fmt=None, unit=None):
+        """
+        :param times: Sorted times of the bars. Datetimes or
+            numbers
+        :param fmt: strftime format of the tick labels. Default
+            is the date for daily bars and date and time for
+            intraday bars
+        :param unit: Unit of numeric times like 's' for unix
+            timestamps. If None numbers are labeled as they are
+        """
+        values = np.asarray(times)
+        self.datetime = np.issubdtype(values.dtype, np.datetime64) or \
+            unit is not None or values.dtype == object
+
+        if self.datetime:
+            values = self._to_int(values, unit)
+        else:
+            values = values.astype(float)
+
+        if len(values) > 1 and np.any(values[1:] < values[:-1]):
+            raise ValueError('Times of a trading axis must be sorted')
+
+        self.times = values
+        self.unit = unit
+
+        if fmt is None:
+            fmt = '%Y-%m-%d'
+            if self.datetime and np.any(values % _DAY):
+                fmt = '%Y-%m-%d %H:%M'
+        self.fmt = fmt
+
+        self._labels = dict()
+
+    def _to_int(self, values, unit=None):
+        # Times as int64 nanoseconds
+        import pandas as pd
+        if unit is not None and np.asarray(values).dtype.kind in 'iuf':
+            values = pd.to_datetime(np.asarray(values), unit=unit)
+        return pd.DatetimeIndex(np.atleast_1d(values)).asi8
+
+    def positions(self, times):
+        """
+        Positions of times. A time between two bars gets the
+        position of the next bar.
+        :param times: Time or array-like of times
+        :return: Integer or numpy array of positions
+        """
+        scalar = np.ndim(times) == 0 and not isinstance(times, (list, tuple))
+        result = np.searchsorted(self.times, self._values(times), 'left')
+        return int(result[0]) if scalar else result
+
+    def _values(self, times):
+        if self.datetime:
+            return self._to_int(times, self.unit)
+        return np.atleast_1d(np.asarray(times, dtype=float))
+
+    def in_range(self, times):
+        """
+        :param times: Array-like of times
+        :return: Boolean numpy array, True for times between the
+            first and the last bar
+        """
+        values = self._values(times)
+        if not len(self.times):
+            return np.zeros(len(values), dtype=bool)
+        return (values >= self.times[0]) & (values <= self.times[-1])
+
+    def clip(self, start, stop):
+        """
+        Positions of the bars of a time range
+        :param start: Start time
+        :param stop: Stop time (inclusive)
+        :return: First and last position or None if no bar is
+            in the range
+        """
+        first = self.positions(start)
+        last = int(np.searchsorted(
+            self.times, self._values(stop)[0], 'right')) - 1
+        if first > last:
+            return None
+        return first, last
+
+    def time(self, position):
+        """
+        Time of the bar at a position
+        :param position: Position, rounded to the next bar
+        :return: pandas Timestamp or number
+        """
+        i = int(round(position))
+        i = min(max(i, 0), len(self.times) - 1)
+        if self.datetime:
+            import pandas as pd
+            return pd.Timestamp(int(self.times[i]))
+        return self.times[i]
+
+    def label(self, position, pos=None):
+        """
+        Tick label of a position. Labels are cached per bar.
+        :param position: Position
+        :param pos: Index of the tick (unused, see FuncFormatter)
+        :return: String
+        """
+        i = int(round(position))
+        if i < 0 or i >= len(self.times):
+            return ''
+
+        text = self._labels.get(i, None)
+        if text is None:
+            value = self.time(i)
+            text = value.strftime(self.fmt) if self.datetime \
+                else format(value, 'g')
+            self._labels[i] = text
+        return text
+
+    def install(self, axis):
+        """
+        Sets a locator for integer positions and the tick label
+        formatter on the x axis
+        :param axis: Axis
+        """
+        from matplotlib.ticker import FuncFormatter
+        from matplotlib.ticker import MaxNLocator
+
+        axis.xaxis.set_major_locator(MaxNLocator(integer=True))
+        axis.xaxis.set_major_formatter(FuncFormatter(self.label))
+
+    def map_signals(self, signals):
+        """
+        :param signals: [(signal, time, price), ...]
+        :return: [(signal, position, price), ...]. Signals before
+            the first or after the last bar are dropped
+        """
+        if not signals:
+            return signals
+        times = [s[1] for s in signals]
+        positions = self.positions(times)
+        return [
+            (s[0], int(p)) + tuple(s[2:])
+            for s, p, inside in zip(signals, positions, self.in_range(times))
+            if inside
+        ]
+
+    def map_patterns(self, cs_patterns):
+        """
+        :param cs_patterns: [[name, start time, stop time], ...]
+        :return: [[name, start position, stop position], ...].
+            Patterns are clipped to the bars, patterns without a
+            bar are dropped
+        """
+        if not cs_patterns:
+            return cs_patterns
+        mapped = list()
+        for p in cs_patterns:
+            bars = self.clip(p[1], p[2])
+            if bars is not None:
+                mapped.append([p[0], bars[0], bars[1]] + list(p[3:]))
+        return mapped
+
+    def cache_token(self):
+        """
+        :return: Values that define the axis, for cache keys
+            (see render_cache.normalize)
+        """
+        return self.times, self.fmt, self.unit, self.datetime
+
+    def __len__(self):
+        return len(self.times)
@@ -19,5 +19,10 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/z33pX/mpl_finance_ext",
     packages=find_packages(),
+    entry_points={
+        'console_scripts': [
+            'mpl-finance-ext-server = mpl_finance_ext.server:main',
+        ],
+    },
     license=license
 )
\ No newline at end of file
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _make_ohlc(rows=100, freq='h', volume=False, seed=0):
+    """
+    Random walk OHLC bars
+    :param rows: Number of bars
+    :param freq: Frequency of the 'date' column. If None the
+        data has no time column
+    :param volume: Add a volume column
+    :param seed: Seed of the random walk
+    :return: Pandas DataFrame with an integer index
+    """
+    rng = np.random.RandomState(seed)
+    close = 1.0 + np.cumsum(rng.normal(0, 1e-3, rows))
+    open_ = np.append(close[:1], close[:-1])
+    spread = np.abs(rng.normal(0, 1e-3, rows))
+    data = pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+    })
+    if volume:
+        data['volume'] = rng.randint(1, 100, rows).astype(float)
+    if freq is not None:
+        data.insert(0, 'date', pd.date_range(
+            '2018-01-01', periods=rows, freq=freq))
+    return data
+
+
+@pytest.fixture
+def make_ohlc():
+    return _make_ohlc
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+import mpl_finance_ext as mfe
+
+
+# Module level, the cache key of a function covers its closure
+started, proceed = threading.Event(), threading.Event()
+
+
+def slow_plot(data, **kwargs):
+    started.set()
+    proceed.wait(10)
+    return mfe.plot(data, **kwargs)
+
+
+def test_cancelled_render_keeps_worker_and_is_cached(make_ohlc):
+    data = make_ohlc(50, freq=None)[['close']]
+    started.clear()
+    proceed.clear()
+
+    renderer = mfe.AsyncRenderer(max_workers=1, max_queue=0)
+
+    async def main():
+        request = asyncio.ensure_future(renderer.render(slow_plot, data))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+
+        request.cancel()
+        await asyncio.sleep(0.05)
+        # The thread still renders, its worker is not free
+        assert renderer.stats()['pending'] == 1
+        try:
+            await renderer.render(mfe.plot, data)
+            assert False, 'Queue should be full'
+        except RuntimeError:
+            pass
+
+        proceed.set()
+        while renderer.stats()['pending']:
+            await asyncio.sleep(0.01)
+        assert renderer.stats()['renders'] == 1
+        # Served from the cache without a new render
+        image = await renderer.render(slow_plot, data)
+        assert image.startswith(b'\x89PNG')
+        assert renderer.stats()['renders'] == 1
+
+    try:
+        asyncio.run(main())
+    finally:
+        renderer.close()
@@ -0,0 +1,122 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+import mpl_finance_ext as mfe
+
+
+def _ticks(n=2000, seed=0):
+    rng = np.random.RandomState(seed)
+    time = pd.Timestamp('2018-01-01').value + \
+        np.cumsum(rng.randint(0, 5000, n)).astype(np.int64) * 10 ** 6
+    price = 1.0 + np.cumsum(rng.normal(0, 1e-4, n))
+    volume = rng.randint(1, 50, n).astype(float)
+    return time.view('datetime64[ns]'), price, volume
+
+
+def _build(kind, size, chunks, ticks):
+    builder = mfe.BarBuilder(kind, size)
+    time, price, volume = ticks
+    bounds = [0] + list(chunks) + [len(price)]
+    frames = [builder.push(time[a:b], price[a:b], volume[a:b])
+              for a, b in zip(bounds, bounds[1:])]
+    frames.append(builder.flush())
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.mark.parametrize('kind,size', [
+    ('time', '1min'), ('tick', 37), ('volume', 500.0)])
+def test_bars_do_not_depend_on_the_chunks(kind, size):
+    ticks = _ticks()
+    expected = _build(kind, size, [], ticks)
+    assert len(expected) > 50
+
+    rng = np.random.RandomState(1)
+    for chunks in (range(1, 2000), range(100, 2000, 100),
+                   np.sort(rng.choice(2000, 40, replace=False))):
+        assert_frame_equal(_build(kind, size, chunks, ticks), expected)
+
+
+def test_read_csv_matches_one_push():
+    time, price, volume = _ticks()
+    csv = pd.DataFrame({'time': pd.to_datetime(time), 'price': price,
+                        'amount': volume}).to_csv(index=False)
+
+    expected = _build('time', '5min', [], (time, price, volume))
+    builder = mfe.BarBuilder('time', '5min')
+    result = pd.concat(
+        builder.read_csv(io.StringIO(csv), 'time', 'price', 'amount',
+                         chunksize=333),
+        ignore_index=True)
+    assert_frame_equal(result, expected, check_exact=False)
+
+
+def _prices(make_ohlc):
+    data = make_ohlc(3000, freq=None)
+    data.loc[[0, 10, 11, 500], 'close'] = np.nan
+    return data
+
+
+def _naive_renko(data, brick_size):
+    price = data['close'].values
+    rows = np.flatnonzero(~np.isnan(price))
+    base = price[rows[0]]
+    top = bottom = 0
+    bricks = list()
+    for row in rows:
+        x = (price[row] - base) / brick_size
+        while x >= top + 1:
+            bricks.append((top, top + 1, row))
+            top += 1
+            bottom = top - 1
+        while x <= bottom - 1:
+            bricks.append((bottom, bottom - 1, row))
+            bottom -= 1
+            top = bottom + 1
+    return [(base + o * brick_size, base + c * brick_size, row)
+            for o, c, row in bricks]
+
+
+def _naive_range_bars(data, bar_range):
+    price = data['close'].values
+    rows = np.flatnonzero(~np.isnan(price))
+    bars = list()
+    open = high = low = price[rows[0]]
+    finished = False
+    for row in rows[1:]:
+        p = price[row]
+        if finished:
+            open = high = low = bars[-1][3]
+        high, low = max(high, p), min(low, p)
+        finished = high - low >= bar_range
+        if finished:
+            bars.append((open, high, low, p, row))
+    if not finished:
+        bars.append((open, high, low, p, row))
+    return bars
+
+
+@pytest.mark.parametrize('brick_size', [1e-3, 2.5e-3, 1e-2])
+def test_renko_matches_a_naive_loop(make_ohlc, brick_size):
+    data = _prices(make_ohlc)
+    result = mfe.renko(data, brick_size)
+    expected = _naive_renko(data, brick_size)
+
+    assert len(result) == len(expected) > 0
+    np.testing.assert_allclose(result['open'], [b[0] for b in expected])
+    np.testing.assert_allclose(result['close'], [b[1] for b in expected])
+    assert list(result['source_row']) == [b[2] for b in expected]
+
+
+@pytest.mark.parametrize('bar_range', [1e-3, 4e-3, 2e-2])
+def test_range_bars_match_a_naive_loop(make_ohlc, bar_range):
+    data = _prices(make_ohlc)
+    result = mfe.range_bars(data, bar_range)
+    expected = pd.DataFrame(
+        _naive_range_bars(data, bar_range),
+        columns=['open', 'high', 'low', 'close', 'source_row'])
+
+    assert_frame_equal(result, expected, check_dtype=False)
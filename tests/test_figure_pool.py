@@ -0,0 +1,27 @@
+import mpl_finance_ext as mfe
+
+
+def x_labels(pooled):
+    pooled.fig.canvas.draw()
+    return [
+        tick.label1.get_text()
+        for tick in pooled.axes[0].xaxis.get_major_ticks()
+        if tick.label1.get_visible() and tick.label1.get_text()
+    ]
+
+
+def test_reuse_after_volume_panel_shows_x_labels(make_ohlc):
+    pool = mfe.FigurePool(size=1)
+    data = make_ohlc(freq=None, volume=True)
+
+    with pool.figure() as pooled:
+        fresh = x_labels(pooled)
+    with pool.figure() as pooled:
+        mfe.plot_candlestick(data, volume=True, **pooled.render_kwargs(0))
+        assert not x_labels(pooled)
+    with pool.figure() as pooled:
+        mfe.plot_candlestick(data, **pooled.render_kwargs(0))
+        assert x_labels(pooled)
+        assert len(pooled.fig.axes) == 1
+
+    assert fresh
@@ -0,0 +1,43 @@
+import numpy as np
+from numpy.testing import assert_allclose
+
+import mpl_finance_ext as mfe
+
+COLUMNS = ['MA_20', 'EMA_8', 'RSI_14', 'ATR_14', 'bband_upper_20',
+           'bband_lower_20', 'MACD_12_26', 'MACD_signal_12_26_9']
+
+
+def test_stream_matches_batch_with_replaced_bars_and_nans(make_ohlc):
+    data = make_ohlc(400)
+    data.loc[[50, 51, 200], 'close'] = np.nan
+    data.loc[120, ['high', 'low']] = np.nan
+    expected = mfe.add_indicators(data, COLUMNS)
+
+    stream = mfe.IndicatorStream(COLUMNS)
+    stream.update_frame(data.iloc[:100])
+    result = {col: list() for col in COLUMNS}
+    for i in range(100, len(data)):
+        bar = data.iloc[i]
+        # A tick of the bar before its final close
+        tick = bar.copy()
+        tick['close'] = bar['open'] + 0.5
+        stream.update(tick)
+        values = stream.update(bar, new_bar=False)
+        for col in COLUMNS:
+            result[col].append(values[col])
+
+    for col in COLUMNS:
+        assert_allclose(result[col], expected[col].values[100:],
+                        rtol=1e-8, atol=1e-10, err_msg=col)
+
+
+def test_single_indicators_match_vectorized_functions(make_ohlc):
+    close = make_ohlc(300)['close'].values
+
+    sma, ema = mfe.IncrementalSMA(10), mfe.IncrementalEMA(10)
+    result = [(sma.update(x), ema.update(x)) for x in close]
+
+    assert_allclose([r[0] for r in result], mfe.sma(close, 10),
+                    rtol=1e-8, atol=1e-12)
+    assert_allclose([r[1] for r in result], mfe.ema(close, 10),
+                    rtol=1e-8, atol=1e-12)
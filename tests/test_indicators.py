@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_allclose
+
+import mpl_finance_ext as mfe
+from mpl_finance_ext.indicators import rolling_std
+
+
+def assert_close(actual, expected):
+    assert_allclose(actual, expected, rtol=1e-8, atol=1e-12)
+
+
+def test_moving_averages_match_pandas(make_ohlc):
+    close = make_ohlc(500)['close']
+    close[[0, 100, 101]] = np.nan
+
+    assert_close(mfe.sma(close, 20), close.rolling(20).mean())
+    assert_close(mfe.ema(close, 8), close.ewm(span=8, min_periods=8).mean())
+    assert_close(rolling_std(close, 20), close.rolling(20).std())
+
+
+def test_rsi_atr_macd_match_pandas(make_ohlc):
+    data = make_ohlc(500)
+    close = data['close']
+
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(
+        alpha=1 / 14., min_periods=14, adjust=False).mean()
+    loss = (-delta).clip(lower=0).ewm(
+        alpha=1 / 14., min_periods=14, adjust=False).mean()
+    assert_close(mfe.rsi(close, 14), gain / (gain + loss))
+
+    previous = close.shift()
+    tr = pd.concat([
+        data['high'] - data['low'],
+        (data['high'] - previous).abs(),
+        (data['low'] - previous).abs(),
+    ], axis=1).max(axis=1)
+    assert_close(
+        mfe.atr(data['high'], data['low'], close, 14),
+        tr.ewm(alpha=1 / 14., min_periods=14, adjust=False).mean())
+
+    line = close.ewm(span=12, min_periods=12).mean() - \
+        close.ewm(span=26, min_periods=26).mean()
+    signal = line.ewm(span=9, min_periods=9).mean()
+    result = mfe.macd(close)
+    assert_close(result[0], line)
+    assert_close(result[1], signal)
+
+
+def test_add_indicators_computes_columns_by_name(make_ohlc):
+    data = make_ohlc(300)
+    result = mfe.add_indicators(
+        data, ['EMA_8', 'MA_36', 'bband_upper_20', 'RSI_14'], bband_std=2.0)
+
+    close = data['close']
+    assert_close(result['MA_36'], close.rolling(36).mean())
+    assert_close(result['bband_upper_20'],
+                 close.rolling(20).mean() + 2.0 * close.rolling(20).std())
+    # The data of the caller is not changed
+    assert 'EMA_8' not in data
+
+
+def test_rolling_std_keeps_precision_on_a_long_drifting_history():
+    rng = np.random.RandomState(0)
+    close = 1.0 + np.cumsum(rng.normal(1e-4, 1e-3, 1000000))
+
+    windows = np.lib.stride_tricks.sliding_window_view(close, 20)[::97]
+    result = rolling_std(close, 20)[19::97]
+    assert_close(result, windows.std(axis=1, ddof=1))
+    assert_close(mfe.sma(close, 20)[19::97], windows.mean(axis=1))
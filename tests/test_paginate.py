@@ -0,0 +1,28 @@
+import io
+
+import mpl_finance_ext as mfe
+from mpl_finance_ext.paginate import in_window
+
+
+def test_pattern_after_the_first_page(make_ohlc):
+    data = make_ohlc(1200, freq=None)
+    pages = mfe.write_pdf_pages(
+        io.BytesIO(), data, bars=500,
+        cs_patterns=[['bullish_hammer', 600, 602]])
+    assert pages == 3
+
+
+def test_pattern_across_a_page_border(make_ohlc):
+    data = make_ohlc(72).set_index('date')
+    pattern = ['bearish_engulfing', data.index[22], data.index[26]]
+    pages = mfe.write_pdf_pages(
+        io.BytesIO(), data, period='1D', cs_patterns=[pattern])
+    assert pages == 3
+
+
+def test_in_window_clips_patterns():
+    signals, patterns = in_window(
+        [['BUY', 5, 1.0], ['SELL', 12, 1.1]],
+        [['a', 8, 12], ['b', 2, 4], ['c', 3, 6]], 5, 10)
+    assert signals == [['BUY', 5, 1.0]]
+    assert patterns == [['a', 8, 10], ['c', 5, 6]]
@@ -0,0 +1,47 @@
+import numpy as np
+
+import mpl_finance_ext as mfe
+
+
+def test_default_plot_columns_skip_non_numeric(make_ohlc):
+    data = make_ohlc()
+    data['symbol'] = 'EURUSD'
+    for func in (mfe.plot_candlestick, mfe.plot):
+        fig, ax = func(data, use_pyplot=False, show=False)
+        fig.canvas.draw()
+        assert mfe.PriceFlags.of(ax).names == ['open', 'high', 'low', 'close']
+
+
+def test_set_frame_skips_non_numeric(make_ohlc):
+    data = make_ohlc()
+    data['symbol'] = 'EURUSD'
+    fig, ax = mfe.plot(data, plot_columns=['close'],
+                       use_pyplot=False, show=False)
+    flags = mfe.PriceFlags.of(ax)
+    flags.set_frame(data, ['date', 'close', 'symbol'])
+    assert flags.names == ['close']
+
+
+def test_update_ignores_missing_values(make_ohlc):
+    data = make_ohlc()
+    fig, ax = mfe.plot(data, plot_columns=['close'],
+                       use_pyplot=False, show=False)
+    flags = mfe.PriceFlags.of(ax)
+    last = data['close'].values[-1]
+    for value in (None, np.nan, 'n/a'):
+        flags.update({'close': value}, last_index=len(data))
+        assert flags._y[0] == last
+
+    flags.update({'close': 2.0}, last_index=len(data))
+    assert flags._y[0] == 2.0
+
+
+def test_gradient_fill_keeps_the_data_in_view(make_ohlc):
+    data = make_ohlc(300)
+    data['EMA_30'] = data['close'].ewm(span=30).mean()
+    columns = ['close', 'EMA_30']
+    fig, ax = mfe.plot(data, plot_columns=columns, gradient_fill=True,
+                       use_pyplot=False, show=False)
+    bottom, top = ax.get_ylim()
+    assert bottom <= data[columns].values.min()
+    assert top >= data[columns].values.max()
@@ -0,0 +1,49 @@
+from numpy.testing import assert_allclose
+
+import mpl_finance_ext as mfe
+
+
+def test_trading_axis_of_a_pyramid_shows_times(make_ohlc):
+    pyramid = mfe.OHLCPyramid(make_ohlc(2000, freq='min'), ['5min', '1h'])
+    fig, ax = mfe.plot_candlestick(
+        pyramid, trading_axis=True, target_bars=100,
+        use_pyplot=False, show=False)
+    fig.canvas.draw()
+
+    labels = [t.get_text() for t in ax.get_xticklabels() if t.get_text()]
+    assert labels and all(label.startswith('2018-01-0') for label in labels)
+
+
+def _resample(data, rule):
+    return data.set_index('date').resample(rule).agg({
+        'open': 'first', 'high': 'max', 'low': 'min',
+        'close': 'last', 'volume': 'sum'}).dropna(subset=['open'])
+
+
+def test_window_reads_the_finest_level_that_fits(make_ohlc, tmp_path):
+    data = make_ohlc(2000, freq='min', volume=True)
+    start, stop = '2018-01-01 02:07', '2018-01-01 11:00'
+
+    for directory in (None, str(tmp_path)):
+        pyramid = mfe.OHLCPyramid(data, ['5min', '1h'],
+                                  directory=directory)
+        if directory is not None:
+            pyramid = mfe.OHLCPyramid.open(directory)
+
+        # 533 minutes, 107 5min bars from the one containing start
+        window = pyramid.window(start, stop, bars=200)
+        expected = _resample(data, '5min').loc['2018-01-01 02:05':
+                                               '2018-01-01 10:55']
+        assert len(window) == len(expected) == 107
+        assert (window['date'].values == expected.index.values).all()
+        assert_allclose(window[expected.columns].values, expected.values)
+
+        window = pyramid.window(start, stop, bars=100)
+        expected = _resample(data, '1h').loc['2018-01-01 02:00':
+                                             '2018-01-01 10:00']
+        assert len(window) == len(expected) == 9
+        assert_allclose(window[expected.columns].values, expected.values)
+
+        window = pyramid.window(start, '2018-01-01 02:30', bars=100)
+        assert_allclose(window['close'].values,
+                        data['close'].values[127:150])
@@ -0,0 +1,83 @@
+import functools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import mpl_finance_ext as mfe
+from mpl_finance_ext.render_cache import normalize
+
+
+def test_equal_trading_axes_have_equal_keys(make_ohlc):
+    cache = mfe.RenderCache()
+    data = make_ohlc(200)
+    keys = [
+        cache.key(mfe.plot_candlestick, data,
+                  trading_axis=mfe.TradingAxis(data['date']))
+        for _ in range(2)
+    ]
+    assert keys[0] == keys[1]
+
+
+def test_pandas_kwargs_are_hashed_by_content(make_ohlc):
+    data = make_ohlc(200)
+    series = pd.Series(np.zeros(1000))
+    changed = series.copy()
+    changed[500] = 1.0
+    # The truncated reprs are equal
+    assert repr(series) == repr(changed)
+    assert normalize(series) != normalize(changed)
+    assert normalize(data) == normalize(data.copy())
+
+
+def test_pyramid_key(make_ohlc):
+    cache = mfe.RenderCache()
+    data = make_ohlc(200)
+    keys = [
+        cache.key(mfe.plot_candlestick, mfe.OHLCPyramid(data, ['4h']))
+        for _ in range(2)
+    ]
+    assert keys[0] == keys[1]
+
+    data.loc[10, 'close'] = 2.0
+    assert cache.key(
+        mfe.plot_candlestick, mfe.OHLCPyramid(data, ['4h'])) != keys[0]
+
+
+def test_unknown_objects_raise(make_ohlc):
+    with pytest.raises(TypeError):
+        normalize(object())
+    with pytest.raises(TypeError):
+        mfe.RenderCache().key(
+            mfe.plot_candlestick, make_ohlc(), locator=object())
+
+
+def _scaled(factor):
+    def scale(x):
+        return x * factor
+    return scale
+
+
+def test_callables_are_keyed_by_code_and_closure():
+    assert normalize(lambda x: x + 1) != normalize(lambda x: x - 1)
+    assert normalize(_scaled(2)) != normalize(_scaled(3))
+    assert normalize(_scaled(2)) == normalize(_scaled(2))
+
+    # The repr of a partial has the id of the function
+    partials = [functools.partial(_scaled(2), 1) for _ in range(2)]
+    assert repr(partials[0]) != repr(partials[1])
+    assert normalize(partials[0]) == normalize(partials[1])
+    assert normalize(partials[0]) != normalize(functools.partial(
+        _scaled(2), 2))
+
+    assert normalize(mfe.plot) == normalize(mfe.plot)
+    assert normalize(mfe.plot) != normalize(mfe.plot_candlestick)
+
+
+def test_callable_objects_without_a_token_raise():
+    class Formatter(object):
+        def __call__(self, x):
+            return str(x)
+
+    with pytest.raises(TypeError):
+        normalize(Formatter())
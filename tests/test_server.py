@@ -0,0 +1,66 @@
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from mpl_finance_ext.loaders import write_npy_dir
+from mpl_finance_ext.server import ChartService
+from mpl_finance_ext.server import ChartSource
+from mpl_finance_ext.server import _query
+from mpl_finance_ext.server import make_server
+
+
+@pytest.fixture
+def service(make_ohlc, tmp_path):
+    write_npy_dir(make_ohlc(300), str(tmp_path))
+    service = ChartService(
+        {'btc': ChartSource(str(tmp_path))}, pool_size=1, timeout=0.1)
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    service.url = 'http://127.0.0.1:{}/render?'.format(
+        server.server_address[1])
+    yield service
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def _status(url):
+    try:
+        with urlopen(url) as response:
+            return response.status
+    except HTTPError as e:
+        return e.code
+
+
+def test_query_keeps_times_as_strings():
+    request = _query('source=btc&start=2018&bars=100&signals=[]')
+    assert request == {
+        'source': 'btc', 'start': '2018', 'bars': '100', 'signals': []}
+
+
+def test_invalid_times_are_bad_requests(service):
+    with pytest.raises(ValueError):
+        service.render({'source': 'btc', 'start': 2018})
+    with pytest.raises(ValueError):
+        service.render({'source': 'btc', 'stop': 'yesterday noon'})
+
+    assert _status(service.url + 'source=btc&start=2018') == 200
+    assert _status(service.url + 'source=btc&start=2018-13-45') == 400
+    assert service.metrics()['renders'] == 1
+
+
+def test_status_of_unknown_sources_and_busy_pools(service):
+    assert _status(service.url + 'source=eth') == 404
+
+    pooled = service.pool.acquire()
+    try:
+        assert _status(service.url + 'source=btc&bars=10') == 503
+    finally:
+        service.pool.release(pooled)
+    assert _status(service.url + 'source=btc&bars=10') == 200
+    assert json.loads(urlopen(service.url.replace(
+        'render?', 'metrics')).read())['errors'] == 2
@@ -0,0 +1,24 @@
+import mpl_finance_ext as mfe
+
+
+def test_window_overlays_plot_round_trip(make_ohlc):
+    data = make_ohlc(2000, freq=None)
+    signals = [['BUY', 520, 1.0], ['SELL', 700, 1.0], ['BUY', 1500, 1.0]]
+    patterns = [['bullish_hammer', 610, 612], ['bearish_engulfing', 495, 505]]
+
+    with mfe.SharedOHLC.create(data) as shared:
+        window = shared.window(500, 1000)
+        window_signals, window_patterns = mfe.window_overlays(
+            window, signals, patterns)
+        assert window_signals == signals[:2]
+        assert window_patterns == [
+            ['bullish_hammer', 610, 612], ['bearish_engulfing', 500, 505]]
+
+        fig, ax = mfe.plot_candlestick(
+            window, signals=window_signals, cs_patterns=window_patterns,
+            use_pyplot=False, show=False)
+        fig.canvas.draw()
+        boxes = sorted(
+            patch.get_x() for axis in fig.axes for patch in axis.patches
+            if patch.get_linestyle() == 'dotted')
+        assert boxes[0] == 500 - 0.6 and boxes[-1] == 610 - 0.6
@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import mpl_finance_ext as mfe
+
+
+def _render(make_ohlc, kind, seed):
+    data = make_ohlc(120, seed=seed)
+    data['MA_20'] = data['close'].rolling(20).mean()
+
+    if kind == 'candlestick':
+        fig, _ = mfe.plot_candlestick(
+            data=data, plot_columns=['MA_20'],
+            signals=[('BUY', 30, data['close'][30]),
+                     ('SELL', 80, data['close'][80])],
+            name='chart ' + str(seed), use_pyplot=False)
+    elif kind == 'filled_ohlc':
+        fig, _ = mfe.plot_filled_ohlc(
+            data=data, plot_columns=['MA_20'],
+            name='chart ' + str(seed), use_pyplot=False)
+    elif kind == 'plot':
+        fig, _ = mfe.plot(
+            data=data, plot_columns=['close', 'MA_20'],
+            gradient_fill=True, use_pyplot=False)
+    elif kind == 'hist':
+        fig, _ = mfe.hist(
+            data=data['close'].pct_change().dropna().values,
+            bins=30, threshold=0, use_pyplot=False)
+    else:
+        fig, _ = mfe.bar(
+            data=['a', 'b', 'a', 'c', str(seed % 3)],
+            use_pyplot=False)
+
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba()).copy()
+
+
+def test_parallel_renders_match_single_threaded(make_ohlc):
+    kinds = ['candlestick', 'filled_ohlc', 'plot', 'hist', 'bar']
+    jobs = [(kinds[i % len(kinds)], i) for i in range(10)]
+
+    def render(job):
+        return _render(make_ohlc, *job)
+
+    reference = [render(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        parallel = list(executor.map(render, jobs))
+
+    for job, a, b in zip(jobs, reference, parallel):
+        assert a.shape == b.shape and np.array_equal(a, b), job
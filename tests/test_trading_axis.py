@@ -0,0 +1,44 @@
+import mpl_finance_ext as mfe
+
+
+def test_map_drops_signals_and_clips_patterns(make_ohlc):
+    times = make_ohlc(48)['date']
+    axis = mfe.TradingAxis(times)
+    before = times[0] - (times[1] - times[0])
+    after = times[47] + (times[1] - times[0])
+
+    signals = axis.map_signals([
+        ('BUY', before, 1.0), ('SELL', times[10], 1.0), ('BUY', after, 1.0)])
+    assert signals == [('SELL', 10, 1.0)]
+
+    patterns = axis.map_patterns([
+        ['a', times[45], after], ['b', before, times[2]],
+        ['c', after, after], ['d', times[5], times[6]]])
+    assert patterns == [['a', 45, 47], ['b', 0, 2], ['d', 5, 6]]
+
+
+def test_signals_outside_the_window_are_not_drawn(make_ohlc):
+    data = make_ohlc(200).set_index('date')
+    signals = [['BUY', data.index[10], 1.0], ['SELL', data.index[20], 1.0]]
+
+    geometry = mfe.chart_geometry(
+        data.iloc[100:], signals=signals, trading_axis=True)
+    assert len(geometry['signal_points']) == 0
+    assert len(geometry['signal_rects']) == 0
+
+    def chart(**kwargs):
+        fig, ax = mfe.plot_candlestick(
+            data.iloc[100:], signals=signals, trading_axis=True,
+            use_pyplot=False, show=False, **kwargs)
+        fig.canvas.draw()
+        return fig, ax
+
+    fig, ax = chart()
+    assert not any(t.get_text() for a in fig.axes for t in a.texts)
+    lines = len(ax.lines)
+
+    fig, ax = chart(vline=[{'ix': data.index[5]}],
+                    vspan=[{'ix': [data.index[90], data.index[110]]}])
+    assert len(ax.lines) == lines
+    spans = [p for p in ax.patches if p.get_alpha() == 0.2]
+    assert len(spans) == 1 and spans[0].get_x() == 0